@@ -0,0 +1,288 @@
+"""
+网络路径的基准测试：在本地假服务器（benchmarks.fake_server）上测量搜索、get_song_details_robust、
+PlaylistImportThread、BatchDownloadThread 和 DownloadEngine.process_song 的延迟与吞吐，
+结果以 JSON 输出，可与之前提交的结果对比以发现性能回退。
+
+用法（在仓库根目录执行）:
+    python -m benchmarks.api_bench --output bench.json
+    python -m benchmarks.api_bench --latency 0.03 --bandwidth 5000000 --error-rate 0.02
+    python -m benchmarks.api_bench --output new.json --compare bench.json
+
+运行期间 HOME 指向临时目录，下载库索引、封面缓存和下载文件都不会影响真实的用户数据。
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.fake_server import FakeServer, FakeServerConfig, max_quality, song_singer, song_title
+
+SCENARIOS = ('search', 'details_robust', 'playlist_import', 'process_song', 'batch_download')
+# 对比时使用的指标，以及数值越大越好还是越小越好
+COMPARED_METRICS = {
+    'p50_ms': 'lower', 'p95_ms': 'lower', 'ops_per_s': 'higher', 'mb_per_s': 'higher',
+}
+# 各场景使用不同的歌曲ID区间，避免音质协商缓存和下载库索引影响其他场景
+_ID_RANGES = {'search': 0, 'details_robust': 100000, 'process_song': 200000, 'batch_download': 300000}
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, total_seconds, nbytes=0, failures=0):
+    """将每次操作的耗时（秒）汇总为延迟分位数和吞吐"""
+    values = sorted(latencies)
+    count = len(values)
+    result = {
+        'count': count,
+        'failures': failures,
+        'total_s': round(total_seconds, 4),
+        'ops_per_s': round(count / total_seconds, 2) if total_seconds else 0.0,
+        'mean_ms': round(sum(values) / count * 1000, 3) if count else 0.0,
+        'p50_ms': round(_percentile(values, 0.50) * 1000, 3),
+        'p95_ms': round(_percentile(values, 0.95) * 1000, 3),
+        'p99_ms': round(_percentile(values, 0.99) * 1000, 3),
+        'max_ms': round(values[-1] * 1000, 3) if values else 0.0,
+    }
+    if nbytes:
+        result['mb'] = round(nbytes / 1024 / 1024, 2)
+        result['mb_per_s'] = round(nbytes / total_seconds / 1024 / 1024, 2) if total_seconds else 0.0
+    return result
+
+
+def _song_info(song_id):
+    return {'id': song_id, 'title': song_title(song_id), 'singer': song_singer(song_id)}
+
+
+def _timed(operation, items):
+    """依次对每个元素执行 operation，返回 (耗时列表, 失败数, 总耗时)"""
+    latencies = []
+    failures = 0
+    started = time.perf_counter()
+    for item in items:
+        op_started = time.perf_counter()
+        if not operation(item):
+            failures += 1
+        latencies.append(time.perf_counter() - op_started)
+    return latencies, failures, time.perf_counter() - started
+
+
+def bench_search(server, args, work_dir):
+    from core.api import search_music
+    ids = range(_ID_RANGES['search'], _ID_RANGES['search'] + args.iterations)
+    latencies, failures, total = _timed(
+        lambda song_id: search_music(f"{song_title(song_id)} {song_singer(song_id)}"), ids)
+    return summarize(latencies, total, failures=failures)
+
+
+def bench_details_robust(server, args, work_dir):
+    from core.api import get_song_details_robust
+    start = _ID_RANGES['details_robust']
+    ids = range(start, start + args.iterations)
+    latencies, failures, total = _timed(
+        lambda song_id: get_song_details_robust(_song_info(song_id), quality=args.quality, negotiate=True), ids)
+    return summarize(latencies, total, failures=failures)
+
+
+def bench_playlist_import(server, args, work_dir):
+    from core.downloader import PlaylistImportThread
+    results = []
+    thread = PlaylistImportThread('1001', 'bench', [])
+    thread.finished_signal.connect(lambda success, name, songs: results.append((success, len(songs))))
+    started = time.perf_counter()
+    thread.run()
+    total = time.perf_counter() - started
+    success, matched = results[0] if results else (False, 0)
+    # 每首歌计一次操作；延迟分位数对整次导入没有意义，只报告吞吐
+    result = summarize([], total, failures=0 if success else 1)
+    result.update(count=server.config.playlist_size, matched=matched,
+                  ops_per_s=round(server.config.playlist_size / total, 2) if total else 0.0)
+    return result
+
+
+def bench_process_song(server, args, work_dir):
+    from core.api import get_song_details
+    from core.engine import DownloadEngine
+    from core.timing import TimingRecorder, get_recorder
+    engine = DownloadEngine(recorder=TimingRecorder(parent=get_recorder()))
+    download_dir = Path(work_dir) / 'process_song'
+    start = _ID_RANGES['process_song']
+    # 详情请求不计入耗时，只测量下载、获取歌词和嵌入元数据
+    songs = [get_song_details(song_id, quality=max_quality(song_id))
+             for song_id in range(start, start + args.songs)]
+    latencies, failures, total = _timed(
+        lambda details: details and engine.process_song(details, download_dir), songs)
+    result = summarize(latencies, total, nbytes=len(server.audio) * (len(songs) - failures), failures=failures)
+    result['stages'] = engine.recorder.summary()
+    return result
+
+
+def bench_batch_download(server, args, work_dir):
+    from PySide6.QtCore import Qt
+    from core.downloader import BatchDownloadThread
+    start = _ID_RANGES['batch_download']
+    playlist = [_song_info(song_id) for song_id in range(start, start + args.songs)]
+    thread = BatchDownloadThread(playlist, str(Path(work_dir) / 'batch_download'), quality=args.quality)
+    finished = []
+    # 完成信号在嵌入线程中发出，没有事件循环，需要直接连接
+    thread.single_finished_signal.connect(lambda title: finished.append(time.perf_counter()),
+                                          Qt.DirectConnection)
+    started = time.perf_counter()
+    thread.run()
+    total = time.perf_counter() - started
+    # 相邻两首完成的间隔作为每首的延迟
+    latencies = [end - begin for begin, end in zip([started] + finished, finished)]
+    failures = len(playlist) - len(finished)
+    result = summarize(latencies, total, nbytes=len(server.audio) * len(finished), failures=failures)
+    result['stages'] = thread.engine.recorder.summary()
+    return result
+
+
+BENCHMARKS = {
+    'search': bench_search,
+    'details_robust': bench_details_robust,
+    'playlist_import': bench_playlist_import,
+    'process_song': bench_process_song,
+    'batch_download': bench_batch_download,
+}
+
+
+def git_revision():
+    """当前提交及工作区是否有未提交的修改，不在git仓库中时返回None"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return {'commit': commit, 'dirty': bool(dirty)}
+
+
+def compare(current, baseline, threshold):
+    """对比两次结果，返回 (报告行列表, 回退的指标数)"""
+    lines = []
+    regressions = 0
+    for name, result in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            lines.append(f"{name}: 基准结果中没有该场景")
+            continue
+        for metric, better in COMPARED_METRICS.items():
+            if metric not in result or not base.get(metric):
+                continue
+            change = (result[metric] - base[metric]) / base[metric]
+            worse = change > threshold if better == 'lower' else change < -threshold
+            regressions += worse
+            marker = '  <-- 回退' if worse else ''
+            lines.append(f"{name:16} {metric:10} {base[metric]:>10} -> {result[metric]:>10} "
+                         f"({change:+.1%}){marker}")
+    return lines, regressions
+
+
+def _isolate_home(path):
+    """让下载库索引、封面缓存等应用数据写入临时目录"""
+    os.environ['HOME'] = path
+    os.environ['USERPROFILE'] = path
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.api_bench',
+                                     description="在本地假服务器上测量搜索、详情、歌单导入和下载的性能")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"逗号分隔的场景（默认全部）：{', '.join(SCENARIOS)}")
+    parser.add_argument('--iterations', type=int, default=50, help="搜索和详情的请求次数（默认 50）")
+    parser.add_argument('--songs', type=int, default=20, help="下载场景的歌曲数（默认 20）")
+    parser.add_argument('--quality', type=int, default=14, help="请求的音质等级（默认 14，会触发音质协商）")
+    parser.add_argument('--latency', type=float, default=0.0, help="每个请求的延迟，秒（默认 0）")
+    parser.add_argument('--jitter', type=float, default=0.0, help="延迟的随机抖动上限，秒（默认 0）")
+    parser.add_argument('--bandwidth', type=float, default=0.0, help="每个连接的带宽，字节/秒（默认不限）")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="返回503的请求比例（默认 0）")
+    parser.add_argument('--audio-size', type=int, default=4 * 1024 * 1024, help="音频文件大小，字节（默认 4MB）")
+    parser.add_argument('--cover-size', type=int, default=500, help="封面边长，像素（默认 500）")
+    parser.add_argument('--format', dest='audio_format', choices=('mp3', 'flac'), default='mp3',
+                        help="音频格式（默认 mp3）")
+    parser.add_argument('--playlist-size', type=int, default=300, help="导入场景的歌单歌曲数（默认 300）")
+    parser.add_argument('--seed', type=int, default=0, help="随机数种子（延迟抖动、错误注入）")
+    parser.add_argument('--output', help="将 JSON 结果写入文件（默认输出到标准输出）")
+    parser.add_argument('--compare', metavar='BASELINE', help="与之前保存的 JSON 结果对比")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="对比时视为回退的变化比例（默认 0.10）；存在回退时退出码为 1")
+    args = parser.parse_args(argv)
+    args.scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in args.scenarios if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"未知的场景: {', '.join(unknown)}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = FakeServerConfig(latency=args.latency, jitter=args.jitter, bandwidth=args.bandwidth,
+                              error_rate=args.error_rate, audio_size=args.audio_size,
+                              cover_size=args.cover_size, audio_format=args.audio_format,
+                              playlist_size=args.playlist_size, seed=args.seed)
+
+    with tempfile.TemporaryDirectory(prefix='music-bench-') as work_dir:
+        _isolate_home(work_dir)
+        # 导入和下载线程是 QThread，在当前线程中直接调用 run()，只需要一个 QCoreApplication
+        if {'playlist_import', 'batch_download'} & set(args.scenarios):
+            from PySide6.QtCore import QCoreApplication
+            app = QCoreApplication.instance() or QCoreApplication([])
+
+        results = {}
+        with FakeServer(config) as server, server.patched():
+            from core.api import search_music
+            search_music(song_title(0))  # 预热连接
+            for name in args.scenarios:
+                server.reset_stats()
+                print(f"运行 {name}...", file=sys.stderr)
+                results[name] = BENCHMARKS[name](server, args, work_dir)
+                results[name]['server'] = server.stats()
+
+    report = {
+        'meta': {
+            'git': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'config': config.as_dict(),
+            'iterations': args.iterations,
+            'songs': args.songs,
+            'quality': args.quality,
+        },
+        'results': results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding='utf-8')
+        for name, result in results.items():
+            print(f"{name:16} {result['ops_per_s']:>9} 次/s  p50 {result['p50_ms']:>9} ms  "
+                  f"p95 {result['p95_ms']:>9} ms  失败 {result['failures']}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding='utf-8'))
+        lines, regressions = compare(report, baseline, args.threshold)
+        print('\n'.join(lines), file=sys.stderr)
+        if regressions:
+            print(f"{regressions} 项指标回退超过 {args.threshold:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""歌词解析、当前行定位和歌词HTML构建（每次切歌或歌词行变化时在UI线程中执行）"""
+import pytest
+
+from benchmarks.conftest import LYRIC_LINES, make_lrc
+from utils.lrc_parser import (parse_lrc_line, parse_lrc, find_lyric_line, build_lyrics_html,
+                              build_highlighted_lyrics_html)
+
+HIGHLIGHT_STYLE = "color: #89b4fa; font-weight: bold; font-size: 16px;"
+
+
+@pytest.fixture(scope='module')
+def lrc_text():
+    return make_lrc()
+
+
+@pytest.fixture(scope='module')
+def lyrics(lrc_text):
+    return parse_lrc(lrc_text)
+
+
+@pytest.mark.benchmark(group='lrc-parse')
+def test_parse_lrc_line(benchmark, lrc_text):
+    lines = lrc_text.split('\n')
+    parsed = benchmark(lambda: [parse_lrc_line(line) for line in lines])
+    assert sum(1 for item in parsed if item and item[1]) == LYRIC_LINES
+
+
+@pytest.mark.benchmark(group='lrc-parse')
+def test_parse_lrc(benchmark, lrc_text):
+    assert len(benchmark(parse_lrc, lrc_text)) == LYRIC_LINES
+
+
+@pytest.mark.benchmark(group='lyrics-find-line')
+def test_find_lyric_line(benchmark, lyrics):
+    # 播放定时器每次触发时定位一次，这里一次覆盖整首歌的所有位置
+    positions = range(0, lyrics[-1]['time'] + 3000, 250)
+    indexes = benchmark(lambda: [find_lyric_line(lyrics, position) for position in positions])
+    assert indexes[0] == 0 and indexes[-1] == len(lyrics) - 1
+
+
+@pytest.mark.benchmark(group='lyrics-html')
+def test_build_lyrics_html(benchmark, lyrics):
+    assert benchmark(build_lyrics_html, lyrics).startswith('<center>')
+
+
+@pytest.mark.benchmark(group='lyrics-html')
+def test_build_highlighted_lyrics_html(benchmark, lyrics):
+    html = benchmark(build_highlighted_lyrics_html, lyrics, len(lyrics) // 2, HIGHLIGHT_STYLE)
+    assert html.count('name="current"') == 1
+
+
+@pytest.mark.benchmark(group='lyrics-view')
+def test_update_lyrics_highlight(benchmark, qapp, lyrics):
+    """与 MainWindow._update_lyrics_highlight 相同：重建高亮HTML、设置到歌词视图并滚动到当前行"""
+    from ui.components.playlist_widget import PlaylistWidget
+    widget = PlaylistWidget()
+    widget.resize(400, 600)
+    widget.show_lyrics_view()
+    current = iter(range(len(lyrics)))
+
+    def update():
+        widget.update_lyrics(build_highlighted_lyrics_html(lyrics, next(current), HIGHLIGHT_STYLE))
+        widget.scroll_to_lyric_line('current')
+
+    benchmark.pedantic(update, rounds=50)
+    widget.deleteLater()
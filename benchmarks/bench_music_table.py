@@ -0,0 +1,53 @@
+"""MusicTable 的逐行/批量填充和清除播放指示（离屏Qt）"""
+import pytest
+
+from benchmarks.conftest import make_songs
+
+TABLE_SIZES = (1000, 10000)
+
+
+@pytest.fixture
+def table(qapp):
+    from ui.components.music_table import SearchResultTable
+    table = SearchResultTable()
+    yield table
+    table.deleteLater()
+
+
+def _rows(size):
+    return [(i + 1, song['title'], song['singer']) for i, song in enumerate(make_songs(size))]
+
+
+@pytest.mark.benchmark(group='table-populate')
+@pytest.mark.parametrize('size', TABLE_SIZES)
+def test_add_song(benchmark, table, size):
+    rows = _rows(size)
+
+    def populate():
+        table.clear()
+        for row, items in enumerate(rows):
+            table.add_song(row, *items)
+
+    benchmark.pedantic(populate, rounds=3)
+    assert table.rowCount() == size
+
+
+@pytest.mark.benchmark(group='table-populate')
+@pytest.mark.parametrize('size', TABLE_SIZES)
+def test_add_songs(benchmark, table, size):
+    rows = _rows(size)
+
+    def populate():
+        table.clear()
+        table.add_songs(0, rows)
+
+    benchmark.pedantic(populate, rounds=3)
+    assert table.rowCount() == size
+
+
+@pytest.mark.benchmark(group='table-indicators')
+@pytest.mark.parametrize('size', TABLE_SIZES)
+def test_clear_all_indicators(benchmark, table, size):
+    table.add_songs(0, _rows(size))
+    table.set_playing_indicator(size // 2)
+    benchmark(table.clear_all_indicators)
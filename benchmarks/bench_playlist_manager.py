@@ -0,0 +1,71 @@
+"""PlaylistManager 在 1k/10k/100k 首歌曲规模下的加载、保存和添加歌曲"""
+import itertools
+import shutil
+
+import pytest
+
+from benchmarks.conftest import PLAYLIST_SIZES
+from core.playlist_manager import PlaylistManager
+
+
+@pytest.fixture
+def manager_factory(playlist_files, tmp_path):
+    managers = []
+
+    def create(size):
+        # 复制一份，保存时不会改动其他用例使用的文件
+        path = tmp_path / f"playlists_{size}.json"
+        shutil.copyfile(playlist_files[size], path)
+        manager = PlaylistManager(path)
+        # 不让后台定时器在计时期间写文件
+        manager._writer.delay = 3600
+        managers.append(manager)
+        return manager
+
+    yield create
+    for manager in managers:
+        manager.flush()
+
+
+@pytest.mark.benchmark(group='playlist-load')
+@pytest.mark.parametrize('size', PLAYLIST_SIZES)
+def test_load(benchmark, manager_factory, size):
+    manager = manager_factory(size)
+    playlists = benchmark(manager.load)
+    assert len(playlists['默认列表']) == size
+
+
+@pytest.mark.benchmark(group='playlist-save')
+@pytest.mark.parametrize('size', PLAYLIST_SIZES)
+def test_save(benchmark, manager_factory, size):
+    manager = manager_factory(size)
+
+    def save():
+        manager.save()
+        return manager.flush()
+
+    assert benchmark(save)
+
+
+@pytest.mark.benchmark(group='playlist-add-song')
+@pytest.mark.parametrize('size', PLAYLIST_SIZES)
+def test_add_song(benchmark, manager_factory, size):
+    manager = manager_factory(size)
+    # 每轮添加一首新歌（重复检查要遍历整个列表）
+    new_ids = itertools.count(size)
+
+    def song():
+        song_id = next(new_ids)
+        return ('默认列表', {'id': str(song_id), 'title': f"New Song {song_id}", 'singer': 'New Singer'}), {}
+
+    benchmark.pedantic(manager.add_song, setup=song, rounds=200)
+    assert len(manager.get_playlist_songs('默认列表')) > size
+
+
+@pytest.mark.benchmark(group='playlist-add-song')
+@pytest.mark.parametrize('size', PLAYLIST_SIZES)
+def test_add_duplicate_song(benchmark, manager_factory, size):
+    manager = manager_factory(size)
+    # 最坏情况：与列表最后一首重复，遍历完整个列表才能确定
+    last = dict(manager.get_playlist_songs('默认列表')[-1])
+    assert benchmark(manager.add_song, '默认列表', last) is False
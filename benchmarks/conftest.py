@@ -0,0 +1,48 @@
+"""
+微基准测试的公共夹具：离屏Qt应用、生成指定规模的歌曲和歌词数据。
+"""
+import json
+import os
+
+import pytest
+
+# 表格和歌词视图在离屏平台上创建，不需要显示器
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+PLAYLIST_SIZES = (1000, 10000, 100000)
+LYRIC_LINES = 2000
+
+
+def make_songs(count, offset=0):
+    """生成 count 首互不重复的歌曲（与播放列表文件中的格式相同）"""
+    return [{'id': str(i), 'title': f"Song {i}", 'singer': f"Singer {i % 500}", 'album': f"Album {i // 12}"}
+            for i in range(offset, offset + count)]
+
+
+def make_lrc(lines=LYRIC_LINES):
+    """生成长歌词文本，时间戳间隔 1.5 秒，夹杂少量元信息行和空行"""
+    text = ['[ti:Benchmark]', '[ar:Singer]']
+    for i in range(lines):
+        ms = i * 1500
+        text.append(f"[{ms // 60000:02d}:{ms // 1000 % 60:02d}.{ms % 1000 // 10:02d}]第 {i} 行歌词 lyric line {i}")
+        if i % 50 == 0:
+            text.append('')
+    return '\n'.join(text)
+
+
+@pytest.fixture(scope='session')
+def qapp():
+    from PySide6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture(scope='session')
+def playlist_files(tmp_path_factory):
+    """各规模的播放列表文件 {歌曲数: 路径}"""
+    directory = tmp_path_factory.mktemp('playlists')
+    files = {}
+    for size in PLAYLIST_SIZES:
+        path = directory / f"playlists_{size}.json"
+        path.write_text(json.dumps({'默认列表': make_songs(size)}, indent=4, ensure_ascii=False), encoding='utf-8')
+        files[size] = path
+    return files
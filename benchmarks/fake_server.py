@@ -0,0 +1,297 @@
+"""
+基准测试用的本地假服务器，模拟 api.vkeys.cn（搜索、详情、歌词）、QQ 音乐歌单接口以及音频/封面 CDN。
+
+曲库是确定性生成的：歌曲 i 的歌名为 "Song i"，歌手为 "Singer i%50"，可用的最高音质在
+MAX_QUALITIES 中轮换，请求更高音质时详情中不含播放地址（与真实接口一致，用于触发音质协商）。
+可以配置每个请求的延迟、下载带宽、错误率（返回503，会被 get_session 的重试策略重试）以及文件大小。
+
+用法:
+    with FakeServer(FakeServerConfig(latency=0.02)) as server:
+        with server.patched():      # 将 core.api / core.fetch_playlist 的接口地址指向本服务器
+            ...
+        print(server.stats())
+"""
+import io
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+API_PATH = '/v2/music/tencent'
+LYRIC_PATH = '/v2/music/tencent/lyric'
+PLAYLIST_PATH = '/qzone/fcg-bin/fcg_ucc_getcdinfo_byids_cp.fcg'
+
+# 各歌曲可用的最高音质（按歌曲ID轮换）
+MAX_QUALITIES = (14, 11, 10, 9, 8)
+SINGER_COUNT = 50
+# 一个 128kbps/44.1kHz 的 MPEG-1 Layer III 帧（mutagen 可以识别）
+_MP3_FRAME = b'\xff\xfb\x90\x00' + bytes(413)
+_STREAM_CHUNK = 16 * 1024
+
+
+@dataclass
+class FakeServerConfig:
+    """假服务器的参数"""
+    latency: float = 0.0           # 每个请求的额外延迟（秒）
+    jitter: float = 0.0            # 延迟的随机抖动上限（秒）
+    bandwidth: float = 0.0         # 每个连接的下载带宽（字节/秒，0 表示不限）
+    error_rate: float = 0.0        # 返回503的请求比例
+    audio_size: int = 4 * 1024 * 1024
+    cover_size: int = 500          # 封面边长（像素）；未安装 Pillow 时为字节数的千分之一
+    audio_format: str = 'mp3'      # mp3 或 flac
+    search_results: int = 20       # 每次搜索返回的结果数
+    playlist_size: int = 1000      # 歌单中的歌曲数
+    seed: int = 0
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def song_title(song_id):
+    return f"Song {song_id}"
+
+
+def song_singer(song_id):
+    return f"Singer {song_id % SINGER_COUNT}"
+
+
+def max_quality(song_id):
+    return MAX_QUALITIES[song_id % len(MAX_QUALITIES)]
+
+
+def _make_audio(config):
+    if config.audio_format == 'flac':
+        # STREAMINFO（最后一个元数据块）后接音频数据
+        streaminfo = (b'\x10\x00\x10\x00' + bytes(6) + (44100 << 12 | 1 << 9 | 15 << 4).to_bytes(4, 'big')
+                      + bytes(20))
+        header = b'fLaC' + bytes((0x80,)) + len(streaminfo).to_bytes(3, 'big') + streaminfo
+        return header + bytes(max(0, config.audio_size - len(header)))
+    count = max(1, config.audio_size // len(_MP3_FRAME))
+    return _MP3_FRAME * count
+
+
+def _make_cover(config):
+    rng = random.Random(config.seed)
+    if Image is not None:
+        # 噪点图片，JPEG 压缩后的大小接近真实封面
+        size = config.cover_size
+        image = Image.frombytes('RGB', (size, size), rng.randbytes(size * size * 3))
+        output = io.BytesIO()
+        image.save(output, format='JPEG', quality=90)
+        return output.getvalue()
+    return b'\xff\xd8\xff\xe0' + rng.randbytes(config.cover_size * 1000)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # 响应头和响应体分两次写入，关闭 Nagle 算法以免与延迟确认叠加出约40ms的额外延迟
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def fake(self):
+        return self.server.fake
+
+    def _send(self, body, content_type='application/json', status=200, head=False):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if head:
+            return
+        bandwidth = self.fake.config.bandwidth
+        if not bandwidth or len(body) <= _STREAM_CHUNK:
+            self.wfile.write(body)
+        else:
+            # 按带宽限制分块发送
+            started = time.monotonic()
+            for offset in range(0, len(body), _STREAM_CHUNK):
+                self.wfile.write(body[offset:offset + _STREAM_CHUNK])
+                delay = started + (offset + _STREAM_CHUNK) / bandwidth - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+        self.fake.count('bytes_sent', len(body))
+
+    def _send_json(self, data):
+        self._send(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def do_GET(self, head=False):
+        url = urllib.parse.urlparse(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        endpoint = self.fake.endpoint_of(url.path, query)
+        self.fake.count(endpoint)
+
+        delay = self.fake.delay()
+        if delay:
+            time.sleep(delay)
+        if self.fake.should_fail():
+            self.fake.count('errors_injected')
+            return self._send(b'{"code": 503}', status=503, head=head)
+
+        if endpoint == 'audio':
+            content_type = 'audio/flac' if self.fake.config.audio_format == 'flac' else 'audio/mpeg'
+            return self._send(self.fake.audio, content_type, head=head)
+        if endpoint == 'cover':
+            return self._send(self.fake.cover, 'image/jpeg', head=head)
+        if endpoint == 'search':
+            return self._send_json(self.fake.search(query))
+        if endpoint == 'details':
+            return self._send_json(self.fake.details(query))
+        if endpoint == 'lyric':
+            return self._send_json(self.fake.lyric(query))
+        if endpoint == 'playlist':
+            return self._send_json(self.fake.playlist(query))
+        self._send(b'{"code": 404}', status=404, head=head)
+
+
+class FakeServer:
+    """在后台线程中运行的假服务器"""
+
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        self.config = config or FakeServerConfig()
+        self._random = random.Random(self.config.seed)
+        self._random_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {}
+        self.audio = _make_audio(self.config)
+        self.cover = _make_cover(self.config)
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='fake-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @contextmanager
+    def patched(self):
+        """将各模块中的接口地址替换为本服务器的地址"""
+        from core import api, fetch_playlist
+        saved = api.BASE_URL, api.LYRIC_URL, fetch_playlist.PLAYLIST_URL
+        api.BASE_URL = self.base_url + API_PATH
+        api.LYRIC_URL = self.base_url + LYRIC_PATH
+        fetch_playlist.PLAYLIST_URL = self.base_url + PLAYLIST_PATH
+        try:
+            yield self
+        finally:
+            api.BASE_URL, api.LYRIC_URL, fetch_playlist.PLAYLIST_URL = saved
+
+    # --- 统计 ---
+
+    def count(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] = self._stats.get(key, 0) + amount
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats.clear()
+
+    def delay(self):
+        config = self.config
+        if not config.jitter:
+            return config.latency
+        with self._random_lock:
+            return config.latency + self._random.uniform(0, config.jitter)
+
+    def should_fail(self):
+        if not self.config.error_rate:
+            return False
+        with self._random_lock:
+            return self._random.random() < self.config.error_rate
+
+    # --- 接口 ---
+
+    @staticmethod
+    def endpoint_of(path, query):
+        if path.startswith('/audio/'):
+            return 'audio'
+        if path.startswith('/cover/'):
+            return 'cover'
+        if path == LYRIC_PATH:
+            return 'lyric'
+        if path == PLAYLIST_PATH:
+            return 'playlist'
+        if path == API_PATH:
+            return 'search' if 'word' in query else 'details'
+        return 'not_found'
+
+    def _song(self, song_id):
+        return {'id': song_id, 'song': song_title(song_id), 'singer': song_singer(song_id),
+                'album': f"Album {song_id // 10}"}
+
+    def search(self, query):
+        """关键词中含 "Song N" 时第一条结果为歌曲 N，其余为同一歌手的其他歌曲"""
+        count = int(query.get('num') or self.config.search_results)
+        page = int(query.get('page') or 1)
+        match = re.search(r'Song (\d+)', query.get('word', ''))
+        target = int(match.group(1)) if match else 0
+        results = [target] if match and page == 1 else []
+        start = target + SINGER_COUNT * ((page - 1) * count + 1)
+        while len(results) < count:
+            results.append(start)
+            start += SINGER_COUNT
+        return {'code': 200, 'data': [self._song(song_id) for song_id in results]}
+
+    def details(self, query):
+        song_id = int(query.get('id') or 0)
+        quality = int(query.get('quality') or 9)
+        data = self._song(song_id)
+        data['songID'] = song_id
+        data['cover'] = f"{self.base_url}/cover/{song_id // 10}.jpg"
+        if quality <= max_quality(song_id):
+            data['url'] = f"{self.base_url}/audio/{song_id}.{self.config.audio_format}"
+            data['quality'] = quality
+        else:
+            data['url'] = ''
+        return {'code': 200, 'data': data}
+
+    def lyric(self, query):
+        song_id = query.get('id', '')
+        lines = '\n'.join(f"[{i // 60:02d}:{i % 60:02d}.00]Song {song_id} line {i}" for i in range(0, 240, 4))
+        return {'code': 200, 'data': {'lrc': lines, 'yrc': '', 'trans': '', 'roma': ''}}
+
+    def playlist(self, query):
+        begin = int(query.get('song_begin') or 0)
+        num = int(query.get('song_num') or self.config.playlist_size)
+        total = self.config.playlist_size
+        songs = [{'songname': song_title(song_id), 'singer': [{'name': song_singer(song_id)}],
+                  'albumname': f"Album {song_id // 10}", 'songmid': f"mid{song_id}"}
+                 for song_id in range(begin, min(begin + num, total))]
+        return {'code': 0, 'cdlist': [{'dissname': f"Playlist {query.get('disstid')}",
+                                       'total_song_num': total, 'songlist': songs}]}
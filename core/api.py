@@ -1,14 +1,36 @@
+import json
 import requests
 import urllib.parse
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from core.matcher import best_match, MATCH_THRESHOLD, SAME_SONG_THRESHOLD
+from core.song import SongRecord
+from core.quality import QualityNegotiator
+from core import metrics, timing
+
 # 新API端点（腾讯QQ音乐平台）
 BASE_URL = "https://api.vkeys.cn/v2/music/tencent"
 LYRIC_URL = "https://api.vkeys.cn/v2/music/tencent/lyric"
 
 # 创建全局Session用于连接重用和统一配置
 _session = None
+_negotiator = None
+
+
+class CountingRetry(Retry):
+    """每次重试时把原因（状态码或异常类型）计入 core.metrics 的 http_retries_total"""
+
+    def increment(self, method=None, url=None, response=None, error=None, *args, **kwargs):
+        # 重试次数用尽时 super().increment 抛出 MaxRetryError，不计为一次重试
+        retry = super().increment(method, url, response, error, *args, **kwargs)
+        if response is not None and response.status:
+            reason = str(response.status)
+        else:
+            reason = type(error).__name__ if error is not None else 'unknown'
+        metrics.inc('http_retries_total', reason=reason)
+        return retry
+
 
 def get_session():
     """获取或创建全局Session实例，配置连接重用、超时和重试策略"""
@@ -17,7 +39,7 @@ def get_session():
         _session = requests.Session()
 
         # 配置重试策略
-        retry_strategy = Retry(
+        retry_strategy = CountingRetry(
             total=3,  # 最多重试3次
             backoff_factor=0.5,  # 重试间隔指数退避
             status_forcelist=[429, 500, 502, 503, 504],  # 这些状态码会触发重试
@@ -40,43 +62,90 @@ def get_session():
 
     return _session
 
-def request_api(url, params):
+def request_api(url, params, cancel_event=None, stage='api'):
     """
     发送API请求并处理基本错误
     使用Session进行连接重用和统一配置
+
+    Args:
+        url: 接口地址
+        params: 查询参数
+        cancel_event: 可选的 threading.Event。传入时以流式方式读取响应体，
+            每个数据块之间检查取消标志，一旦被设置立即关闭底层连接并返回None
+        stage: 耗时记录（core.timing）中的阶段名，如 'search'、'details'、'lyric'
+
+    Returns:
+        解析后的JSON数据，失败或被取消时返回None
     """
+    if cancel_event is not None and cancel_event.is_set():
+        return None
+
+    with timing.span(stage) as span:
+        return _request_api(url, params, cancel_event, span)
+
+def _request_api(url, params, cancel_event, span):
     try:
         session = get_session()
         # URL编码参数
         encoded_params = urllib.parse.urlencode(params, quote_via=urllib.parse.quote)
         full_url = f"{url}?{encoded_params}"
 
-        response = session.get(full_url, timeout=(5, 15))
-        response.raise_for_status()  # 抛出HTTP错误异常
-        return response.json()
+        if cancel_event is None:
+            response = session.get(full_url, timeout=(5, 15))
+            response.raise_for_status()  # 抛出HTTP错误异常
+            span.add_bytes(len(response.content))
+            return response.json()
+
+        # 可取消的请求：逐块读取，取消时退出with块会关闭连接而不是读完剩余数据
+        with session.get(full_url, timeout=(5, 15), stream=True) as response:
+            response.raise_for_status()
+            chunks = []
+            for chunk in response.iter_content(chunk_size=8192):
+                if cancel_event.is_set():
+                    span.fail('cancelled')
+                    return None
+                chunks.append(chunk)
+                span.add_bytes(len(chunk))
+        return json.loads(b''.join(chunks))
     except requests.exceptions.Timeout:
+        span.fail('timeout')
         print("API请求超时，请检查网络连接")
         return None
     except requests.exceptions.ConnectionError:
+        if cancel_event is not None and cancel_event.is_set():
+            span.fail('cancelled')
+            return None
+        span.fail('connection_error')
         print("网络连接错误，请检查网络设置")
         return None
     except (requests.exceptions.RequestException, ValueError) as e:
+        if cancel_event is not None and cancel_event.is_set():
+            span.fail('cancelled')
+            return None
+        span.fail('http_error' if isinstance(e, requests.exceptions.HTTPError) else 'invalid_response')
         print(f"API请求或JSON解析失败: {e}")
         return None
 
-def search_music(query):
+def search_music(query, page=None, num=None, cancel_event=None):
     """
     根据关键词搜索歌曲列表
 
     Args:
         query: 搜索关键词
+        page: 页码（从1开始），不传则使用接口默认的第一页
+        num: 每页数量，不传则使用接口默认值
+        cancel_event: 可选的取消标志，参见 request_api
 
     Returns:
-        歌曲列表，每首歌包含: id, title, singer, album
+        SongRecord 列表，每首歌包含: id, title, singer, album
         返回空列表如果搜索失败
     """
     params = {'word': query}
-    data = request_api(BASE_URL, params)
+    if page is not None:
+        params['page'] = page
+    if num is not None:
+        params['num'] = num
+    data = request_api(BASE_URL, params, cancel_event=cancel_event, stage='search')
 
     if data and isinstance(data, dict) and data.get('code') == 200:
         song_list = data.get('data', [])
@@ -90,30 +159,26 @@ def search_music(query):
                 album = item.get('album', '')
 
                 if song_id:
-                    songs.append({
-                        'id': song_id,
-                        'title': title,
-                        'singer': singer,
-                        'album': album
-                    })
+                    songs.append(SongRecord(song_id, title, singer, album))
             return songs
 
     return []
 
-def get_song_details(song_id, quality=9):
+def get_song_details(song_id, quality=9, cancel_event=None):
     """
     根据歌曲ID获取详细信息（包括播放地址、封面等）
 
     Args:
         song_id: 歌曲ID
         quality: 音质等级 (0-14)，默认9（HQ高音质增强）
+        cancel_event: 可选的取消标志，参见 request_api
 
     Returns:
         歌曲详细信息字典，包含url、cover等
         返回None如果获取失败
     """
     params = {'id': song_id, 'quality': quality}
-    data = request_api(BASE_URL, params)
+    data = request_api(BASE_URL, params, cancel_event=cancel_event, stage='details')
 
     if data and isinstance(data, dict) and data.get('code') == 200:
         details = data.get('data')
@@ -122,57 +187,101 @@ def get_song_details(song_id, quality=9):
 
     return None
 
-def get_song_details_robust(song_info, quality=9):
+def get_negotiator():
+    """获取全局的音质协商器（各下载线程共享探测线程池和可用性缓存）"""
+    global _negotiator
+    if _negotiator is None:
+        _negotiator = QualityNegotiator(get_song_details)
+    return _negotiator
+
+def _get_details(song_id, quality, cancel_event, negotiate):
+    if not negotiate:
+        return get_song_details(song_id, quality=quality, cancel_event=cancel_event)
+    details, level = get_negotiator().negotiate(song_id, quality, cancel_event=cancel_event)
+    if details:
+        # 记录实际得到的音质，调用方据此提示音质降级
+        details['quality_level'] = level
+        details['requested_quality'] = quality
+    return details
+
+def get_song_details_robust(song_info, quality=9, cancel_event=None, negotiate=False):
     """
     健壮地获取歌曲详情
 
-    主策略：使用 "title singer" 重新搜索，然后精确匹配 title 和 singer
+    主策略：使用 "title singer" 重新搜索，然后用 core.matcher 打分选出同一首歌
     备用策略：直接使用 song_info 中的 id 获取详情
 
     Args:
         song_info: 包含 id, title, singer 的歌曲信息字典
         quality: 音质等级 (0-14)，默认9
+        cancel_event: 可选的取消标志，被设置后不再发起后续请求
+        negotiate: 为True时请求的音质不可用会自动降级到音质阶梯中可用的最高音质，
+                   实际音质记录在返回值的 'quality_level' 中
 
     Returns:
         歌曲详细信息字典或None
     """
+    with timing.span('details_robust') as span:
+        details = _get_song_details_robust(song_info, quality, cancel_event, negotiate)
+        if details is None:
+            span.fail('cancelled' if cancel_event is not None and cancel_event.is_set() else 'not_found')
+        return details
+
+def _get_song_details_robust(song_info, quality, cancel_event, negotiate):
     # --- 主策略：重新搜索匹配 ---
     try:
         new_query = f"{song_info['title']} {song_info['singer']}"
-        search_results = search_music(new_query)
+        search_results = search_music(new_query, cancel_event=cancel_event)
 
         if search_results:
-            # 标准化比较（去除空格、转小写）
-            target_title = song_info['title'].replace(' ', '').lower()
-            target_singer = song_info['singer'].replace(' ', '').lower()
-
-            for result_song in search_results:
-                result_title = result_song['title'].replace(' ', '').lower()
-                result_singer = result_song['singer'].replace(' ', '').lower()
-
-                # 精确匹配 title 和 singer
-                if result_title == target_title and result_singer == target_singer:
-                    # 找到可靠的匹配！
-                    details = get_song_details(result_song['id'], quality=quality)
-                    if details:
-                        return details
+            # 模糊打分，只接受足以认定为同一首歌（同一版本）的结果
+            best, _ = best_match(song_info, search_results, min_confidence=SAME_SONG_THRESHOLD)
+            if best:
+                # 找到可靠的匹配！
+                details = _get_details(best['id'], quality, cancel_event, negotiate)
+                if details:
+                    return details
     except Exception as e:
         # 静默失败，继续使用备用策略
         print(f"主策略失败: {e}")
         pass
 
+    if cancel_event is not None and cancel_event.is_set():
+        return None
+
     # --- 备用策略：直接使用ID ---
     if 'id' in song_info and song_info['id']:
-        return get_song_details(song_info['id'], quality=quality)
+        return _get_details(song_info['id'], quality, cancel_event, negotiate)
 
     return None
 
-def get_lyric(song_id):
+def match_song(title, singer, album='', cancel_event=None):
+    """
+    为只有歌名和歌手的歌曲（如QQ歌单中的歌曲）搜索对应的可用歌曲
+
+    Args:
+        title: 歌名
+        singer: 歌手
+        album: 专辑（可选，用于区分同名歌曲）
+        cancel_event: 可选的取消标志，参见 request_api
+
+    Returns:
+        匹配到的歌曲信息字典（包含id），没有足够接近的结果时返回None
+    """
+    search_results = search_music(f"{title} {singer}", cancel_event=cancel_event)
+    if search_results:
+        best, _ = best_match({'title': title, 'singer': singer, 'album': album or ''}, search_results,
+                             min_confidence=MATCH_THRESHOLD)
+        return best
+    return None
+
+def get_lyric(song_id, cancel_event=None):
     """
     获取歌曲歌词（包括普通歌词、逐字歌词、翻译、音译）
 
     Args:
         song_id: 歌曲ID
+        cancel_event: 可选的取消标志，参见 request_api
 
     Returns:
         歌词字典，包含:
@@ -183,7 +292,7 @@ def get_lyric(song_id):
         返回None如果获取失败
     """
     params = {'id': song_id}
-    data = request_api(LYRIC_URL, params)
+    data = request_api(LYRIC_URL, params, cancel_event=cancel_event, stage='lyric')
 
     if data and isinstance(data, dict) and data.get('code') == 200:
         lyric_data = data.get('data')
@@ -0,0 +1,460 @@
+"""
+无界面的命令行批量下载工具，适合在服务器或定时任务中使用。
+
+用法示例:
+    python -m core.cli download --playlist 默认列表 --quality 10 --jobs 8
+    python -m core.cli download --qq-playlist 9521850610 --output ~/Music --progress json
+    python -m core.cli sync --playlist 我的歌单 --qq-playlist 9521850610 --download
+    python -m core.cli library --output ~/Music/Downloads
+    python -m core.cli daemon --jobs 4 --metrics
+    python -m core.cli submit --playlist 默认列表 --quality 10
+
+进度以 JSON Lines（--progress json）或可读文本输出到标准输出。
+daemon 子命令运行常驻下载守护进程（任务持久化，重启后继续），submit 子命令向其提交任务。
+--metrics-port / --metrics-textfile 以 Prometheus 文本格式导出运行指标（参见 core.metrics）。
+退出码: 0 全部成功；1 部分歌曲失败；2 参数错误或没有可下载的歌曲；130 被中断。
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from core import metrics
+from core.api import get_song_details_robust, match_song, get_negotiator
+from core.cover_cache import DEFAULT_MAX_DIMENSION, get_cover_cache
+from core.daemon import DEFAULT_PORT, DaemonClient, run_daemon
+from core.engine import DownloadEngine
+from core.library_index import get_library
+from core.library_scanner import scan_library
+from core.fetch_playlist import fetch_qq_playlist, fetch_qq_playlists, parse_playlist_ids
+from core.pipeline import EmbedStage, finish_song
+from core.playlist_manager import PlaylistManager
+from core.playlist_sync import SyncStateStore, plan_sync, apply_sync
+from core.quality import DEFAULT_LADDER, QUALITY_NAMES
+from core.song import key_of
+from core.timing import format_summary, get_recorder
+
+EXIT_OK = 0
+EXIT_PARTIAL_FAILURE = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+# 与 ConfigManager.get_quality 的有效值保持一致
+VALID_QUALITIES = (0, 4, 8, 9, 10, 11, 12, 13, 14)
+DEFAULT_QUALITY = 9
+DEFAULT_DOWNLOAD_DIR = Path.home() / "Music" / "Downloads"
+COVER_HELP = f"嵌入封面的最大边长，超过时缩小（需要 Pillow，0 表示保持原图，默认 {DEFAULT_MAX_DIMENSION}）"
+LADDER_HELP = f"请求音质不可用时依次尝试的音质阶梯，逗号分隔（默认 {','.join(map(str, DEFAULT_LADDER))}）"
+TIMINGS_HELP = "将每个阶段（搜索、详情、音频传输、封面、歌词、嵌入等）的耗时记录以 JSON Lines 追加到该文件"
+METRICS_PORT_HELP = "在 http://127.0.0.1:端口/metrics 提供 Prometheus 格式的运行指标"
+METRICS_TEXTFILE_HELP = (f"每 {metrics.DEFAULT_EXPORT_INTERVAL} 秒把 Prometheus 格式的运行指标写入该文件"
+                         f"（供 node_exporter 的 textfile collector 读取），退出前再写入一次")
+
+
+class ProgressReporter:
+    """线程安全的进度输出"""
+
+    def __init__(self, mode='text', stream=None):
+        self.mode = mode
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def event(self, event, **fields):
+        with self._lock:
+            if self.mode == 'json':
+                record = {'event': event, 'time': round(time.time(), 3)}
+                record.update(fields)
+                self.stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+            else:
+                self.stream.write(self._format_text(event, fields) + '\n')
+            self.stream.flush()
+
+    def _format_text(self, event, fields):
+        if event == 'start':
+            return f"共 {fields['total']} 首歌曲，并发数 {fields['jobs']}，保存到 {fields['output']}"
+        if event == 'song':
+            prefix = f"[{fields['index']}/{fields['total']}] {fields['title']} - {fields['singer']}"
+            if fields.get('skipped'):
+                return f"{prefix}: 已存在 -> {fields['path']}"
+            if fields['status'] == 'done':
+                quality = fields.get('quality')
+                if quality is not None and quality != fields.get('requested_quality', quality):
+                    prefix += f" [{QUALITY_NAMES.get(quality, quality)}]"
+                return f"{prefix}: 完成 -> {fields['path']}"
+            return f"{prefix}: 失败 ({fields.get('error', '')})"
+        if event == 'status':
+            return f"    {fields['message']}"
+        if event == 'error':
+            return f"错误: {fields['message']}"
+        if event == 'synced':
+            return (f"{fields['playlist']} 同步完成: 新增 {fields['added']}，移除 {fields['removed']}，"
+                    f"未匹配 {fields['unmatched']}（{fields['requests']} 次请求）")
+        if event == 'library':
+            text = (f"{fields['output']}: 共 {fields['total']} 个文件（读取标签 {fields['scanned']}，"
+                    f"移除 {fields['removed']}，未变化 {fields['unchanged']}）")
+            if fields.get('failed'):
+                text += f"，{fields['failed']} 个文件无法读取标签"
+            return text
+        if event == 'submitted':
+            return f"已提交 {fields['count']} 个下载任务到守护进程"
+        if event == 'finish':
+            text = (f"完成: 成功 {fields['succeeded']}，失败 {fields['failed']}，"
+                    f"耗时 {fields['elapsed']:.1f}s")
+            if fields.get('timings'):
+                text += ''.join(f"\n    {line}" for line in format_summary(fields['timings']).splitlines())
+            return text
+        return f"{event}: {fields}"
+
+
+def _load_songs(args, reporter, cancel_event):
+    """根据参数读取待下载的歌曲列表"""
+    if args.qq_playlist:
+        playlist_ids = parse_playlist_ids(args.qq_playlist)
+        if not playlist_ids:
+            reporter.event('error', message=f"无效的QQ歌单ID: {args.qq_playlist}")
+            return None
+        # 歌单分页并发获取，歌曲边到达边匹配
+        songs = []
+        seen = set()
+        raw_songs = fetch_qq_playlists(
+            playlist_ids, cancel_event=cancel_event,
+            on_error=lambda playlist_id, e: reporter.event('error', message=f"获取QQ歌单 {playlist_id} 失败: {e}"))
+        for _, raw_song in raw_songs:
+            key = key_of(raw_song)
+            if key in seen:
+                continue
+            seen.add(key)
+            matched = match_song(raw_song['title'], raw_song['singer'], album=raw_song.get('album', ''),
+                                 cancel_event=cancel_event)
+            if matched:
+                songs.append(matched)
+            else:
+                reporter.event('status', message=f"未找到匹配: {raw_song['title']} - {raw_song['singer']}")
+        if cancel_event.is_set():
+            return None
+        return songs
+
+    manager = PlaylistManager(args.playlists_file)
+    if args.playlist not in manager.get_playlist_names():
+        reporter.event('error', message=f"播放列表不存在: {args.playlist}",
+                       available=manager.get_playlist_names())
+        return None
+    return list(manager.get_playlist_songs(args.playlist))
+
+
+def _download_one(index, total, song_info, args, reporter, cancel_event, embed_stage=None):
+    """下载单首歌曲，返回是否成功
+
+    传入 embed_stage 时，下载完成后嵌入元数据交给嵌入线程，此时返回结果为 bool 的 Future。
+    """
+    label = {'index': index, 'total': total,
+             'title': song_info.get('title', ''), 'singer': song_info.get('singer', '')}
+    status_callback = None
+    if args.verbose:
+        status_callback = lambda message: reporter.event('status', index=index, message=message)
+    library = get_library()
+    engine = DownloadEngine(status_callback=status_callback, cancel_event=cancel_event, library=library)
+
+    # 已下载过的歌曲直接跳过，无需任何网络请求
+    existing_path = library.lookup(song_info, args.output, quality=args.quality)
+    if existing_path:
+        reporter.event('song', status='done', path=existing_path, skipped=True, **label)
+        return True
+
+    details = get_song_details_robust(song_info, quality=args.quality, cancel_event=cancel_event,
+                                      negotiate=True)
+    if not details:
+        reporter.event('song', status='failed', error='无法获取歌曲详情', **label)
+        return False
+    label.update(quality=details.get('quality_level', args.quality), requested_quality=args.quality)
+
+    def report(path):
+        if path:
+            reporter.event('song', status='done', path=path, **label)
+            return True
+        reporter.event('song', status='failed', error='下载失败', **label)
+        return False
+
+    return finish_song(engine, engine.fetch_song(details, args.output), embed_stage, report)
+
+
+def run_download(args):
+    reporter = ProgressReporter(args.progress)
+    cancel_event = threading.Event()
+    started = time.monotonic()
+
+    try:
+        songs = _load_songs(args, reporter, cancel_event)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+    if not songs:
+        reporter.event('error', message="没有可下载的歌曲")
+        return EXIT_USAGE
+
+    total = len(songs)
+    reporter.event('start', total=total, jobs=args.jobs, output=str(args.output))
+
+    succeeded = failed = 0
+    # 下载线程只负责网络传输，嵌入元数据在单独的线程中进行
+    embed_stage = EmbedStage(workers=args.embed_workers, max_pending=args.jobs + args.embed_workers)
+    executor = ThreadPoolExecutor(max_workers=args.jobs)
+
+    def count(ok):
+        nonlocal succeeded, failed
+        if ok:
+            succeeded += 1
+        else:
+            failed += 1
+
+    try:
+        futures = [executor.submit(_download_one, i, total, song, args, reporter, cancel_event,
+                                   embed_stage)
+                   for i, song in enumerate(songs, 1)]
+        embedding = []
+        for future in as_completed(futures):
+            try:
+                ok = future.result()
+            except Exception as e:
+                reporter.event('status', message=f"下载任务异常: {e}")
+                ok = False
+            if isinstance(ok, Future):
+                embedding.append(ok)
+            else:
+                count(ok)
+        for future in embedding:
+            try:
+                count(future.result())
+            except Exception as e:
+                reporter.event('status', message=f"嵌入元数据异常: {e}")
+                count(False)
+    except KeyboardInterrupt:
+        # 通知进行中的下载尽快停止，丢弃尚未开始的任务
+        cancel_event.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+        embed_stage.close()
+        reporter.event('finish', succeeded=succeeded, failed=failed, interrupted=True,
+                       elapsed=time.monotonic() - started, timings=get_recorder().summary())
+        return EXIT_INTERRUPTED
+    executor.shutdown(wait=True)
+    embed_stage.close()
+
+    reporter.event('finish', succeeded=succeeded, failed=failed, interrupted=False,
+                   elapsed=time.monotonic() - started, timings=get_recorder().summary())
+    return EXIT_OK if failed == 0 else EXIT_PARTIAL_FAILURE
+
+
+def run_sync(args):
+    reporter = ProgressReporter(args.progress)
+    manager = PlaylistManager(args.playlists_file)
+    state_store = SyncStateStore(args.state_file)
+    if args.playlist not in manager.get_playlist_names():
+        reporter.event('error', message=f"播放列表不存在: {args.playlist}",
+                       available=manager.get_playlist_names())
+        return EXIT_USAGE
+    source_id = args.qq_playlist or state_store.get_source_id(args.playlist)
+    if not source_id:
+        reporter.event('error', message=f"播放列表 {args.playlist} 尚未关联QQ歌单，请指定 --qq-playlist")
+        return EXIT_USAGE
+
+    cancel_event = threading.Event()
+    try:
+        raw_songs = fetch_qq_playlist(source_id)
+        if not raw_songs:
+            reporter.event('error', message=f"无法获取QQ歌单 {source_id} 或歌单为空")
+            return EXIT_USAGE
+        plan = plan_sync(manager.get_playlist_songs(args.playlist), state_store.get(args.playlist),
+                         source_id, raw_songs, cancel_event=cancel_event,
+                         status_callback=lambda message: reporter.event('status', message=message))
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+
+    apply_sync(manager, args.playlist, plan)
+    if not manager.flush():
+        reporter.event('error', message="保存播放列表失败")
+        return EXIT_PARTIAL_FAILURE
+    state_store.update(args.playlist, plan)
+    reporter.event('synced', playlist=args.playlist, added=len(plan.added), removed=len(plan.removed_ids),
+                   unmatched=len(plan.unmatched), requests=plan.requests)
+
+    if not args.download or not plan.added:
+        return EXIT_OK
+
+    # 只下载本次新增的歌曲
+    total = len(plan.added)
+    failed = 0
+    for i, song in enumerate(plan.added, 1):
+        try:
+            if not _download_one(i, total, song, args, reporter, cancel_event):
+                failed += 1
+        except KeyboardInterrupt:
+            cancel_event.set()
+            return EXIT_INTERRUPTED
+    return EXIT_OK if failed == 0 else EXIT_PARTIAL_FAILURE
+
+
+def run_library(args):
+    reporter = ProgressReporter(args.progress)
+    library = get_library()
+    if not args.output.is_dir():
+        reporter.event('error', message=f"目录不存在: {args.output}")
+        return EXIT_USAGE
+    try:
+        stats = scan_library(args.output, library=library, max_workers=args.jobs)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+    reporter.event('library', output=str(args.output), total=len(library.paths_in(args.output)), **stats)
+    return EXIT_OK
+
+
+def run_daemon_command(args):
+    try:
+        run_daemon(args.db, port=args.port, workers=args.jobs, enable_metrics=args.metrics)
+    except OSError as e:
+        print(f"无法启动下载守护进程: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    return EXIT_OK
+
+
+def run_submit(args):
+    reporter = ProgressReporter(args.progress)
+    client = DaemonClient(port=args.port)
+    if not client.is_available():
+        reporter.event('error', message=f"下载守护进程未运行（端口 {args.port}），请先执行 daemon 命令")
+        return EXIT_USAGE
+
+    try:
+        songs = _load_songs(args, reporter, threading.Event())
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+    if not songs:
+        reporter.event('error', message="没有可下载的歌曲")
+        return EXIT_USAGE
+
+    ids = client.submit(songs, args.output.expanduser(), args.quality)
+    reporter.event('submitted', count=len(ids), ids=ids)
+    return EXIT_OK
+
+
+def _add_source_arguments(parser):
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--playlist', help="playlists.json 中的播放列表名称")
+    source.add_argument('--qq-playlist', help="QQ音乐歌单ID，多个ID以逗号分隔")
+    parser.add_argument('--playlists-file', type=Path, default=None,
+                        help="播放列表文件路径（默认使用应用数据目录中的 playlists.json）")
+    parser.add_argument('--quality', type=int, choices=VALID_QUALITIES, default=DEFAULT_QUALITY,
+                        help=f"音质等级（默认 {DEFAULT_QUALITY}）")
+    parser.add_argument('--output', type=Path, default=DEFAULT_DOWNLOAD_DIR,
+                        help=f"下载目录（默认 {DEFAULT_DOWNLOAD_DIR}）")
+    parser.add_argument('--progress', choices=('text', 'json'), default='text',
+                        help="进度输出格式，json 为每行一个JSON对象")
+
+
+def _add_metrics_arguments(parser):
+    parser.add_argument('--metrics-port', type=int, help=METRICS_PORT_HELP)
+    parser.add_argument('--metrics-textfile', type=Path, help=METRICS_TEXTFILE_HELP)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m core.cli', description="音乐下载器命令行工具")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    download = subparsers.add_parser('download', help="批量下载播放列表或QQ歌单")
+    _add_source_arguments(download)
+    download.add_argument('--jobs', type=int, default=4, help="并发下载数（默认 4）")
+    download.add_argument('--embed-workers', type=int, default=2,
+                          help="嵌入元数据的线程数（默认 2），下载线程不必等待嵌入完成")
+    download.add_argument('--verbose', action='store_true', help="输出每首歌曲的详细状态")
+    download.add_argument('--ladder', help=LADDER_HELP)
+    download.add_argument('--cover-size', type=int, help=COVER_HELP)
+    download.add_argument('--timings', type=Path, help=TIMINGS_HELP)
+    _add_metrics_arguments(download)
+    download.set_defaults(func=run_download)
+
+    sync = subparsers.add_parser('sync', help="与QQ歌单增量同步播放列表")
+    sync.add_argument('--playlist', required=True, help="要同步的本地播放列表名称")
+    sync.add_argument('--qq-playlist', help="QQ音乐歌单ID（默认使用上次同步的歌单）")
+    sync.add_argument('--playlists-file', type=Path, default=None,
+                      help="播放列表文件路径（默认使用应用数据目录中的 playlists.json）")
+    sync.add_argument('--state-file', type=Path, default=None,
+                      help="同步状态文件路径（默认使用应用数据目录中的 playlist_sync.json）")
+    sync.add_argument('--download', action='store_true', help="下载本次新增的歌曲")
+    sync.add_argument('--quality', type=int, choices=VALID_QUALITIES, default=DEFAULT_QUALITY,
+                      help=f"音质等级（默认 {DEFAULT_QUALITY}）")
+    sync.add_argument('--output', type=Path, default=DEFAULT_DOWNLOAD_DIR,
+                      help=f"下载目录（默认 {DEFAULT_DOWNLOAD_DIR}）")
+    sync.add_argument('--progress', choices=('text', 'json'), default='text',
+                      help="进度输出格式，json 为每行一个JSON对象")
+    sync.add_argument('--verbose', action='store_true', help="输出每首歌曲的详细状态")
+    sync.add_argument('--ladder', help=LADDER_HELP)
+    sync.add_argument('--cover-size', type=int, help=COVER_HELP)
+    sync.add_argument('--timings', type=Path, help=TIMINGS_HELP)
+    _add_metrics_arguments(sync)
+    sync.set_defaults(func=run_sync)
+
+    library = subparsers.add_parser('library', help="扫描下载目录，读取标签并更新已下载歌曲索引")
+    library.add_argument('--output', type=Path, default=DEFAULT_DOWNLOAD_DIR,
+                         help=f"下载目录（默认 {DEFAULT_DOWNLOAD_DIR}）")
+    library.add_argument('--jobs', type=int, default=None, help="读取标签的进程数（默认为CPU核数）")
+    library.add_argument('--progress', choices=('text', 'json'), default='text',
+                         help="输出格式，json 为每行一个JSON对象")
+    library.set_defaults(func=run_library)
+
+    daemon = subparsers.add_parser('daemon', help="运行常驻下载守护进程")
+    daemon.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"控制接口端口（默认 {DEFAULT_PORT}）")
+    daemon.add_argument('--jobs', type=int, default=4, help="下载工作线程数（默认 4）")
+    daemon.add_argument('--db', type=Path, default=None,
+                        help="任务数据库路径（默认使用应用数据目录中的 jobs.db）")
+    daemon.add_argument('--ladder', help=LADDER_HELP)
+    daemon.add_argument('--cover-size', type=int, help=COVER_HELP)
+    daemon.add_argument('--timings', type=Path, help=TIMINGS_HELP)
+    daemon.add_argument('--metrics', action='store_true', help="在控制接口上提供 GET /metrics（Prometheus 格式）")
+    _add_metrics_arguments(daemon)
+    daemon.set_defaults(func=run_daemon_command)
+
+    submit = subparsers.add_parser('submit', help="将播放列表或QQ歌单提交给下载守护进程")
+    _add_source_arguments(submit)
+    submit.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"守护进程端口（默认 {DEFAULT_PORT}）")
+    submit.set_defaults(func=run_submit)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'jobs', None) is not None and args.jobs < 1:
+        parser.error("--jobs 必须大于0")
+    if getattr(args, 'embed_workers', 1) < 1:
+        parser.error("--embed-workers 必须大于0")
+    if getattr(args, 'ladder', None):
+        get_negotiator().set_ladder(args.ladder)
+    if getattr(args, 'cover_size', None) is not None:
+        get_cover_cache().configure(max_dimension=args.cover_size)
+    if getattr(args, 'timings', None):
+        try:
+            get_recorder().open_log(args.timings.expanduser())
+        except OSError as e:
+            parser.error(f"无法打开耗时日志 {args.timings}: {e}")
+
+    metrics_server = exporter = None
+    if getattr(args, 'metrics_port', None) is not None:
+        try:
+            metrics_server = metrics.start_http_server(args.metrics_port)
+        except OSError as e:
+            parser.error(f"无法在端口 {args.metrics_port} 提供运行指标: {e}")
+    if getattr(args, 'metrics_textfile', None):
+        exporter = metrics.TextfileExporter(args.metrics_textfile.expanduser()).start()
+    try:
+        return args.func(args)
+    finally:
+        if exporter is not None:
+            exporter.stop()
+        if metrics_server is not None:
+            metrics_server.stop()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,7 @@
 import json
 from pathlib import Path
 from core.constants import QualityLevel
+from core.persistence import DebouncedJsonWriter, quarantine_corrupted_file
 
 
 class ConfigManager:
@@ -11,7 +12,8 @@ class ConfigManager:
     - 下载目录
     - 其他用户偏好设置
 
-    配置文件存储在用户的AppData目录中，避免权限问题
+    配置文件存储在用户的AppData目录中，避免权限问题。
+    保存经过合并延迟后以原子方式写入，退出前需调用 flush()。
     """
 
     def __init__(self, config_file=None):
@@ -29,6 +31,7 @@ class ConfigManager:
             self.config_file = Path(config_file)
 
         self.config = self._load()
+        self._writer = DebouncedJsonWriter(self.config_file, lambda: self.config)
 
     def _load(self):
         """加载配置文件
@@ -44,6 +47,10 @@ class ConfigManager:
                     return config
             except (json.JSONDecodeError, IOError) as e:
                 print(f"配置文件加载失败: {e}，使用默认配置")
+                if isinstance(e, json.JSONDecodeError):
+                    corrupted_path = quarantine_corrupted_file(self.config_file)
+                    if corrupted_path:
+                        print(f"[WARNING] 损坏的配置文件已保留为: {corrupted_path}")
 
         # 返回默认配置
         return self._get_default_config()
@@ -63,16 +70,21 @@ class ConfigManager:
     def save(self):
         """保存配置到文件
 
+        短时间内的多次保存会合并为一次写入
+
+        Returns:
+            bool: 保存请求是否已提交
+        """
+        self._writer.schedule()
+        return True
+
+    def flush(self):
+        """立即写入尚未落盘的配置
+
         Returns:
             bool: 保存是否成功
         """
-        try:
-            with self.config_file.open('w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=4, ensure_ascii=False)
-            return True
-        except IOError as e:
-            print(f"配置文件保存失败: {e}")
-            return False
+        return self._writer.flush()
 
     def get_quality(self):
         """获取音质配置
@@ -87,7 +99,8 @@ class ConfigManager:
         if quality not in valid_qualities:
             quality = QualityLevel.DEFAULT_QUALITY
             # 修正配置
-            self.config['quality'] = quality
+            with self._writer.lock:
+                self.config['quality'] = quality
             self.save()
 
         return quality
@@ -101,7 +114,8 @@ class ConfigManager:
         Returns:
             bool: 保存是否成功
         """
-        self.config['quality'] = quality_value
+        with self._writer.lock:
+            self.config['quality'] = quality_value
         return self.save()
 
     def get_last_download_dir(self):
@@ -122,7 +136,8 @@ class ConfigManager:
         Returns:
             bool: 保存是否成功
         """
-        self.config['last_download_dir'] = str(dir_path)
+        with self._writer.lock:
+            self.config['last_download_dir'] = str(dir_path)
         return self.save()
 
     def get(self, key, default=None):
@@ -147,5 +162,6 @@ class ConfigManager:
         Returns:
             bool: 保存是否成功
         """
-        self.config[key] = value
+        with self._writer.lock:
+            self.config[key] = value
         return self.save()
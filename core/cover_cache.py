@@ -0,0 +1,227 @@
+"""
+封面处理与缓存。
+
+封面只解码一次：同时生成用于嵌入音频文件的版本（超过最大边长时缩小并重新压缩）和用于界面显示的小缩略图，
+两者都按原始图片内容的哈希缓存在应用数据目录的 covers 文件夹中，批量下载同一专辑的歌曲时不必重复处理。
+缩放需要可选依赖 Pillow；未安装时原样嵌入封面，缩略图直接使用原图（由界面缩放显示）。
+图片格式通过文件头的特征字节识别（替代已弃用的 imghdr）。本模块不依赖Qt。
+"""
+import hashlib
+import io
+import threading
+from pathlib import Path
+
+from core import metrics
+
+# Pillow 为可选依赖：安装后支持缩小封面和生成缩略图
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# 嵌入封面的默认最大边长（像素，0 表示不缩小）和 JPEG 质量
+DEFAULT_MAX_DIMENSION = 800
+DEFAULT_QUALITY = 90
+# 界面缩略图的边长
+THUMBNAIL_SIZE = 96
+# 内存中缓存的缩略图数量
+MEMORY_CACHE_SIZE = 256
+
+_IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'BM', 'bmp'),
+)
+
+_cover_cache = None
+_cover_cache_lock = threading.Lock()
+
+
+def sniff_image_type(data):
+    """根据文件头识别图片格式，返回 'jpeg'、'png'、'gif'、'webp'、'bmp' 或 None"""
+    for signature, image_type in _IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return image_type
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def image_mime(data, default='image/jpeg'):
+    image_type = sniff_image_type(data)
+    return f'image/{image_type}' if image_type else default
+
+
+def default_cache_dir():
+    cache_dir = Path.home() / "AppData" / "Roaming" / "MusicDownloader" / "covers"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+
+def get_cover_cache():
+    """获取全局的封面缓存"""
+    global _cover_cache
+    with _cover_cache_lock:
+        if _cover_cache is None:
+            _cover_cache = CoverCache()
+        return _cover_cache
+
+
+class CoverCache:
+    """按内容哈希缓存的封面（嵌入版本和缩略图，线程安全）"""
+
+    def __init__(self, cache_dir=None, max_dimension=DEFAULT_MAX_DIMENSION, quality=DEFAULT_QUALITY,
+                 thumbnail_size=THUMBNAIL_SIZE):
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        self.max_dimension = max_dimension
+        self.quality = quality
+        self.thumbnail_size = thumbnail_size
+        self._lock = threading.Lock()
+        self._thumbnails = {}  # 内容哈希 -> 缩略图数据
+        self._url_hashes = {}  # 封面URL -> 内容哈希，同一地址不必重复下载
+
+    def configure(self, max_dimension=None, quality=None):
+        """修改嵌入封面的最大边长和质量（已缓存的旧设置结果不会被使用）"""
+        if max_dimension is not None:
+            self.max_dimension = max(0, int(max_dimension))
+        if quality is not None:
+            self.quality = min(95, max(30, int(quality)))
+
+    def _path(self, digest, variant):
+        return self.cache_dir / f"{digest}_{variant}"
+
+    def _read(self, path):
+        try:
+            return path.read_bytes()
+        except OSError:
+            return None
+
+    def _write(self, path, data):
+        """写入缓存文件（先写临时文件再替换，其他线程不会读到不完整的内容）"""
+        temp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        try:
+            temp_path.write_bytes(data)
+            temp_path.replace(path)
+        except OSError as e:
+            print(f"写入封面缓存失败: {e}")
+
+    def _embed_variant(self):
+        return f"embed{self.max_dimension}q{self.quality}"
+
+    def _thumbnail_variant(self):
+        return f"thumb{self.thumbnail_size}"
+
+    def _process(self, data, digest):
+        """解码一次，生成嵌入版本和缩略图并写入缓存
+
+        Returns:
+            tuple: (嵌入用的图片数据, 缩略图数据)
+        """
+        embed_data = thumbnail_data = data
+        try:
+            image = Image.open(io.BytesIO(data))
+            image.load()
+        except Exception as e:
+            # 无法解码的图片原样使用，同样写入缓存，避免每次都重新尝试
+            print(f"无法解码封面图片: {e}")
+            image = None
+
+        if image is not None:
+            if self.max_dimension and max(image.size) > self.max_dimension:
+                resized = image.copy()
+                resized.thumbnail((self.max_dimension, self.max_dimension), Image.LANCZOS)
+                encoded = self._encode(resized, self.quality)
+                # 只有确实变小时才使用重新压缩的版本
+                if len(encoded) < len(data):
+                    embed_data = encoded
+
+            thumbnail = image.copy()
+            thumbnail.thumbnail((self.thumbnail_size, self.thumbnail_size), Image.LANCZOS)
+            thumbnail_data = self._encode(thumbnail, 85)
+
+        self._write(self._path(digest, self._embed_variant()), embed_data)
+        self._write(self._path(digest, self._thumbnail_variant()), thumbnail_data)
+        return embed_data, thumbnail_data
+
+    def _encode(self, image, quality):
+        output = io.BytesIO()
+        if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+            # 带透明通道的封面保存为 PNG
+            image.save(output, format='PNG', optimize=True)
+        else:
+            image.convert('RGB').save(output, format='JPEG', quality=quality, optimize=True)
+        return output.getvalue()
+
+    def prepare(self, data):
+        """处理原始封面数据
+
+        Returns:
+            tuple: (嵌入用的图片数据, MIME类型)
+        """
+        if Image is None or not data:
+            return data, image_mime(data)
+        digest = hashlib.sha1(data).hexdigest()
+        embed_data = self._read(self._path(digest, self._embed_variant()))
+        metrics.cache_access('cover', embed_data is not None)
+        if embed_data is None:
+            embed_data, thumbnail_data = self._process(data, digest)
+            self._remember_thumbnail(digest, thumbnail_data)
+        return embed_data, image_mime(embed_data)
+
+    def prepare_file(self, cover_path):
+        """读取封面文件并处理，文件不存在或读取失败时返回None"""
+        try:
+            with open(cover_path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            print(f"读取封面失败: {e}")
+            return None
+        return self.prepare(data)
+
+    def _remember_thumbnail(self, digest, data):
+        with self._lock:
+            if digest not in self._thumbnails and len(self._thumbnails) >= MEMORY_CACHE_SIZE:
+                self._thumbnails.pop(next(iter(self._thumbnails)))
+            self._thumbnails[digest] = data
+
+    def thumbnail(self, data):
+        """返回封面的缩略图数据（未安装 Pillow 时返回原图）"""
+        if Image is None or not data:
+            return data
+        digest = hashlib.sha1(data).hexdigest()
+        with self._lock:
+            cached = self._thumbnails.get(digest)
+        if cached is not None:
+            metrics.cache_access('cover_thumbnail', True)
+            return cached
+        cached = self._read(self._path(digest, self._thumbnail_variant()))
+        metrics.cache_access('cover_thumbnail', cached is not None)
+        if cached is None:
+            _, cached = self._process(data, digest)
+        self._remember_thumbnail(digest, cached)
+        return cached
+
+    def thumbnail_for_url(self, url, fetch):
+        """获取封面地址对应的缩略图，同一地址在本次运行中只下载一次
+
+        Args:
+            url: 封面地址
+            fetch: 下载函数 fetch(url) -> bytes 或 None
+        """
+        with self._lock:
+            digest = self._url_hashes.get(url)
+            cached = self._thumbnails.get(digest) if digest else None
+        if cached is not None:
+            metrics.cache_access('cover_thumbnail', True)
+            return cached
+        data = fetch(url)
+        if not data:
+            return None
+        thumbnail = self.thumbnail(data)
+        with self._lock:
+            self._url_hashes[url] = hashlib.sha1(data).hexdigest()
+        if Image is None:
+            self._remember_thumbnail(self._url_hashes[url], thumbnail)
+        return thumbnail
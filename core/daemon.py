@@ -0,0 +1,496 @@
+"""
+常驻下载守护进程：持久化的下载任务队列 + 本地控制接口。
+
+任务保存在 SQLite 数据库中，状态为 pending / running / done / failed。
+失败的任务按指数退避重新排队，超过最大重试次数后标记为 failed；
+守护进程重启时，上次未完成（running）的任务会重新排队。
+GUI 和命令行通过 localhost HTTP 接口（DaemonClient）提交任务；启用指标时控制接口还提供 Prometheus 格式的 /metrics。
+控制接口要求请求携带保存在应用数据目录 daemon.token 中的随机令牌（/metrics 除外），
+POST 请求体必须是 application/json，浏览器中的网页无法跨站提交任务。
+"""
+import hmac
+import json
+import os
+import random
+import secrets
+import sqlite3
+import threading
+import time
+import urllib.parse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+
+import requests
+
+from core import metrics
+from core.api import get_song_details_robust
+from core.engine import DownloadEngine
+from core.library_index import get_library
+from core.persistence import write_text_atomic
+from core.quality import QUALITY_NAMES, downgrade_message
+from core.timing import get_recorder
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 47321
+TOKEN_HEADER = 'Authorization'
+TOKEN_SCHEME = 'Bearer'
+
+STATE_PENDING = 'pending'
+STATE_RUNNING = 'running'
+STATE_DONE = 'done'
+STATE_FAILED = 'failed'
+JOB_STATES = (STATE_PENDING, STATE_RUNNING, STATE_DONE, STATE_FAILED)
+
+
+def default_db_path():
+    """任务数据库默认存放在应用数据目录中"""
+    app_data_dir = Path.home() / "AppData" / "Roaming" / "MusicDownloader"
+    app_data_dir.mkdir(parents=True, exist_ok=True)
+    return app_data_dir / "jobs.db"
+
+
+def default_token_path():
+    """控制接口令牌默认存放在应用数据目录中"""
+    app_data_dir = Path.home() / "AppData" / "Roaming" / "MusicDownloader"
+    app_data_dir.mkdir(parents=True, exist_ok=True)
+    return app_data_dir / "daemon.token"
+
+
+def read_token(path=None):
+    """读取控制接口令牌，文件不存在时返回None"""
+    path = Path(path) if path else default_token_path()
+    try:
+        return path.read_text(encoding='utf-8').strip() or None
+    except OSError:
+        return None
+
+
+def load_or_create_token(path=None):
+    """读取控制接口令牌，不存在时生成新的随机令牌（文件只允许当前用户读写）"""
+    path = Path(path) if path else default_token_path()
+    token = read_token(path)
+    if token is None:
+        token = secrets.token_urlsafe(32)
+        write_text_atomic(path, token)
+        try:
+            os.chmod(path, 0o600)
+        except OSError:
+            pass
+    return token
+
+
+class JobQueue:
+    """基于 SQLite 的持久化下载任务队列（线程安全）"""
+
+    def __init__(self, db_path=None, backoff_base=30, backoff_max=3600):
+        """
+        Args:
+            db_path: 数据库文件路径，默认使用应用数据目录
+            backoff_base: 首次重试的等待时间（秒），之后每次翻倍
+            backoff_max: 重试等待时间上限（秒）
+        """
+        self.db_path = Path(db_path) if db_path else default_db_path()
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    song TEXT NOT NULL,
+                    download_dir TEXT NOT NULL,
+                    quality INTEGER NOT NULL,
+                    state TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    next_attempt_at REAL NOT NULL,
+                    last_error TEXT,
+                    result_path TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs (state, next_attempt_at)")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _row_to_job(self, row):
+        job = dict(row)
+        job['song'] = json.loads(job['song'])
+        return job
+
+    def submit(self, songs, download_dir, quality, max_attempts=5):
+        """提交一批下载任务
+
+        Returns:
+            list: 新任务的ID
+        """
+        now = time.time()
+        ids = []
+        with self._lock, self._conn:
+            for song in songs:
+                cursor = self._conn.execute(
+                    "INSERT INTO jobs (song, download_dir, quality, state, max_attempts, "
+                    "next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (json.dumps(dict(song), ensure_ascii=False), str(download_dir), int(quality),
+                     STATE_PENDING, max_attempts, now, now, now))
+                ids.append(cursor.lastrowid)
+        return ids
+
+    def claim(self):
+        """取出一个到期的待处理任务并标记为 running，没有则返回None"""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE state = ? AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at, id LIMIT 1", (STATE_PENDING, now)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (STATE_RUNNING, now, row['id']))
+        job = self._row_to_job(row)
+        job['attempts'] += 1
+        job['state'] = STATE_RUNNING
+        return job
+
+    def complete(self, job_id, result_path):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, result_path = ?, last_error = NULL, updated_at = ? "
+                "WHERE id = ?", (STATE_DONE, result_path, time.time(), job_id))
+
+    def fail(self, job_id, error):
+        """记录一次失败：未超过重试次数时按指数退避（带随机抖动）重新排队
+
+        Returns:
+            str: 任务的新状态
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            if row['attempts'] >= row['max_attempts']:
+                state, next_attempt_at = STATE_FAILED, now
+            else:
+                delay = min(self.backoff_base * (2 ** (row['attempts'] - 1)), self.backoff_max)
+                state, next_attempt_at = STATE_PENDING, now + delay * random.uniform(0.8, 1.2)
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, last_error = ?, next_attempt_at = ?, updated_at = ? "
+                "WHERE id = ?", (state, str(error), next_attempt_at, now, job_id))
+        return state
+
+    def recover(self):
+        """将上次异常退出时仍在运行的任务重新排队
+
+        Returns:
+            int: 恢复的任务数
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET state = ?, attempts = MAX(attempts - 1, 0), next_attempt_at = ?, "
+                "updated_at = ? WHERE state = ?", (STATE_PENDING, now, now, STATE_RUNNING))
+        return cursor.rowcount
+
+    def retry_failed(self):
+        """将所有失败任务重置为待处理
+
+        Returns:
+            int: 重新排队的任务数
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET state = ?, attempts = 0, next_attempt_at = ?, updated_at = ? "
+                "WHERE state = ?", (STATE_PENDING, now, now, STATE_FAILED))
+        return cursor.rowcount
+
+    def counts(self):
+        """返回各状态的任务数"""
+        counts = {state: 0 for state in JOB_STATES}
+        with self._lock:
+            for row in self._conn.execute("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state"):
+                counts[row['state']] = row['n']
+        return counts
+
+    def list_jobs(self, state=None, limit=100):
+        with self._lock:
+            if state:
+                rows = self._conn.execute(
+                    "SELECT * FROM jobs WHERE state = ? ORDER BY id DESC LIMIT ?", (state, limit))
+            else:
+                rows = self._conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,))
+            return [self._row_to_job(row) for row in rows.fetchall()]
+
+
+class DownloadDaemon:
+    """固定数量的工作线程不断从 JobQueue 中领取任务并下载"""
+
+    def __init__(self, queue, workers=4, poll_interval=1.0, log=print):
+        self.queue = queue
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.log = log
+        self.stop_event = threading.Event()
+        self._threads = []
+        self._active_lock = threading.Lock()
+        self.active_jobs = 0
+
+    def start(self):
+        recovered = self.queue.recover()
+        if recovered:
+            self.log(f"[daemon] 已恢复 {recovered} 个未完成的任务")
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"download-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=30):
+        """停止领取新任务，并中止进行中的下载（中止的任务下次启动时会恢复）"""
+        self.stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _worker_loop(self):
+        while not self.stop_event.is_set():
+            job = self.queue.claim()
+            if job is None:
+                self.stop_event.wait(self.poll_interval)
+                continue
+            with self._active_lock:
+                self.active_jobs += 1
+            try:
+                self._run_job(job)
+            finally:
+                with self._active_lock:
+                    self.active_jobs -= 1
+
+    def _run_job(self, job):
+        song = job['song']
+        label = f"#{job['id']} {song.get('title', '')} - {song.get('singer', '')}"
+        errors = []
+        library = get_library()
+        engine = DownloadEngine(status_callback=errors.append, cancel_event=self.stop_event, library=library)
+        try:
+            existing_path = library.lookup(song, job['download_dir'], quality=job['quality'])
+            if existing_path:
+                self.queue.complete(job['id'], existing_path)
+                self.log(f"[daemon] 已存在 {label} -> {existing_path}")
+                return
+            details = get_song_details_robust(song, quality=job['quality'], cancel_event=self.stop_event,
+                                              negotiate=True)
+            if self.stop_event.is_set():
+                return  # 守护进程正在退出，任务保持 running，下次启动时恢复
+            if not details:
+                raise RuntimeError("无法获取歌曲详情")
+            path = engine.process_song(details, job['download_dir'])
+            if self.stop_event.is_set():
+                return
+            if not path:
+                raise RuntimeError(errors[-1] if errors else "下载失败")
+            self.queue.complete(job['id'], path)
+            self.log(f"[daemon] 完成 {label} -> {path}")
+            message = downgrade_message(job['quality'], details)
+            if message:
+                self.log(f"[daemon] {message}")
+        except Exception as e:
+            state = self.queue.fail(job['id'], e)
+            self.log(f"[daemon] 失败 {label} (第{job['attempts']}次): {e}，状态: {state}")
+
+    def collect_metrics(self, registry):
+        """抓取指标前更新任务队列各状态的任务数和正在执行的任务数"""
+        jobs = registry.gauge('jobs', "任务队列中各状态的任务数", ('state',))
+        counts = self.queue.counts()
+        for state in JOB_STATES:
+            jobs.set(counts.get(state, 0), state=state)
+        registry.get('active_workers').set(self.active_jobs, pool='daemon')
+
+
+def _is_positive_int(value):
+    # bool 是 int 的子类，JSON 中的 true 不能当作 1
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+class _ControlHandler(BaseHTTPRequestHandler):
+    """控制接口：GET /status, GET /jobs, GET /timings, GET /metrics, POST /jobs, POST /jobs/retry"""
+
+    def log_message(self, format, *args):
+        pass  # 不输出访问日志
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        """读取 JSON 对象请求体
+
+        Raises:
+            ValueError: 请求体不是有效的 JSON 对象
+        """
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        if not isinstance(payload, dict):
+            raise ValueError("请求体必须是JSON对象")
+        return payload
+
+    def _authorized(self):
+        """检查请求携带的令牌，不正确时已发送 401 响应"""
+        expected = f"{TOKEN_SCHEME} {self.server.token}"
+        if hmac.compare_digest(self.headers.get(TOKEN_HEADER, '').encode(), expected.encode()):
+            return True
+        self._send_json({'error': '缺少或错误的令牌'}, 401)
+        return False
+
+    def do_GET(self):
+        daemon = self.server.daemon
+        parsed = urllib.parse.urlparse(self.path)
+        params = dict(urllib.parse.parse_qsl(parsed.query))
+        if parsed.path == '/metrics' and metrics.is_enabled():
+            # 指标不含任务内容，供 Prometheus 直接抓取
+            metrics.send_metrics(self, metrics.get_registry())
+            return
+        if not self._authorized():
+            return
+        if parsed.path == '/status':
+            self._send_json({'jobs': daemon.queue.counts(), 'workers': daemon.workers,
+                             'active': daemon.active_jobs})
+        elif parsed.path == '/jobs':
+            state = params.get('state')
+            if state and state not in JOB_STATES:
+                self._send_json({'error': f"未知状态: {state}"}, 400)
+                return
+            limit = params.get('limit', '100')
+            limit = int(limit) if limit.isdecimal() else None
+            if not _is_positive_int(limit):
+                self._send_json({'error': 'limit 必须是正整数'}, 400)
+                return
+            self._send_json({'jobs': daemon.queue.list_jobs(state, limit)})
+        elif parsed.path == '/timings':
+            self._send_json({'stages': get_recorder().summary()})
+        else:
+            self._send_json({'error': 'not found'}, 404)
+
+    def do_POST(self):
+        daemon = self.server.daemon
+        path = urllib.parse.urlparse(self.path).path
+        if not self._authorized():
+            return
+        # 浏览器跨站请求不经预检无法使用 application/json
+        content_type = self.headers.get('Content-Type', '').split(';', 1)[0].strip().lower()
+        if content_type != 'application/json':
+            self._send_json({'error': '请求体必须是 application/json'}, 415)
+            return
+        try:
+            payload = self._read_json()
+        except ValueError:
+            self._send_json({'error': '请求体不是有效的JSON对象'}, 400)
+            return
+
+        if path == '/jobs':
+            songs = payload.get('songs')
+            if not isinstance(songs, list) or not all(isinstance(song, dict) for song in songs) \
+                    or not payload.get('download_dir'):
+                self._send_json({'error': '需要 songs 列表和 download_dir'}, 400)
+                return
+            quality = payload.get('quality', 9)
+            if not isinstance(quality, int) or isinstance(quality, bool) or quality not in QUALITY_NAMES:
+                self._send_json({'error': f"不支持的音质: {quality!r}"}, 400)
+                return
+            max_attempts = payload.get('max_attempts', 5)
+            if not _is_positive_int(max_attempts):
+                self._send_json({'error': 'max_attempts 必须是正整数'}, 400)
+                return
+            ids = daemon.queue.submit(songs, payload['download_dir'], quality, max_attempts=max_attempts)
+            self._send_json({'ids': ids}, 201)
+        elif path == '/jobs/retry':
+            self._send_json({'requeued': daemon.queue.retry_failed()})
+        else:
+            self._send_json({'error': 'not found'}, 404)
+
+
+class ControlServer(ThreadingHTTPServer):
+    """只监听本机地址的控制接口服务器"""
+    daemon_threads = True
+
+    def __init__(self, daemon, host=DEFAULT_HOST, port=DEFAULT_PORT, token=None):
+        super().__init__((host, port), _ControlHandler)
+        self.daemon = daemon
+        self.token = token or load_or_create_token()
+
+
+class DaemonClient:
+    """向本机下载守护进程提交任务的客户端"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=2, token=None):
+        """
+        Args:
+            token: 控制接口令牌，默认读取守护进程写入应用数据目录的令牌
+        """
+        self.base_url = f"http://{host}:{port}"
+        self.timeout = timeout
+        self.token = token or read_token()
+
+    def _headers(self):
+        return {TOKEN_HEADER: f"{TOKEN_SCHEME} {self.token}"} if self.token else {}
+
+    def is_available(self):
+        try:
+            return self.status() is not None
+        except requests.RequestException:
+            return False
+
+    def status(self):
+        response = requests.get(f"{self.base_url}/status", headers=self._headers(), timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def submit(self, songs, download_dir, quality):
+        """提交下载任务，返回新任务的ID列表"""
+        payload = {'songs': [dict(song) for song in songs], 'download_dir': str(download_dir),
+                   'quality': quality}
+        response = requests.post(f"{self.base_url}/jobs", json=payload, headers=self._headers(),
+                                 timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()['ids']
+
+    def retry_failed(self):
+        response = requests.post(f"{self.base_url}/jobs/retry", json={}, headers=self._headers(),
+                                 timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()['requeued']
+
+
+def run_daemon(db_path=None, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=4, enable_metrics=False):
+    """前台运行守护进程，直到收到 Ctrl+C
+
+    enable_metrics 为 True（或此前已调用 core.metrics.enable）时，控制接口提供 GET /metrics。
+    """
+    queue = JobQueue(db_path)
+    daemon = DownloadDaemon(queue, workers=workers)
+    server = ControlServer(daemon, host, port)
+    if enable_metrics or metrics.is_enabled():
+        metrics.enable().add_collector(daemon.collect_metrics)
+    daemon.start()
+    print(f"[daemon] 控制接口: http://{host}:{port}，工作线程: {workers}，任务数据库: {queue.db_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        daemon.stop()
+        queue.close()
+        print("[daemon] 已停止")
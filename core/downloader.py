@@ -1,336 +1,103 @@
 import os
-import re
-import mimetypes
-import requests
-from pathlib import Path
-from urllib.parse import urlparse
+import threading
 
 from PySide6.QtCore import QThread, Signal
 from PySide6.QtWidgets import QTableWidget
-from mutagen.mp3 import MP3
-from mutagen.flac import FLAC
-from mutagen.id3 import ID3, APIC, TPE1, TIT2, TALB, USLT, SYLT, ID3NoHeaderError
-from mutagen import File as MutagenFile
 
-from utils.lrc_parser import parse_lrc_line
-from core.api import get_song_details_robust, search_music, get_session, get_lyric
-from core.fetch_playlist import fetch_qq_playlist
-
-class BaseDownloader(QThread):
-    """Base class for downloader threads to share common methods."""
-    status_signal = Signal(str)
-    progress_signal = Signal(int)
-
-    def download_file(self, url, file_path, progress_callback=None):
-        """Downloads a file to a specified path, with progress reporting."""
-        try:
-            session = get_session()
-            response = session.get(url, stream=True, timeout=(10, 30))  # 下载使用更长超时
-            response.raise_for_status()
-            
-            total_size = int(response.headers.get('content-length', 0))
-            downloaded_size = 0
-            
-            with open(file_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded_size += len(chunk)
-                        if progress_callback and total_size > 0:
-                            progress = int((downloaded_size / total_size) * 100)
-                            progress_callback(progress)
-            return True
-        except requests.exceptions.Timeout:
-            self.status_signal.emit("文件下载超时，请检查网络连接")
-            return False
-        except requests.exceptions.ConnectionError:
-            self.status_signal.emit("网络连接错误，请检查网络设置")
-            return False
-        except requests.RequestException as e:
-            self.status_signal.emit(f"文件下载失败: {e}")
-            return False
-
-    def embed_metadata(self, audio_file_path, song_details, temp_cover_path=None):
-        """Embeds metadata (lyrics, cover, etc.) into the audio file.
-
-        Supports multiple audio formats: MP3, FLAC, M4A, etc.
-        """
-        try:
-            audio_path = Path(audio_file_path)
-            file_ext = audio_path.suffix.lower()
-
-            # 获取标准化的元数据
-            title = song_details.get('title', '')
-            if '[' in title and ']' in title:
-                title = title.rsplit('[', 1)[0].strip()
-            singer = song_details.get('singer', '')
-            album = song_details.get('album', '')
-            lyric = song_details.get('lyric', '')
-
-            # 根据文件格式选择处理方式
-            if file_ext in ['.mp3', '.mp2', '.mp1']:
-                self._embed_metadata_mp3(audio_file_path, title, singer, album, lyric, temp_cover_path)
-            elif file_ext in ['.flac']:
-                self._embed_metadata_flac(audio_file_path, title, singer, album, lyric, temp_cover_path)
-            elif file_ext in ['.m4a', '.mp4', '.m4b', '.m4p']:
-                self._embed_metadata_mp4(audio_file_path, title, singer, album, lyric, temp_cover_path)
-            else:
-                # 对于其他格式，尝试使用mutagen自动识别
-                try:
-                    audio = MutagenFile(audio_file_path, easy=True)
-                    if audio is not None:
-                        audio['title'] = title
-                        audio['artist'] = singer
-                        audio['album'] = album
-                        audio.save()
-                except:
-                    self.status_signal.emit(f"不支持的音频格式: {file_ext}，跳过元数据嵌入")
-
-        except Exception as e:
-            self.status_signal.emit(f"嵌入元数据失败: {e}")
-
-    def _embed_metadata_mp3(self, audio_file_path, title, singer, album, lyric, cover_path):
-        """为MP3文件嵌入元数据"""
-        try:
-            try:
-                audio = MP3(audio_file_path, ID3=ID3)
-            except ID3NoHeaderError:
-                audio = MP3(audio_file_path)
-                audio.add_tags()
-
-            tags = audio.tags
-            tags.add(TPE1(encoding=3, text=singer))
-            tags.add(TIT2(encoding=3, text=title))
-            tags.add(TALB(encoding=3, text=album))
-
-            # Embed lyrics
-            if lyric:
-                plain_lyrics = re.sub(r'\[\d{2}:\d{2}(\.\d{2,3})?\]', '', lyric).strip()
-                tags.add(USLT(encoding=3, lang='chi', desc='', text=plain_lyrics))
-
-                sylt_frames = []
-                for line in lyric.strip().split('\n'):
-                    parsed = parse_lrc_line(line)
-                    if parsed and parsed[1]:
-                        sylt_frames.append((parsed[1], parsed[0]))
-                if sylt_frames:
-                    tags.add(SYLT(encoding=3, lang='chi', type=1, format=2, desc='Lyrics', sync=sylt_frames))
-
-            # Embed cover
-            if cover_path and os.path.exists(cover_path):
-                mime = mimetypes.guess_type(cover_path)[0] or 'image/jpeg'
-                with open(cover_path, 'rb') as f:
-                    cover_data = f.read()
-                tags.add(APIC(encoding=3, mime=mime, type=3, desc='Cover', data=cover_data))
-
-            audio.save()
-        except Exception as e:
-            raise Exception(f"MP3元数据嵌入失败: {e}")
-
-    def _embed_metadata_flac(self, audio_file_path, title, singer, album, lyric, cover_path):
-        """为FLAC文件嵌入元数据"""
-        try:
-            audio = FLAC(audio_file_path)
-
-            audio['title'] = title
-            audio['artist'] = singer
-            audio['album'] = album
-
-            # FLAC的歌词存储为LYRICS标签
-            if lyric:
-                plain_lyrics = re.sub(r'\[\d{2}:\d{2}(\.\d{2,3})?\]', '', lyric).strip()
-                audio['lyrics'] = plain_lyrics
-
-            # Embed cover for FLAC
-            if cover_path and os.path.exists(cover_path):
-                from mutagen.flac import Picture
-                import imghdr
-
-                picture = Picture()
-                with open(cover_path, 'rb') as f:
-                    picture.data = f.read()
-
-                picture.type = 3  # Cover (front)
-                picture.mime = 'image/jpeg'
-                img_type = imghdr.what(cover_path)
-                if img_type:
-                    picture.mime = f'image/{img_type}'
+from core.api import get_song_details_robust, search_music, match_song, get_session, get_lyric
+from core.quality import downgrade_message
+from core.engine import DownloadEngine
+from core.pipeline import EmbedStage, finish_song
+from core.library_index import get_library
+from core.library_scanner import read_cover, read_lyrics, scan_library
+from core.cover_cache import get_cover_cache
+from core.fetch_playlist import fetch_qq_playlist, fetch_qq_playlists, parse_playlist_ids
+from core.song import key_of
+from core.playlist_sync import plan_sync
+from core.timing import TimingRecorder, get_recorder
+
+class CancellableThread(QThread):
+    """
+    支持协作式取消的后台线程基类。
 
-                audio.add_picture(picture)
+    cancel() 在请求线程中断的同时设置 cancel_event，该事件会传给 core.api 的请求函数，
+    从而中止正在读取的HTTP响应。generation 由调用方分配，随结果信号一起发回，
+    接收方据此丢弃已被更新请求取代的旧结果。
+    """
 
-            audio.save()
-        except Exception as e:
-            raise Exception(f"FLAC元数据嵌入失败: {e}")
+    def __init__(self, generation=0, parent=None):
+        super().__init__(parent)
+        self.generation = generation
+        self.cancel_event = threading.Event()
 
-    def _embed_metadata_mp4(self, audio_file_path, title, singer, album, lyric, cover_path):
-        """为MP4/M4A文件嵌入元数据"""
-        try:
-            from mutagen.mp4 import MP4, MP4Cover
+    def cancel(self):
+        self.requestInterruption()
+        self.cancel_event.set()
 
-            audio = MP4(audio_file_path)
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
 
-            audio['\xa9nam'] = title  # Title
-            audio['\xa9ART'] = singer  # Artist
-            audio['\xa9alb'] = album  # Album
 
-            # MP4的歌词
-            if lyric:
-                plain_lyrics = re.sub(r'\[\d{2}:\d{2}(\.\d{2,3})?\]', '', lyric).strip()
-                audio['\xa9lyr'] = plain_lyrics
+class BaseDownloader(CancellableThread):
+    """Base class for downloader threads to share common methods.
 
-            # Embed cover for MP4
-            if cover_path and os.path.exists(cover_path):
-                with open(cover_path, 'rb') as f:
-                    cover_data = f.read()
+    实际的下载流程由不依赖Qt的 core.engine.DownloadEngine 完成，这里只把状态转发为Qt信号。
+    """
+    status_signal = Signal(str)
+    progress_signal = Signal(int)
 
-                # 判断图片格式
-                if cover_path.lower().endswith('.png'):
-                    cover_format = MP4Cover.FORMAT_PNG
-                else:
-                    cover_format = MP4Cover.FORMAT_JPEG
+    def __init__(self, parent=None):
+        super().__init__(parent=parent)
+        self.library = get_library()
+        self.engine = DownloadEngine(status_callback=self.status_signal.emit,
+                                     cancel_event=self.cancel_event, library=self.library)
 
-                audio['covr'] = [MP4Cover(cover_data, imageformat=cover_format)]
+    def download_file(self, url, file_path, progress_callback=None, stage='download'):
+        return self.engine.download_file(url, file_path, progress_callback, stage=stage)
 
-            audio.save()
-        except Exception as e:
-            raise Exception(f"MP4元数据嵌入失败: {e}")
+    def embed_metadata(self, audio_file_path, song_details, temp_cover_path=None):
+        return self.engine.embed_metadata(audio_file_path, song_details, temp_cover_path)
 
     def process_song(self, song_details, download_dir, progress_callback=None):
-        """Main logic to download audio, cover, and embed metadata for a single song."""
-        url = song_details.get('url')
-        if not url:
-            # API详情返回的是'song'字段，不是'title'
-            song_name = song_details.get('song') or song_details.get('title', '未知歌名')
-            self.status_signal.emit(f"歌曲 '{song_name}' 无有效链接，跳过。")
-            return None
-
-        download_path = Path(download_dir)
-        download_path.mkdir(parents=True, exist_ok=True)
-
-        # Clean filename - API详情返回的字段是'song'而不是'title'
-        title = song_details.get('song') or song_details.get('title', '未知歌名')
-        if '[' in title and ']' in title:
-            title = title.rsplit('[', 1)[0].strip()
-        singer = song_details.get('singer', '未知歌手')
-        filename_prefix = re.sub(r'[\\/*?:"<>|]', '', f"{title} - {singer}")
-
-        # Determine file extension
-        # 优先从URL中提取扩展名（更可靠），因为服务器返回的Content-Type可能不准确
-        parsed_url = urlparse(url)
-        url_path = parsed_url.path
-        url_ext = os.path.splitext(url_path)[1].lower()
-
-        if url_ext in ['.mp3', '.flac', '.m4a', '.ogg', '.wav', '.aac', '.wma']:
-            # URL中有明确的音频格式扩展名，直接使用
-            ext = url_ext
-        else:
-            # URL中没有扩展名，尝试从Content-Type判断
-            try:
-                session = get_session()
-                response = session.head(url, allow_redirects=True, timeout=(5, 10))
-                content_type = response.headers.get('Content-Type', '').lower()
-                ext = mimetypes.guess_extension(content_type) or '.mp3'
-            except requests.RequestException:
-                ext = '.mp3'
-
-        final_path = download_path / f"{filename_prefix}{ext}"
-        if final_path.exists():
-            self.status_signal.emit(f"文件 '{final_path.name}' 已存在。")
-            return str(final_path)  # Indicate that it exists, no need to re-download.
+        return self.engine.process_song(song_details, download_dir, progress_callback)
 
-        temp_audio_path = download_path / f"temp_{os.urandom(8).hex()}{ext}"
-        temp_cover_path = None
 
-        try:
-            # Download audio
-            self.status_signal.emit(f"正在下载: {title}...")
-            if not self.download_file(url, temp_audio_path, progress_callback):
-                return None
-
-            # Download cover
-            cover_url = song_details.get('cover')
-            if cover_url:
-                temp_cover_path = download_path / f"temp_cover_{os.urandom(8).hex()}.jpg"
-                if not self.download_file(cover_url, temp_cover_path, None):
-                    # 封面下载失败不影响主流程，但要清理临时文件
-                    if temp_cover_path and temp_cover_path.exists():
-                        temp_cover_path.unlink()
-                    temp_cover_path = None
-
-            # 获取歌词（新API需要单独请求）
-            song_id = song_details.get('songID') or song_details.get('id')
-            if song_id:
-                lyric_data = get_lyric(song_id)
-                if lyric_data and lyric_data.get('lrc'):
-                    song_details['lyric'] = lyric_data['lrc']
-
-            # 标准化字段名：将'song'字段复制为'title'以便元数据嵌入使用
-            if 'song' in song_details and 'title' not in song_details:
-                song_details['title'] = song_details['song']
-
-            # Embed metadata
-            self.status_signal.emit(f"正在嵌入元数据...")
-            self.embed_metadata(temp_audio_path, song_details, temp_cover_path)
-
-            # Rename to final filename
-            try:
-                temp_audio_path.rename(final_path)
-                temp_audio_path = None  # 重命名成功，不需要清理
-                self.status_signal.emit(f"下载完成: {final_path.name}")
-                return str(final_path)
-            except OSError as e:
-                self.status_signal.emit(f"重命名文件失败: {e}")
-                return None
-
-        except Exception as e:
-            self.status_signal.emit(f"处理歌曲时发生错误: {e}")
-            return None
-        finally:
-            # 确保清理所有临时文件（重命名成功的文件不会被清理）
-            self._cleanup_temp_files(temp_audio_path, temp_cover_path)
-
-    def _cleanup_temp_files(self, *temp_paths):
-        """清理临时文件的统一方法"""
-        for temp_path in temp_paths:
-            if temp_path:
-                try:
-                    # 支持Path对象和字符串路径
-                    path_obj = Path(temp_path) if not isinstance(temp_path, Path) else temp_path
-                    if path_obj.exists():
-                        path_obj.unlink()
-                except OSError as e:
-                    print(f"清理临时文件失败 {temp_path}: {e}")
-
-
-class SearchThread(QThread):
+class SearchThread(CancellableThread):
     """
     后台线程，用于执行音乐搜索，避免UI阻塞。
     """
-    finished_signal = Signal(list)
+    finished_signal = Signal(list, int)  # songs, generation
     status_signal = Signal(str)
 
-    def __init__(self, query, parent=None):
-        super().__init__(parent)
+    def __init__(self, query, page=1, generation=0, parent=None):
+        super().__init__(generation, parent)
         self.query = query
+        self.page = page
 
     def run(self):
         try:
-            songs = search_music(self.query)
-            self.finished_signal.emit(songs)
+            # 第一页不带页码参数，与接口默认行为保持一致
+            page = self.page if self.page > 1 else None
+            songs = search_music(self.query, page=page, cancel_event=self.cancel_event)
+            if self.is_cancelled():
+                return
+            self.finished_signal.emit(songs, self.generation)
         except Exception as e:
+            if self.is_cancelled():
+                return
             self.status_signal.emit(f"搜索失败: {e}")
-            self.finished_signal.emit([])
+            self.finished_signal.emit([], self.generation)
 
 
-class SongDetailsThread(QThread):
+class SongDetailsThread(CancellableThread):
     """
     后台线程，用于获取单曲的详细信息（包括播放URL和歌词），避免UI阻塞。
     """
-    finished_signal = Signal(dict, dict, QTableWidget, int) # details, song_info, table, row
+    finished_signal = Signal(dict, object, QTableWidget, int, int) # details, song_info, table, row, generation
     status_signal = Signal(str)
 
-    def __init__(self, song_info, table, row, quality=9, parent=None):
-        super().__init__(parent)
+    def __init__(self, song_info, table, row, quality=9, generation=0, parent=None):
+        super().__init__(generation, parent)
         self.song_info = song_info
         self.table = table
         self.row = row
@@ -338,11 +105,17 @@ class SongDetailsThread(QThread):
 
     def run(self):
         try:
-            details = get_song_details_robust(self.song_info, quality=self.quality)
-            self.finished_signal.emit(details, self.song_info, self.table, self.row)
+            details = get_song_details_robust(self.song_info, quality=self.quality,
+                                              cancel_event=self.cancel_event)
+            if self.is_cancelled():
+                return
+            self.finished_signal.emit(details or {}, self.song_info, self.table, self.row,
+                                      self.generation)
         except Exception as e:
+            if self.is_cancelled():
+                return
             self.status_signal.emit(f"获取歌曲详情失败: {e}")
-            self.finished_signal.emit({}, self.song_info, self.table, self.row)
+            self.finished_signal.emit({}, self.song_info, self.table, self.row, self.generation)
 
 
 class SingleDownloadThread(BaseDownloader):
@@ -357,13 +130,17 @@ class SingleDownloadThread(BaseDownloader):
         self.quality = quality
 
     def run(self):
-        details = get_song_details_robust(self.song_info, quality=self.quality)
+        details = get_song_details_robust(self.song_info, quality=self.quality, negotiate=True)
         if not details:
             msg = f"无法获取 '{self.song_info['title']}' 的详细信息。"
             self.status_signal.emit(msg)
             self.finished_signal.emit(False, msg)
             return
 
+        message = downgrade_message(self.quality, details)
+        if message:
+            self.status_signal.emit(message)
+
         final_path = self.process_song(details, self.download_dir, self.progress_signal.emit)
         if final_path:
             self.finished_signal.emit(True, final_path)
@@ -382,93 +159,227 @@ class BatchDownloadThread(BaseDownloader):
         self.playlist = playlist
         self.download_dir = download_dir
         self.quality = quality
+        # 本批次单独汇总各阶段的吞吐，记录同时转发到全局记录器
+        self.engine.recorder = TimingRecorder(parent=get_recorder())
 
     def run(self):
+        # 嵌入元数据在单独的线程中进行，下载完一首后立即开始下一首
+        embed_stage = EmbedStage()
+        try:
+            finished = self._download_all(embed_stage)
+        finally:
+            embed_stage.close()
+        message = "批量下载完成！" if finished else "批量下载已取消。"
+        # 本批次各阶段的吞吐附在结束消息后，由界面一并显示
+        summary = self.engine.recorder.format_summary()
+        if summary:
+            message += f"\n\n各阶段吞吐:\n{summary}"
+        self.batch_finished_signal.emit(finished, message)
+
+    def _download_all(self, embed_stage):
         total = len(self.playlist)
         for i, song_info in enumerate(self.playlist):
+            if self.is_cancelled():
+                return False
             self.batch_progress_signal.emit(i + 1, total)
 
-            details = get_song_details_robust(song_info, quality=self.quality)
+            # 已下载过的歌曲直接跳过，无需任何网络请求
+            existing_path = self.library.lookup(song_info, self.download_dir, quality=self.quality)
+            if existing_path:
+                self.status_signal.emit(f"文件 '{os.path.basename(existing_path)}' 已存在，跳过。")
+                self.single_finished_signal.emit(song_info['title'])
+                continue
+
+            details = get_song_details_robust(song_info, quality=self.quality,
+                                              cancel_event=self.cancel_event, negotiate=True)
             if not details:
                 self.status_signal.emit(f"无法获取 '{song_info.get('title')}' 详情，跳过。")
                 continue
+            message = downgrade_message(self.quality, details)
+            if message:
+                self.status_signal.emit(message)
 
-            self.process_song(details, self.download_dir)
-            self.single_finished_signal.emit(song_info['title'])
-
-        self.batch_finished_signal.emit(True, "批量下载完成！")
+            title = song_info['title']
+            finish_song(self.engine, self.engine.fetch_song(details, self.download_dir), embed_stage,
+                        lambda path, title=title: self.single_finished_signal.emit(title))
+        return True
 
 
-class PlaylistImportThread(QThread):
+class PlaylistImportThread(CancellableThread):
     """
     后台线程，用于从 QQ 音乐导入歌单，并进行预匹配和去重。
+
+    支持一次导入多个歌单（ID以逗号或空格分隔）。歌单分页并发获取，
+    歌曲边到达边去重和匹配，匹配与后续页面的下载同时进行。
     """
     finished_signal = Signal(bool, str, list) # success, target_playlist_name, matched_songs
     status_signal = Signal(str)
     progress_signal = Signal(int, int) # current, total
 
     def __init__(self, playlist_id, target_playlist_name, existing_songs, parent=None):
-        super().__init__(parent)
-        self.playlist_id = playlist_id
+        super().__init__(parent=parent)
+        self.playlist_ids = parse_playlist_ids(playlist_id) or [str(playlist_id)]
         self.target_playlist_name = target_playlist_name
         self.existing_songs = existing_songs
 
     def run(self):
         try:
             self.status_signal.emit("正在获取歌单信息...")
-            raw_songs = fetch_qq_playlist(self.playlist_id)
-            if not raw_songs:
-                self.status_signal.emit("无法获取歌单或歌单为空")
-                self.finished_signal.emit(False, self.target_playlist_name, [])
-                return
 
-            self.status_signal.emit("检查重复歌曲...")
-            
-            # Create a set of existing songs for efficient lookup
             # Use a simplified title (removing tags) for comparison
-            existing_set = set()
-            for song in self.existing_songs:
-                title = song.get('title', '').strip()
-                if '[' in title and ']' in title:
-                    title = title.rsplit('[', 1)[0].strip()
-                # 预处理：去除空格，转小写，替换'/'为'&'
-                title = title.replace(' ', '').lower().replace('/', '&')
-                singer = song.get('singer', '').replace(' ', '').lower().replace('/', '&')
-                existing_set.add((title, singer))
-
-            # Filter out songs that already exist
-            new_songs_to_match = []
-            for song in raw_songs:
-                title = song.get('title', '').strip()
-                if '[' in title and ']' in title:
-                     title = title.rsplit('[', 1)[0].strip()
-                # 预处理：去除空格，转小写，替换'/'为'&'
-                processed_title = title.replace(' ', '').lower().replace('/', '&')
-                processed_singer = song.get('singer', '').replace(' ', '').lower().replace('/', '&')
-                if (processed_title, processed_singer) not in existing_set:
-                    new_songs_to_match.append(song)
-            
-            if not new_songs_to_match:
-                self.status_signal.emit("歌单中的所有歌曲已存在于目标播放列表。")
-                self.finished_signal.emit(True, self.target_playlist_name, [])
-                return
+            existing_set = {key_of(song) for song in self.existing_songs}
 
-            # Match the remaining new songs
+            totals = {}
+            failed_ids = []
             matched_songs = []
-            total = len(new_songs_to_match)
-            for i, song in enumerate(new_songs_to_match):
-                self.status_signal.emit(f"正在匹配: {song['title']} ({i+1}/{total})")
-                query = f"{song['title']} {song['singer']}"
-                search_results = search_music(query)
-                if search_results:
-                    # Heuristic: Pick the first result as the best match.
-                    # This is a reasonable assumption for a specific "title artist" query.
-                    # 插入头部
-                    matched_songs.insert(0, search_results[0])
-                self.progress_signal.emit(i + 1, total)
+            fetched = 0
+            songs = fetch_qq_playlists(self.playlist_ids, cancel_event=self.cancel_event,
+                                       on_total=totals.__setitem__,
+                                       on_error=lambda playlist_id, e: failed_ids.append(playlist_id))
+            for _, song in songs:
+                fetched += 1
+                total = max(sum(totals.values()), fetched)
+                # Skip songs that already exist (also de-duplicates across several playlists)
+                key = key_of(song)
+                if key not in existing_set:
+                    existing_set.add(key)
+                    self.status_signal.emit(f"正在匹配: {song['title']} ({fetched}/{total})")
+                    matched = match_song(song['title'], song['singer'], album=song.get('album', ''),
+                                         cancel_event=self.cancel_event)
+                    if matched:
+                        # 插入头部
+                        matched_songs.insert(0, matched)
+                self.progress_signal.emit(fetched, total)
+
+            if self.is_cancelled():
+                return
+            if failed_ids:
+                self.status_signal.emit(f"以下歌单获取失败或不完整: {', '.join(failed_ids)}")
+            if fetched == 0:
+                self.status_signal.emit("无法获取歌单或歌单为空")
+                self.finished_signal.emit(False, self.target_playlist_name, [])
+                return
+            if not matched_songs:
+                self.status_signal.emit("歌单中的所有歌曲已存在于目标播放列表。")
 
             self.finished_signal.emit(True, self.target_playlist_name, matched_songs)
 
         except Exception as e:
             self.status_signal.emit(f"导入歌单时出错: {e}")
-            self.finished_signal.emit(False, self.target_playlist_name, []) 
\ No newline at end of file
+            self.finished_signal.emit(False, self.target_playlist_name, [])
+
+
+class PlaylistSyncThread(CancellableThread):
+    """
+    后台线程，增量同步QQ歌单：获取歌单后与上次的同步记录对比，只匹配新增歌曲。
+    结果（SyncPlan）由主线程通过 apply_sync 应用到播放列表。
+    """
+    finished_signal = Signal(bool, str, object) # success, playlist_name, plan
+    status_signal = Signal(str)
+
+    def __init__(self, playlist_name, source_id, playlist_songs, state, parent=None):
+        super().__init__(parent=parent)
+        self.playlist_name = playlist_name
+        self.source_id = source_id
+        self.playlist_songs = list(playlist_songs)
+        self.state = state
+
+    def run(self):
+        try:
+            self.status_signal.emit("正在获取歌单信息...")
+            raw_songs = fetch_qq_playlist(self.source_id)
+            if not raw_songs:
+                self.status_signal.emit("无法获取歌单或歌单为空")
+                self.finished_signal.emit(False, self.playlist_name, None)
+                return
+            if self.is_cancelled():
+                return
+
+            plan = plan_sync(self.playlist_songs, self.state, self.source_id, raw_songs,
+                             cancel_event=self.cancel_event, status_callback=self.status_signal.emit)
+            if plan is None:
+                return
+            self.finished_signal.emit(True, self.playlist_name, plan)
+        except Exception as e:
+            self.status_signal.emit(f"同步歌单时出错: {e}")
+            self.finished_signal.emit(False, self.playlist_name, None)
+
+
+class LibraryScanThread(CancellableThread):
+    """
+    后台线程，增量扫描下载目录并更新已下载歌曲索引（标签在子进程中读取，见 core.library_scanner）。
+    """
+    finished_signal = Signal(bool, object) # success, stats
+    progress_signal = Signal(int, int) # current, total
+    status_signal = Signal(str)
+
+    def __init__(self, directory, parent=None):
+        super().__init__(parent=parent)
+        self.directory = directory
+
+    def run(self):
+        try:
+            self.status_signal.emit("正在扫描下载目录...")
+            stats = scan_library(self.directory, progress_callback=self.progress_signal.emit,
+                                 cancel_event=self.cancel_event)
+            if stats is None:
+                return
+            self.finished_signal.emit(True, stats)
+        except Exception as e:
+            self.status_signal.emit(f"扫描下载目录时出错: {e}")
+            self.finished_signal.emit(False, None)
+
+
+class CoverThread(CancellableThread):
+    """
+    后台线程，获取正在播放歌曲的封面缩略图：本地文件读取嵌入的封面，在线播放下载封面地址。
+    """
+    finished_signal = Signal(bytes, int) # thumbnail data (empty if none), generation
+
+    def __init__(self, source, local=False, generation=0, parent=None):
+        super().__init__(generation=generation, parent=parent)
+        self.source = source
+        self.local = local
+
+    def _fetch(self, url):
+        response = get_session().get(url, timeout=(5, 10))
+        response.raise_for_status()
+        return response.content
+
+    def run(self):
+        cache = get_cover_cache()
+        try:
+            if self.local:
+                data = cache.thumbnail(read_cover(self.source))
+            else:
+                data = cache.thumbnail_for_url(self.source, self._fetch)
+        except Exception as e:
+            print(f"获取封面失败: {e}")
+            data = None
+        if not self.is_cancelled():
+            self.finished_signal.emit(data or b'', self.generation)
+
+
+class LyricsThread(CancellableThread):
+    """
+    后台线程，获取正在播放歌曲的歌词：本地文件优先读取嵌入的歌词，没有时在线请求。
+    """
+    finished_signal = Signal(str, bool, int) # lyric text (empty if none), from local file, generation
+
+    def __init__(self, song_id, local_path=None, generation=0, parent=None):
+        super().__init__(generation=generation, parent=parent)
+        self.song_id = song_id
+        self.local_path = local_path
+
+    def run(self):
+        lyric_text = read_lyrics(self.local_path) if self.local_path else None
+        from_local = bool(lyric_text)
+        if not lyric_text and self.song_id:
+            try:
+                lyric_data = get_lyric(self.song_id, cancel_event=self.cancel_event)
+                if lyric_data and lyric_data.get('lrc'):
+                    lyric_text = lyric_data['lrc']
+            except Exception as e:
+                print(f"获取歌词失败: {e}")
+        if not self.is_cancelled():
+            self.finished_signal.emit(lyric_text or '', from_local, self.generation)
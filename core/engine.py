@@ -0,0 +1,487 @@
+import os
+import re
+import mimetypes
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+from mutagen.mp3 import MP3
+from mutagen.flac import FLAC
+from mutagen.id3 import ID3, APIC, TPE1, TIT2, TALB, USLT, SYLT, ID3NoHeaderError
+from mutagen import File as MutagenFile
+
+from utils.lrc_parser import parse_lrc_line
+from core import metrics, timing
+from core.api import get_session, get_lyric
+from core.cover_cache import get_cover_cache
+from core.tag_padding import DEFAULT_TAG_RESERVE, HeaderReserver, keep_padding
+
+# 不依赖Qt的下载引擎：GUI线程（core.downloader）和命令行（core.cli）共用
+
+
+class DownloadCancelled(Exception):
+    """下载被取消"""
+
+
+def _plain_lyrics(lyric):
+    return re.sub(r'\[\d{2}:\d{2}(\.\d{2,3})?\]', '', lyric).strip()
+
+
+def _embed_metadata_mp3(audio_file_path, title, singer, album, lyric, cover):
+    """为MP3文件嵌入元数据"""
+    try:
+        try:
+            audio = MP3(audio_file_path, ID3=ID3)
+        except ID3NoHeaderError:
+            audio = MP3(audio_file_path)
+            audio.add_tags()
+
+        if audio.tags is None:
+            audio.add_tags()
+
+        tags = audio.tags
+        tags.add(TPE1(encoding=3, text=singer))
+        tags.add(TIT2(encoding=3, text=title))
+        tags.add(TALB(encoding=3, text=album))
+
+        # Embed lyrics
+        if lyric:
+            tags.add(USLT(encoding=3, lang='chi', desc='', text=_plain_lyrics(lyric)))
+
+            sylt_frames = []
+            for line in lyric.strip().split('\n'):
+                parsed = parse_lrc_line(line)
+                if parsed and parsed[1]:
+                    sylt_frames.append((parsed[1], parsed[0]))
+            if sylt_frames:
+                tags.add(SYLT(encoding=3, lang='chi', type=1, format=2, desc='Lyrics', text=sylt_frames))
+
+        # Embed cover
+        if cover:
+            cover_data, mime = cover
+            tags.add(APIC(encoding=3, mime=mime, type=3, desc='Cover', data=cover_data))
+
+        audio.save(padding=keep_padding)
+    except Exception as e:
+        raise Exception(f"MP3元数据嵌入失败: {e}")
+
+
+def _embed_metadata_flac(audio_file_path, title, singer, album, lyric, cover):
+    """为FLAC文件嵌入元数据"""
+    try:
+        audio = FLAC(audio_file_path)
+
+        audio['title'] = title
+        audio['artist'] = singer
+        audio['album'] = album
+
+        # FLAC的歌词存储为LYRICS标签
+        if lyric:
+            audio['lyrics'] = _plain_lyrics(lyric)
+
+        # Embed cover for FLAC
+        if cover:
+            from mutagen.flac import Picture
+
+            picture = Picture()
+            picture.data, picture.mime = cover
+            picture.type = 3  # Cover (front)
+            audio.add_picture(picture)
+
+        audio.save(padding=keep_padding)
+    except Exception as e:
+        raise Exception(f"FLAC元数据嵌入失败: {e}")
+
+
+def _embed_metadata_mp4(audio_file_path, title, singer, album, lyric, cover):
+    """为MP4/M4A文件嵌入元数据"""
+    try:
+        from mutagen.mp4 import MP4, MP4Cover
+
+        audio = MP4(audio_file_path)
+
+        audio['\xa9nam'] = title  # Title
+        audio['\xa9ART'] = singer  # Artist
+        audio['\xa9alb'] = album  # Album
+
+        # MP4的歌词
+        if lyric:
+            audio['\xa9lyr'] = _plain_lyrics(lyric)
+
+        # Embed cover for MP4
+        if cover:
+            cover_data, mime = cover
+
+            # 判断图片格式
+            if mime == 'image/png':
+                cover_format = MP4Cover.FORMAT_PNG
+            else:
+                cover_format = MP4Cover.FORMAT_JPEG
+
+            audio['covr'] = [MP4Cover(cover_data, imageformat=cover_format)]
+
+        audio.save(padding=keep_padding)
+    except Exception as e:
+        raise Exception(f"MP4元数据嵌入失败: {e}")
+
+
+def write_metadata(audio_file_path, song_details, cover_path=None):
+    """将歌名、歌手、专辑、歌词和封面写入音频文件
+
+    支持 MP3、FLAC、M4A 等格式，其他格式交给 mutagen 自动识别。
+    封面经 core.cover_cache 处理（按配置缩小，结果按内容缓存）后嵌入。
+    这是模块级函数，便于在其他线程或进程中执行。
+
+    Returns:
+        bool: 是否写入了元数据（不支持的格式返回False）
+
+    Raises:
+        Exception: 写入失败
+    """
+    file_ext = Path(audio_file_path).suffix.lower()
+
+    # 获取标准化的元数据
+    title = song_details.get('title', '')
+    if '[' in title and ']' in title:
+        title = title.rsplit('[', 1)[0].strip()
+    singer = song_details.get('singer', '')
+    album = song_details.get('album', '')
+    lyric = song_details.get('lyric', '')
+    cover = get_cover_cache().prepare_file(cover_path) if cover_path and os.path.exists(cover_path) else None
+
+    # 根据文件格式选择处理方式
+    if file_ext in ['.mp3', '.mp2', '.mp1']:
+        _embed_metadata_mp3(audio_file_path, title, singer, album, lyric, cover)
+    elif file_ext in ['.flac']:
+        _embed_metadata_flac(audio_file_path, title, singer, album, lyric, cover)
+    elif file_ext in ['.m4a', '.mp4', '.m4b', '.m4p']:
+        _embed_metadata_mp4(audio_file_path, title, singer, album, lyric, cover)
+    else:
+        # 对于其他格式，尝试使用mutagen自动识别
+        try:
+            audio = MutagenFile(audio_file_path, easy=True)
+        except Exception:
+            return False
+        if audio is None:
+            return False
+        audio['title'] = title
+        audio['artist'] = singer
+        audio['album'] = album
+        audio.save()
+    return True
+
+
+def song_filename_prefix(song_details):
+    """根据歌曲详情生成不含扩展名的文件名：'歌名 - 歌手'"""
+    # API详情返回的字段是'song'而不是'title'
+    title = song_details.get('song') or song_details.get('title', '未知歌名')
+    if '[' in title and ']' in title:
+        title = title.rsplit('[', 1)[0].strip()
+    singer = song_details.get('singer', '未知歌手')
+    return re.sub(r'[\\/*?:"<>|]', '', f"{title} - {singer}")
+
+
+class PendingSong:
+    """已下载完成、等待嵌入元数据和重命名的歌曲（DownloadEngine.fetch_song 的结果）"""
+
+    def __init__(self, song_details, temp_audio_path, temp_cover_path, final_path):
+        self.song_details = song_details
+        self.temp_audio_path = temp_audio_path
+        self.temp_cover_path = temp_cover_path
+        self.final_path = final_path
+
+
+class DownloadEngine:
+    """单曲下载流程：下载音频和封面、获取歌词、嵌入元数据、重命名为最终文件名
+
+    不依赖Qt。状态信息通过 status_callback 回调报告；
+    cancel_event（threading.Event）被设置后，正在进行的文件下载会在下一个数据块处中止。
+    传入 library（core.library_index.LibraryIndex）时，写好的文件会登记到下载库索引中；
+    各阶段（HEAD、音频、封面、嵌入元数据、重命名）的耗时记录到 recorder（core.timing.TimingRecorder），
+    默认为全局记录器；批量下载传入以全局记录器为 parent 的记录器，即可单独汇总本批次的吞吐。
+    process_song 依次执行 fetch_song（网络）和 finalize_song（本地），批量下载时两者可以由
+    core.pipeline.EmbedStage 分开在不同线程中执行。
+    """
+
+    def __init__(self, status_callback=None, cancel_event=None, library=None, recorder=None,
+                 reserve_tag_space=True):
+        self.status_callback = status_callback
+        self.cancel_event = cancel_event
+        self.library = library
+        self.recorder = recorder or timing.get_recorder()
+        # MP3/FLAC 下载时在文件头部预留标签空间（见 core.tag_padding）
+        self.reserve_tag_space = reserve_tag_space
+
+    def emit_status(self, message):
+        if self.status_callback:
+            self.status_callback(message)
+
+    def is_cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def download_file(self, url, file_path, progress_callback=None, reserver=None, stage='download'):
+        """Downloads a file to a specified path, with progress reporting.
+
+        传入 reserver（core.tag_padding.HeaderReserver）时，写盘的同时在文件头部预留标签空间。
+        耗时、数据量和结果以 stage（如 'audio'、'cover'）为阶段名记录到 self.recorder。
+        """
+        with self.recorder.span(stage) as span:
+            return self._download_file(url, file_path, progress_callback, reserver, span)
+
+    def _download_file(self, url, file_path, progress_callback, reserver, span):
+        try:
+            session = get_session()
+            response = session.get(url, stream=True, timeout=(10, 30))  # 下载使用更长超时
+            response.raise_for_status()
+
+            total_size = int(response.headers.get('content-length', 0))
+            downloaded_size = 0
+
+            with response, open(file_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=8192):
+                    if self.is_cancelled():
+                        raise DownloadCancelled()
+                    if chunk:
+                        f.write(reserver.feed(chunk) if reserver else chunk)
+                        downloaded_size += len(chunk)
+                        span.add_bytes(len(chunk))
+                        if progress_callback and total_size > 0:
+                            progress = int((downloaded_size / total_size) * 100)
+                            progress_callback(progress)
+                if reserver:
+                    f.write(reserver.flush())
+            return True
+        except DownloadCancelled:
+            span.fail('cancelled')
+            self.emit_status("下载已取消")
+            return False
+        except requests.exceptions.Timeout:
+            span.fail('timeout')
+            self.emit_status("文件下载超时，请检查网络连接")
+            return False
+        except requests.exceptions.ConnectionError:
+            span.fail('connection_error')
+            self.emit_status("网络连接错误，请检查网络设置")
+            return False
+        except requests.RequestException as e:
+            span.fail('http_error')
+            self.emit_status(f"文件下载失败: {e}")
+            return False
+
+    def record_in_library(self, path, song_details, quality_known=True):
+        """将文件登记到下载库索引（登记失败不影响下载结果）
+
+        Args:
+            quality_known: 文件是否以 song_details 中的音质下载；
+                           对已存在的同名文件为False，音质登记为未知
+        """
+        if self.library is None:
+            return
+        try:
+            self.library.record_details(path, song_details, quality_known)
+        except Exception as e:
+            print(f"登记下载库索引失败 {path}: {e}")
+
+    def embed_metadata(self, audio_file_path, song_details, temp_cover_path=None):
+        """Embeds metadata (lyrics, cover, etc.) into the audio file.
+
+        Supports multiple audio formats: MP3, FLAC, M4A, etc.
+
+        Returns:
+            bool: 是否成功嵌入（失败不影响下载结果，只报告状态）
+        """
+        with self.recorder.span('embed') as span:
+            try:
+                span.add_bytes(os.path.getsize(audio_file_path))
+                if not write_metadata(audio_file_path, song_details, temp_cover_path):
+                    span.fail('unsupported')
+                    file_ext = Path(audio_file_path).suffix.lower()
+                    self.emit_status(f"不支持的音频格式: {file_ext}，跳过元数据嵌入")
+                    return False
+                return True
+            except Exception as e:
+                span.fail()
+                self.emit_status(f"嵌入元数据失败: {e}")
+                return False
+
+    def resolve_extension(self, url):
+        """确定音频文件扩展名
+
+        优先从URL中提取扩展名（更可靠），因为服务器返回的Content-Type可能不准确
+        """
+        url_ext = os.path.splitext(urlparse(url).path)[1].lower()
+
+        if url_ext in ['.mp3', '.flac', '.m4a', '.ogg', '.wav', '.aac', '.wma']:
+            # URL中有明确的音频格式扩展名，直接使用
+            return url_ext
+
+        # URL中没有扩展名，尝试从Content-Type判断
+        with self.recorder.span('head') as span:
+            try:
+                session = get_session()
+                response = session.head(url, allow_redirects=True, timeout=(5, 10))
+                content_type = response.headers.get('Content-Type', '').lower()
+                return mimetypes.guess_extension(content_type) or '.mp3'
+            except requests.RequestException:
+                span.fail()
+                return '.mp3'
+
+    def process_song(self, song_details, download_dir, progress_callback=None):
+        """Main logic to download audio, cover, and embed metadata for a single song."""
+        pending = self.fetch_song(song_details, download_dir, progress_callback)
+        if not isinstance(pending, PendingSong):
+            return pending
+        return self.finalize_song(pending)
+
+    def fetch_song(self, song_details, download_dir, progress_callback=None):
+        """下载阶段：下载音频和封面、获取歌词（只涉及网络I/O）
+
+        Returns:
+            PendingSong: 待嵌入元数据的临时文件，交给 finalize_song 完成；
+            str: 文件已存在时返回其路径；
+            None: 失败或被取消
+        """
+        with metrics.active('download'):
+            result = self._fetch_song(song_details, download_dir, progress_callback)
+        if result is None:
+            metrics.inc('songs_total', result='cancelled' if self.is_cancelled() else 'failed')
+        elif not isinstance(result, PendingSong):
+            metrics.inc('songs_total', result='existing')
+        return result
+
+    def _fetch_song(self, song_details, download_dir, progress_callback):
+        url = song_details.get('url')
+        if not url:
+            # API详情返回的是'song'字段，不是'title'
+            song_name = song_details.get('song') or song_details.get('title', '未知歌名')
+            self.emit_status(f"歌曲 '{song_name}' 无有效链接，跳过。")
+            return None
+
+        download_path = Path(download_dir)
+        download_path.mkdir(parents=True, exist_ok=True)
+
+        title = song_details.get('song') or song_details.get('title', '未知歌名')
+        if '[' in title and ']' in title:
+            title = title.rsplit('[', 1)[0].strip()
+        filename_prefix = song_filename_prefix(song_details)
+        ext = self.resolve_extension(url)
+
+        final_path = download_path / f"{filename_prefix}{ext}"
+        if final_path.exists():
+            self.emit_status(f"文件 '{final_path.name}' 已存在。")
+            self.record_in_library(final_path, song_details, quality_known=False)
+            return str(final_path)  # Indicate that it exists, no need to re-download.
+
+        temp_audio_path = download_path / f"temp_{os.urandom(8).hex()}{ext}"
+        temp_cover_path = None
+
+        cover_url = song_details.get('cover')
+        if cover_url:
+            temp_cover_path = download_path / f"temp_cover_{os.urandom(8).hex()}.jpg"
+        # 封面和歌词与音频同时获取，音频下载完成时标签所需的数据通常已经就绪
+        extras = ThreadPoolExecutor(max_workers=2, thread_name_prefix='song-extras')
+        try:
+            cover_future = (extras.submit(self.download_file, cover_url, temp_cover_path, stage='cover')
+                            if cover_url else None)
+            lyric_future = extras.submit(self._fetch_lyric, song_details)
+
+            # Download audio
+            self.emit_status(f"正在下载: {title}...")
+            # 在文件头部预留标签空间，嵌入元数据时只需原地改写头部
+            reserver = HeaderReserver(ext, DEFAULT_TAG_RESERVE) if self.reserve_tag_space else None
+            if not self.download_file(url, temp_audio_path, progress_callback, reserver, stage='audio'):
+                return None
+
+            if cover_future is not None and not cover_future.result():
+                # 封面下载失败不影响主流程，但要清理临时文件
+                self._cleanup_temp_files(temp_cover_path)
+                temp_cover_path = None
+
+            lyric = lyric_future.result()
+            if lyric:
+                song_details['lyric'] = lyric
+
+            # 标准化字段名：将'song'字段复制为'title'以便元数据嵌入使用
+            if 'song' in song_details and 'title' not in song_details:
+                song_details['title'] = song_details['song']
+
+            pending = PendingSong(song_details, temp_audio_path, temp_cover_path, final_path)
+            temp_audio_path = temp_cover_path = None  # 交给 finalize_song 清理
+            return pending
+        except Exception as e:
+            self.emit_status(f"处理歌曲时发生错误: {e}")
+            return None
+        finally:
+            # 音频下载失败时等待封面下载结束，再清理临时文件
+            extras.shutdown(wait=True)
+            self._cleanup_temp_files(temp_audio_path, temp_cover_path)
+
+    def _fetch_lyric(self, song_details):
+        """获取歌词（新API需要单独请求），失败时返回None"""
+        song_id = song_details.get('songID') or song_details.get('id')
+        if not song_id:
+            return None
+        try:
+            # 与封面一样响应取消，取消后不必等歌词请求超时
+            lyric_data = get_lyric(song_id, cancel_event=self.cancel_event)
+        except Exception as e:
+            print(f"获取歌词失败: {e}")
+            return None
+        if lyric_data and lyric_data.get('lrc'):
+            return lyric_data['lrc']
+        return None
+
+    def finalize_song(self, pending):
+        """嵌入阶段：嵌入元数据并重命名为最终文件名（只涉及本地CPU和磁盘I/O）
+
+        Returns:
+            str: 最终文件路径，失败时返回None
+        """
+        with metrics.active('embed'):
+            path = self._finalize_song(pending)
+        metrics.inc('songs_total', result='downloaded' if path else 'failed')
+        return path
+
+    def _finalize_song(self, pending):
+        temp_audio_path = pending.temp_audio_path
+        try:
+            # Embed metadata
+            self.emit_status("正在嵌入元数据...")
+            self.embed_metadata(temp_audio_path, pending.song_details, pending.temp_cover_path)
+
+            # Rename to final filename
+            try:
+                with self.recorder.span('rename'):
+                    temp_audio_path.rename(pending.final_path)
+                temp_audio_path = None  # 重命名成功，不需要清理
+                self.record_in_library(pending.final_path, pending.song_details)
+                self.emit_status(f"下载完成: {pending.final_path.name}")
+                return str(pending.final_path)
+            except OSError as e:
+                self.emit_status(f"重命名文件失败: {e}")
+                return None
+
+        except Exception as e:
+            self.emit_status(f"处理歌曲时发生错误: {e}")
+            return None
+        finally:
+            # 确保清理所有临时文件（重命名成功的文件不会被清理）
+            self._cleanup_temp_files(temp_audio_path, pending.temp_cover_path)
+
+    def discard(self, pending):
+        """放弃尚未嵌入元数据的歌曲，删除其临时文件"""
+        metrics.inc('songs_total', result='cancelled')
+        self._cleanup_temp_files(pending.temp_audio_path, pending.temp_cover_path)
+
+    def _cleanup_temp_files(self, *temp_paths):
+        """清理临时文件的统一方法"""
+        for temp_path in temp_paths:
+            if temp_path:
+                try:
+                    # 支持Path对象和字符串路径
+                    path_obj = Path(temp_path) if not isinstance(temp_path, Path) else temp_path
+                    if path_obj.exists():
+                        path_obj.unlink()
+                except OSError as e:
+                    print(f"清理临时文件失败 {temp_path}: {e}")
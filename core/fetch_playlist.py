@@ -1,49 +1,205 @@
+import re
+import queue
+import threading
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
+from . import timing
 from .api import get_session
+from .song import SongRecord
 
-def fetch_qq_playlist(playlist_id):
+# API URL, a more reliable way to fetch playlist data
+PLAYLIST_URL = "https://c.y.qq.com/qzone/fcg-bin/fcg_ucc_getcdinfo_byids_cp.fcg"
+# 每页歌曲数，超大歌单按页并发获取
+PAGE_SIZE = 500
+
+# Set request headers to mimic a browser
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.120 Safari/537.36',
+    'Referer': 'https://y.qq.com/',
+}
+
+
+class PlaylistFetchError(Exception):
+    """获取歌单的某一页失败"""
+
+
+def parse_playlist_ids(text):
+    """解析以逗号或空白分隔的一个或多个歌单ID，格式不符时返回None"""
+    text = str(text).strip()
+    if not re.fullmatch(r'\d+(?:[\s,，]+\d+)*', text):
+        return None
+    ids = re.split(r'[\s,，]+', text)
+    return list(dict.fromkeys(ids))  # 去重并保持顺序
+
+
+def _parse_song_item(song_item):
+    song_title = song_item.get('songname', '')
+
+    # Extract singer names, which might be multiple
+    singers = song_item.get('singer', [])
+    singer_names = ' / '.join([s.get('name', '') for s in singers])
+
+    if song_title and singer_names:
+        return SongRecord(title=song_title, singer=singer_names, album=song_item.get('albumname', ''),
+                          mid=song_item.get('songmid', ''))
+    return None
+
+
+def _fetch_page(playlist_id, song_begin, song_num):
+    """获取歌单的一页
+
+    Returns:
+        tuple: (songs, total_song_num, 本页原始条目数)
     """
-    通过 QQ 音乐歌单 API 获取歌单内所有歌曲信息
+    params = {
+        'disstid': playlist_id, 'type': 1, 'json': 1, 'utf8': 1, 'onlysong': 0,
+        'song_begin': song_begin, 'song_num': song_num, 'format': 'json',
+    }
+    with timing.span('playlist_page') as span:
+        try:
+            session = get_session()
+            response = session.get(PLAYLIST_URL, params=params, headers=HEADERS, timeout=(10, 20))
+            response.raise_for_status()  # Raise an exception for bad status codes
+            span.add_bytes(len(response.content))
+            data = response.json()
+        except requests.exceptions.RequestException as e:
+            raise PlaylistFetchError(f"Error during API request: {e}") from e
+        except json.JSONDecodeError as e:
+            raise PlaylistFetchError("Failed to parse JSON data") from e
+
+    if not data.get('cdlist'):
+        return [], 0, 0
+    cd = data['cdlist'][0]
+    song_list = cd.get('songlist') or []
+    songs = [song for song in map(_parse_song_item, song_list) if song]
+    total = cd.get('total_song_num') or cd.get('songnum') or len(song_list)
+    return songs, int(total), len(song_list)
+
+
+def iter_qq_playlist(playlist_id, page_size=PAGE_SIZE, max_workers=4, cancel_event=None, on_total=None):
     """
-    # API URL, a more reliable way to fetch playlist data
-    url = f"https://c.y.qq.com/qzone/fcg-bin/fcg_ucc_getcdinfo_byids_cp.fcg?disstid={playlist_id}&type=1&json=1&utf8=1&onlysong=0&format=json"
+    分页获取 QQ 音乐歌单，按歌单顺序逐首产出歌曲
 
-    # Set request headers to mimic a browser
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.120 Safari/537.36',
-        'Referer': 'https://y.qq.com/',
-    }
+    第一页确定歌曲总数后，其余页面最多 max_workers 页同时请求；
+    页面按顺序产出，先到的后续页面在内存中等待，因此内存占用只与并发页数有关。
+
+    Args:
+        playlist_id: 歌单ID
+        page_size: 每页歌曲数
+        max_workers: 同时请求的页数
+        cancel_event: 可选的 threading.Event，置位后停止获取
+        on_total: 可选回调，得知歌曲总数后调用 on_total(total)
 
+    Raises:
+        PlaylistFetchError: 某一页获取失败（已产出的歌曲仍然有效，但歌单不完整）
+    """
+    songs, total, raw_count = _fetch_page(playlist_id, 0, page_size)
+    if on_total:
+        on_total(total)
+    yield from songs
+    # 接口忽略分页参数时第一页即为完整歌单
+    if raw_count == 0 or raw_count >= total:
+        return
+
+    begins = iter(range(raw_count, total, page_size))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = []
+        for begin in begins:
+            pending.append(executor.submit(_fetch_page, playlist_id, begin, page_size))
+            if len(pending) >= max_workers:
+                break
+        while pending:
+            if cancel_event is not None and cancel_event.is_set():
+                for future in pending:
+                    future.cancel()
+                return
+            page_songs, _, _ = pending.pop(0).result()
+            # 取走一页后补充下一页请求，保持固定的并发窗口
+            begin = next(begins, None)
+            if begin is not None:
+                pending.append(executor.submit(_fetch_page, playlist_id, begin, page_size))
+            yield from page_songs
+
+
+def fetch_qq_playlists(playlist_ids, max_workers=4, cancel_event=None, on_total=None, on_error=None):
+    """
+    并发获取多个歌单，按到达顺序产出 (playlist_id, song)
+
+    每个歌单内部保持歌单顺序；某个歌单失败时调用 on_error(playlist_id, error)，不影响其他歌单。
+
+    Args:
+        playlist_ids: 歌单ID列表
+        max_workers: 同时获取的歌单数
+        cancel_event: 可选的 threading.Event，置位后停止获取
+        on_total: 可选回调 on_total(playlist_id, total)
+        on_error: 可选回调 on_error(playlist_id, error)
+    """
+    # 有界队列：消费方（匹配）较慢时，获取线程会被阻塞，避免整份歌单堆积在内存中
+    results = queue.Queue(maxsize=PAGE_SIZE)
+    done = object()
+    stop_event = threading.Event()
+
+    def stopped():
+        return stop_event.is_set() or (cancel_event is not None and cancel_event.is_set())
+
+    def put(item):
+        while not stopped():
+            try:
+                results.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker(playlist_id):
+        try:
+            total_callback = (lambda total: on_total(playlist_id, total)) if on_total else None
+            for song in iter_qq_playlist(playlist_id, cancel_event=stop_event, on_total=total_callback):
+                if not put((playlist_id, song)):
+                    return
+        except Exception as e:
+            put((playlist_id, e))
+        finally:
+            put(done)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(playlist_ids))))
     try:
-        session = get_session()
-        response = session.get(url, headers=headers, timeout=(10, 20))
-        response.raise_for_status()  # Raise an exception for bad status codes
-
-        data = response.json()
-        
-        songs = []
-        if 'cdlist' in data and data['cdlist']:
-            song_list = data['cdlist'][0].get('songlist', [])
-            for song_item in song_list:
-                song_title = song_item.get('songname', '')
-                
-                # Extract singer names, which might be multiple
-                singers = song_item.get('singer', [])
-                singer_names = ' / '.join([s.get('name', '') for s in singers])
-                
-                if song_title and singer_names:
-                    songs.append({
-                        'title': song_title,
-                        'singer': singer_names,
-                    })
-        return songs
-
-    except requests.exceptions.RequestException as e:
-        print(f"Error during API request: {e}")
-        return []
-    except json.JSONDecodeError:
-        print("Failed to parse JSON data")
+        for playlist_id in playlist_ids:
+            executor.submit(worker, playlist_id)
+        remaining = len(playlist_ids)
+        while remaining:
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            try:
+                item = results.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if item is done:
+                remaining -= 1
+                continue
+            playlist_id, payload = item
+            if isinstance(payload, Exception):
+                if on_error:
+                    on_error(playlist_id, payload)
+                else:
+                    print(f"获取歌单 {playlist_id} 失败: {payload}")
+                continue
+            yield playlist_id, payload
+    finally:
+        # 消费方提前结束时通知获取线程退出
+        stop_event.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def fetch_qq_playlist(playlist_id):
+    """
+    通过 QQ 音乐歌单 API 获取歌单内所有歌曲信息
+    """
+    try:
+        return list(iter_qq_playlist(playlist_id))
+    except PlaylistFetchError as e:
+        print(e)
         return []
 
 # For testing purposes
@@ -55,4 +211,4 @@ if __name__ == '__main__':
         for i, song in enumerate(song_list, 1):  # Print all songs
             print(f"  {i}. {song['title']} - {song['singer']}")
     else:
-        print("Could not fetch any songs.")
\ No newline at end of file
+        print("Could not fetch any songs.")
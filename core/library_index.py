@@ -0,0 +1,287 @@
+"""
+已下载歌曲的本地索引。
+
+下载完成的文件在写入时登记到 SQLite 数据库（歌曲ID、规范化的歌名/歌手、音质、路径、大小、修改时间、部分哈希），
+批量下载前先查询索引，已下载的歌曲无需任何网络请求即可跳过。
+索引丢失或与磁盘不一致时，可以扫描下载目录重建。
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from core import metrics
+from core.matcher import song_key
+
+AUDIO_EXTENSIONS = ('.mp3', '.flac', '.m4a', '.ogg', '.wav', '.aac', '.wma')
+# 部分哈希读取文件首尾各多少字节
+HASH_CHUNK_SIZE = 64 * 1024
+
+# 由 core.library_scanner 从标签中读取的列（旧版本的数据库在打开时补充）
+SCAN_COLUMNS = (
+    ('album', 'TEXT'),
+    ('duration', 'REAL'),
+    ('has_lyrics', 'INTEGER'),
+    ('has_cover', 'INTEGER'),
+    ('scanned_at', 'REAL'),
+)
+# 后来增加的其他列（旧版本的数据库在打开时补充）
+DOWNLOAD_COLUMNS = (
+    ('requested_quality', 'INTEGER'),
+)
+
+_library = None
+_library_lock = threading.Lock()
+
+
+def default_db_path():
+    app_data_dir = Path.home() / "AppData" / "Roaming" / "MusicDownloader"
+    app_data_dir.mkdir(parents=True, exist_ok=True)
+    return app_data_dir / "library.db"
+
+
+def get_library():
+    """获取全局的下载库索引"""
+    global _library
+    with _library_lock:
+        if _library is None:
+            _library = LibraryIndex()
+        return _library
+
+
+def key_columns(title, singer):
+    """将 song_key 转换为可存入数据库的 (title_key, singer_key) 字符串"""
+    base, tags, singers = song_key(title, singer)
+    title_key = base + ('|' + ','.join(sorted(tags)) if tags else '')
+    return title_key, ','.join(sorted(singers))
+
+
+def partial_hash(path, size=None):
+    """文件大小 + 首尾各64KB内容的 SHA1，足以识别被替换的文件，且不必读取整个文件"""
+    size = os.path.getsize(path) if size is None else size
+    digest = hashlib.sha1(str(size).encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read(HASH_CHUNK_SIZE))
+        if size > 2 * HASH_CHUNK_SIZE:
+            f.seek(-HASH_CHUNK_SIZE, os.SEEK_END)
+            digest.update(f.read(HASH_CHUNK_SIZE))
+    return digest.hexdigest()
+
+
+def parse_filename(path):
+    """从 '歌名 - 歌手.ext' 形式的文件名中解析歌名和歌手，无法解析时返回 (文件名, '')"""
+    stem = Path(path).stem
+    if ' - ' in stem:
+        title, singer = stem.rsplit(' - ', 1)
+        return title.strip(), singer.strip()
+    return stem.strip(), ''
+
+
+class LibraryIndex:
+    """基于 SQLite 的已下载文件索引（线程安全）"""
+
+    def __init__(self, db_path=None):
+        self.db_path = Path(db_path) if db_path else default_db_path()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    song_id TEXT,
+                    title TEXT,
+                    singer TEXT,
+                    title_key TEXT NOT NULL,
+                    singer_key TEXT NOT NULL,
+                    quality INTEGER,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    hash TEXT,
+                    added_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_files_song_id ON files (song_id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_files_key ON files (title_key, singer_key)")
+            existing = {row['name'] for row in self._conn.execute("PRAGMA table_info(files)")}
+            for name, column_type in SCAN_COLUMNS + DOWNLOAD_COLUMNS:
+                if name not in existing:
+                    self._conn.execute(f"ALTER TABLE files ADD COLUMN {name} {column_type}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def record(self, path, song_id=None, title='', singer='', quality=None, requested_quality=None):
+        """登记（或更新）一个已写入的文件
+
+        Args:
+            quality: 文件实际的音质等级
+            requested_quality: 下载时请求的音质等级（音质协商降级时高于 quality）
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        file_hash = partial_hash(path, stat.st_size)
+        title_key, singer_key = key_columns(title, singer)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, song_id, title, singer, title_key, singer_key, quality, "
+                "requested_quality, size, mtime, hash, added_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, None if song_id is None else str(song_id), title, singer, title_key, singer_key,
+                 quality, requested_quality, stat.st_size, stat.st_mtime, file_hash, time.time()))
+
+    def record_details(self, path, song_details, quality_known=True):
+        """根据歌曲详情（core.api.get_song_details 的结果）登记文件
+
+        Args:
+            quality_known: 为False时（文件并非按该详情下载）音质登记为未知
+        """
+        self.record(path,
+                    song_id=song_details.get('id') or song_details.get('songID'),
+                    title=song_details.get('song') or song_details.get('title', ''),
+                    singer=song_details.get('singer', ''),
+                    quality=song_details.get('quality_level') if quality_known else None,
+                    requested_quality=song_details.get('requested_quality') if quality_known else None)
+
+    def record_scan(self, path, info, song_id=None, quality=None):
+        """登记扫描得到的文件信息
+
+        Args:
+            path: 文件路径
+            info: core.library_scanner.read_tags 的结果（含 size、mtime、hash 及标签字段）
+            song_id: 沿用的歌曲ID（文件原先由下载登记时保留）
+            quality: 沿用的音质等级
+        """
+        path = os.path.abspath(path)
+        title, singer = info.get('title'), info.get('singer')
+        if not title:
+            title, parsed_singer = parse_filename(path)
+            singer = singer or parsed_singer
+        title_key, singer_key = key_columns(title, singer or '')
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, song_id, title, singer, title_key, singer_key, quality, "
+                "size, mtime, hash, added_at, album, duration, has_lyrics, has_cover, scanned_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, None if song_id is None else str(song_id), title, singer or '', title_key, singer_key,
+                 quality, info['size'], info['mtime'], info.get('hash'), time.time(),
+                 info.get('album') or '', info.get('duration'), int(bool(info.get('has_lyrics'))),
+                 int(bool(info.get('has_cover'))), time.time()))
+
+    def remove(self, path):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files WHERE path = ?", (os.path.abspath(path),))
+
+    def _is_current(self, row):
+        """文件仍存在且大小、修改时间与登记时一致"""
+        try:
+            stat = os.stat(row['path'])
+        except OSError:
+            return False
+        return stat.st_size == row['size'] and abs(stat.st_mtime - row['mtime']) < 1e-3
+
+    @staticmethod
+    def _satisfies(row, quality, accept_unknown_quality):
+        if row['quality'] is None:
+            return accept_unknown_quality
+        requested = row['requested_quality']
+        return row['quality'] >= quality or (requested is not None and requested >= quality)
+
+    def lookup(self, song, directory=None, quality=None, accept_unknown_quality=True):
+        """查找已下载的歌曲文件
+
+        先按歌曲ID查找，再按规范化的歌名/歌手查找；只检查文件元数据（stat），不发起网络请求。
+        已不存在或被修改的文件会从索引中移除。
+
+        指定 quality 时只接受音质足够的文件，以便用更高的音质重新下载：文件的音质不低于 quality，
+        或下载时请求的音质不低于 quality（当时已协商到该歌曲可用的最高音质，重新下载也不会更好）。
+        扫描登记的文件音质未知，由 accept_unknown_quality 决定：默认视为足够，
+        避免扫描过的下载目录在每次批量下载时被全部重新下载。
+
+        Args:
+            song: 含 id、title、singer 的歌曲信息
+            directory: 只接受该目录中的文件（None 表示任意目录）
+            quality: 需要的最低音质等级（None 表示任意音质）
+            accept_unknown_quality: 是否接受音质未知的文件
+
+        Returns:
+            str: 文件路径，没有找到时返回None
+        """
+        title_key, singer_key = key_columns(song.get('title'), song.get('singer'))
+        with self._lock:
+            rows = []
+            if song.get('id') is not None:
+                rows = self._conn.execute("SELECT * FROM files WHERE song_id = ?",
+                                          (str(song.get('id')),)).fetchall()
+            rows += self._conn.execute("SELECT * FROM files WHERE title_key = ? AND singer_key = ?",
+                                       (title_key, singer_key)).fetchall()
+
+        directory = os.path.abspath(directory) if directory is not None else None
+        stale = []
+        found = None
+        for row in rows:
+            if directory is not None and os.path.dirname(row['path']) != directory:
+                continue
+            if quality is not None and not self._satisfies(row, quality, accept_unknown_quality):
+                continue
+            if self._is_current(row):
+                found = row['path']
+                break
+            stale.append(row['path'])
+        for path in stale:
+            self.remove(path)
+        metrics.cache_access('library', found is not None)
+        return found
+
+    def rows_in(self, directory):
+        """返回索引中位于 directory（含子目录）内的所有记录，按路径索引"""
+        prefix = os.path.join(os.path.abspath(directory), '')
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM files WHERE substr(path, 1, ?) = ?",
+                                      (len(prefix), prefix)).fetchall()
+        return {row['path']: row for row in rows}
+
+    def paths_in(self, directory):
+        """返回索引中位于 directory（含子目录）内的所有路径"""
+        return list(self.rows_in(directory))
+
+    def rebuild(self, directory):
+        """扫描下载目录，使索引与磁盘一致
+
+        未变化的文件保留原有记录（包括歌曲ID和音质）；新增或被修改的文件按 '歌名 - 歌手' 文件名登记；
+        已删除的文件从索引移除。
+
+        Returns:
+            dict: {'added': 新登记数, 'removed': 移除数, 'unchanged': 未变化数}
+        """
+        directory = os.path.abspath(directory)
+        known = self.rows_in(directory)
+
+        stats = {'added': 0, 'removed': 0, 'unchanged': 0}
+        seen = set()
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if not name.lower().endswith(AUDIO_EXTENSIONS) or name.startswith('temp_'):
+                    continue
+                path = os.path.join(root, name)
+                seen.add(path)
+                row = known.get(path)
+                if row is not None and self._is_current(row):
+                    stats['unchanged'] += 1
+                    continue
+                title, singer = parse_filename(path)
+                try:
+                    self.record(path, song_id=row['song_id'] if row is not None else None,
+                                title=title, singer=singer)
+                    stats['added'] += 1
+                except OSError:
+                    continue
+
+        for path in known:
+            if path not in seen:
+                self.remove(path)
+                stats['removed'] += 1
+        return stats
@@ -0,0 +1,266 @@
+"""
+下载目录扫描：读取已有音频文件的标签，登记到已下载歌曲索引（core.library_index）。
+
+用 mutagen 解析标签（歌名、歌手、专辑、时长，以及是否嵌入了歌词和封面）是CPU密集的工作，
+文件较多时放到进程池中并行完成。扫描是增量的：以 (路径, 修改时间, 大小) 判断文件是否变化，
+已扫描且未变化的文件不会再次读取；结果逐个写入索引，中途取消也不会丢失已完成的部分。
+扫描结果用于去重、"已下载"判断和离线播放。本模块不依赖Qt。
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from mutagen import File as MutagenFile
+
+from core.library_index import AUDIO_EXTENSIONS, get_library, partial_hash
+
+# 需要读取的文件少于此数量时直接在当前进程中读取（启动子进程的开销大于并行的收益）
+MIN_FILES_FOR_POOL = 32
+# 每次交给子进程的文件数
+POOL_CHUNK_SIZE = 8
+
+# 各种标签格式中歌名、歌手、专辑、歌词、封面对应的键
+_VORBIS_KEYS = ('title', 'artist', 'album', ('lyrics', 'unsyncedlyrics'), ('metadata_block_picture',))
+_MP4_KEYS = ('\xa9nam', '\xa9ART', '\xa9alb', ('\xa9lyr',), ('covr',))
+_ASF_KEYS = ('Title', 'Author', 'WM/AlbumTitle', ('WM/Lyrics',), ('WM/Picture',))
+
+
+def _first_text(value):
+    """标签值可能是列表或帧对象，统一取第一个文本"""
+    if value is None:
+        return ''
+    if hasattr(value, 'text'):
+        value = value.text
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else ''
+    return str(value).strip()
+
+
+def _read_id3(tags):
+    return (_first_text(tags.get('TIT2')), _first_text(tags.get('TPE1')), _first_text(tags.get('TALB')),
+            bool(tags.getall('USLT') or tags.getall('SYLT')), bool(tags.getall('APIC')))
+
+
+def _read_mapping(tags, keys):
+    title_key, singer_key, album_key, lyric_keys, cover_keys = keys
+    return (_first_text(tags.get(title_key)), _first_text(tags.get(singer_key)),
+            _first_text(tags.get(album_key)),
+            any(tags.get(key) for key in lyric_keys), any(tags.get(key) for key in cover_keys))
+
+
+def read_tags(path):
+    """读取一个音频文件的标签（在子进程中执行，因此是模块级函数且只返回可序列化的数据）
+
+    Returns:
+        dict: path、size、mtime、hash，以及 title、singer、album、duration、has_lyrics、has_cover；
+              无法识别或读取失败时只含文件信息和 error
+    """
+    try:
+        stat = os.stat(path)
+        info = {'path': path, 'size': stat.st_size, 'mtime': stat.st_mtime,
+                'hash': partial_hash(path, stat.st_size)}
+    except OSError as e:
+        return {'path': path, 'error': str(e)}
+
+    try:
+        audio = MutagenFile(path)
+    except Exception as e:
+        info['error'] = str(e)
+        return info
+    if audio is None:
+        info['error'] = "无法识别的音频格式"
+        return info
+
+    length = getattr(audio.info, 'length', None)
+    info['duration'] = round(length, 2) if length else None
+
+    tags = audio.tags
+    title = singer = album = ''
+    has_lyrics = has_cover = False
+    if tags is not None:
+        tag_type = type(tags).__name__
+        if hasattr(tags, 'getall'):  # ID3（MP3、WAV、AIFF）
+            title, singer, album, has_lyrics, has_cover = _read_id3(tags)
+        elif tag_type == 'MP4Tags':
+            title, singer, album, has_lyrics, has_cover = _read_mapping(tags, _MP4_KEYS)
+        elif tag_type == 'ASFTags':
+            title, singer, album, has_lyrics, has_cover = _read_mapping(tags, _ASF_KEYS)
+        else:  # Vorbis 注释（FLAC、Ogg）
+            title, singer, album, has_lyrics, has_cover = _read_mapping(tags, _VORBIS_KEYS)
+    # FLAC 的封面保存在单独的 PICTURE 块中
+    has_cover = has_cover or bool(getattr(audio, 'pictures', None))
+
+    info.update(title=title, singer=singer, album=album, has_lyrics=has_lyrics, has_cover=has_cover)
+    return info
+
+
+def _format_lrc_time(milliseconds):
+    minutes, milliseconds = divmod(int(milliseconds), 60000)
+    return f"[{minutes:02d}:{milliseconds // 1000:02d}.{milliseconds % 1000 // 10:02d}]"
+
+
+def read_lyrics(path):
+    """读取文件中嵌入的歌词
+
+    优先使用带时间轴的 SYLT 帧（转换为LRC文本），其次是不带时间轴的歌词标签。
+
+    Returns:
+        str: 歌词文本，没有嵌入歌词或读取失败时返回None
+    """
+    try:
+        audio = MutagenFile(path)
+    except Exception as e:
+        print(f"读取歌词标签失败: {e}")
+        return None
+    tags = audio.tags if audio is not None else None
+    if tags is None:
+        return None
+
+    if hasattr(tags, 'getall'):
+        for frame in tags.getall('SYLT'):
+            # format 2 表示时间单位为毫秒
+            if frame.format == 2 and frame.text:
+                return '\n'.join(f"{_format_lrc_time(time)}{text}" for text, time in frame.text)
+        for frame in tags.getall('USLT'):
+            if frame.text.strip():
+                return frame.text
+        return None
+
+    tag_type = type(tags).__name__
+    keys = _MP4_KEYS if tag_type == 'MP4Tags' else _ASF_KEYS if tag_type == 'ASFTags' else _VORBIS_KEYS
+    for key in keys[3]:
+        text = _first_text(tags.get(key))
+        if text:
+            return text
+    return None
+
+
+def read_cover(path):
+    """读取文件中嵌入的封面图片数据，没有封面或读取失败时返回None"""
+    try:
+        audio = MutagenFile(path)
+    except Exception as e:
+        print(f"读取封面标签失败: {e}")
+        return None
+    if audio is None:
+        return None
+    pictures = getattr(audio, 'pictures', None)
+    if pictures:
+        return pictures[0].data
+    tags = audio.tags
+    if tags is None:
+        return None
+    if hasattr(tags, 'getall'):
+        frames = tags.getall('APIC')
+        return frames[0].data if frames else None
+    covers = tags.get('covr')
+    if covers:
+        return bytes(covers[0])
+    return None
+
+
+def _audio_files(directory):
+    """遍历目录中的音频文件，返回 {路径: stat}（跳过下载中的临时文件）"""
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if not name.lower().endswith(AUDIO_EXTENSIONS) or name.startswith('temp_'):
+                continue
+            path = os.path.join(root, name)
+            try:
+                files[path] = os.stat(path)
+            except OSError:
+                continue
+    return files
+
+
+def _read_all(paths, max_workers):
+    """按顺序产出 read_tags 的结果；可以使用进程池时并行读取，否则在当前进程中读取"""
+    if len(paths) < MIN_FILES_FOR_POOL or max_workers == 1:
+        yield from map(read_tags, paths)
+        return
+
+    try:
+        # spawn 在各平台上行为一致，且不会把主进程的线程和Qt状态复制到子进程
+        executor = ProcessPoolExecutor(max_workers=max_workers,
+                                       mp_context=multiprocessing.get_context('spawn'))
+    except (OSError, ValueError, NotImplementedError) as e:
+        print(f"无法启动扫描进程池，改为单进程扫描: {e}")
+        yield from map(read_tags, paths)
+        return
+
+    done = 0
+    try:
+        for info in executor.map(read_tags, paths, chunksize=POOL_CHUNK_SIZE):
+            done += 1
+            yield info
+    except (BrokenProcessPool, OSError) as e:
+        print(f"扫描进程池异常，剩余文件改为单进程扫描: {e}")
+        yield from map(read_tags, paths[done:])
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def scan_library(directory, library=None, max_workers=None, progress_callback=None, cancel_event=None):
+    """增量扫描下载目录，读取标签并登记到索引
+
+    已扫描过且 (修改时间, 大小) 未变化的文件直接跳过；新增或变化的文件读取标签后逐个写入；
+    已从磁盘删除的文件从索引移除。原先由下载登记的歌曲ID和音质会被保留。
+
+    Args:
+        directory: 下载目录
+        library: LibraryIndex，默认使用全局索引
+        max_workers: 进程数，默认为CPU核数
+        progress_callback: 接收 (已处理数, 需要读取的总数) 的函数
+        cancel_event: threading.Event，置位后停止扫描（已写入的结果保留）
+
+    Returns:
+        dict: {'scanned': 读取标签数, 'unchanged': 未变化数, 'removed': 移除数, 'failed': 无法读取标签数}，
+              取消时返回None
+    """
+    library = library or get_library()
+    directory = os.path.abspath(directory)
+    known = library.rows_in(directory)
+    files = _audio_files(directory)
+
+    stats = {'scanned': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+    changed = []
+    for path, stat in files.items():
+        row = known.get(path)
+        if (row is not None and row['scanned_at'] is not None and row['size'] == stat.st_size
+                and abs(row['mtime'] - stat.st_mtime) < 1e-3):
+            stats['unchanged'] += 1
+        else:
+            changed.append(path)
+
+    for path in known:
+        if path not in files:
+            library.remove(path)
+            stats['removed'] += 1
+
+    total = len(changed)
+    if progress_callback:
+        progress_callback(0, total)
+    results = _read_all(changed, max_workers or os.cpu_count() or 1)
+    try:
+        for index, info in enumerate(results, 1):
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            if 'size' not in info:
+                # 读取期间文件已被删除
+                library.remove(info['path'])
+                continue
+            row = known.get(info['path'])
+            if info.get('error'):
+                stats['failed'] += 1
+            else:
+                stats['scanned'] += 1
+            library.record_scan(info['path'], info,
+                                song_id=row['song_id'] if row is not None else None,
+                                quality=row['quality'] if row is not None else None)
+            if progress_callback:
+                progress_callback(index, total)
+    finally:
+        results.close()
+    return stats
@@ -0,0 +1,232 @@
+"""
+歌曲模糊匹配打分。
+
+导入歌单、同步和重新获取歌曲详情时，需要在搜索结果中找出与目标最接近的一首。
+比较前先做规范化：全角转半角、繁体转简体（安装 opencc 时）、统一小写，
+去掉歌名中的括号标签（[酷我]、(电视剧主题曲) 等），但记录其中的版本标签（Live、Remix、伴奏……），
+歌手拆分为集合后比较，与多位歌手的书写顺序无关。
+规范化结果按字符串缓存，对成千上万个候选打分时每个字符串只处理一次。
+"""
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+# opencc 为可选依赖：安装后繁体与简体写法视为相同
+try:
+    from opencc import OpenCC
+    try:
+        _t2s = OpenCC('t2s').convert
+    except Exception:
+        _t2s = OpenCC('t2s.json').convert
+except ImportError:
+    _t2s = None
+
+# 接受匹配的最低置信度
+MATCH_THRESHOLD = 0.6
+# 认为是同一首歌（可以直接使用该结果，无需退回原ID）的置信度
+SAME_SONG_THRESHOLD = 0.85
+
+# 歌名与歌手的权重；专辑和时长只在双方都有时参与计算
+TITLE_WEIGHT = 0.55
+SINGER_WEIGHT = 0.35
+ALBUM_WEIGHT = 0.05
+DURATION_WEIGHT = 0.05
+# 每个不一致的版本标签的扣分
+VERSION_PENALTY = 0.2
+# 时长相差多少秒时时长得分降为0
+DURATION_TOLERANCE = 10
+
+# 版本标签：出现在一方而不在另一方时说明很可能不是同一个版本
+VERSION_TAGS = {
+    'live': ('live', '现场', '演唱会'),
+    'remix': ('remix', 'mix', '混音'),
+    'dj': ('dj',),
+    'instrumental': ('伴奏', 'instrumental', '纯音乐', 'karaoke', 'ktv', 'off vocal'),
+    'acoustic': ('acoustic', '不插电'),
+    'cover': ('cover', '翻唱', '翻自'),
+    'demo': ('demo',),
+    'clip': ('片段', '试听', '铃声'),
+    'speedup': ('加速', '降调', '升调', 'sped up', 'slowed', '0.8x', '1.2x'),
+}
+
+_BRACKET_PATTERN = re.compile(r'[(\[【（{]([^()\[\]【】（）{}]*)[)\]】）}]')
+_SUFFIX_PATTERN = re.compile(r'\s+-\s+(.+)$')
+_SINGER_SPLIT_PATTERN = re.compile(r'\s*(?:/|&|、|,|，|;|；)\s*|\s+(?:feat\.?|ft\.?|with|x|×)\s+')
+
+
+@lru_cache(maxsize=65536)
+def normalize(text):
+    """全角转半角、繁体转简体、统一小写并去除所有空白"""
+    text = unicodedata.normalize('NFKC', str(text or ''))
+    if _t2s is not None:
+        text = _t2s(text)
+    return ''.join(text.split()).lower()
+
+
+def _version_tags(segment):
+    segment = unicodedata.normalize('NFKC', segment).lower()
+    return {tag for tag, words in VERSION_TAGS.items() if any(word in segment for word in words)}
+
+
+@lru_cache(maxsize=65536)
+def normalize_title(title):
+    """规范化歌名
+
+    Returns:
+        tuple: (去掉括号标签后的规范化歌名, 版本标签 frozenset)
+    """
+    title = unicodedata.normalize('NFKC', str(title or ''))
+    tags = set()
+    for segment in _BRACKET_PATTERN.findall(title):
+        tags |= _version_tags(segment)
+    base = _BRACKET_PATTERN.sub(' ', title)
+    # "歌名 - Live Version" 形式的后缀
+    suffix = _SUFFIX_PATTERN.search(base)
+    if suffix and _version_tags(suffix.group(1)):
+        tags |= _version_tags(suffix.group(1))
+        base = base[:suffix.start()]
+    base = normalize(base)
+    if not base:
+        # 整个歌名都在括号中
+        base = normalize(title)
+    return base, frozenset(tags)
+
+
+@lru_cache(maxsize=65536)
+def singer_set(singer):
+    """将 "A / B"、"A&B"、"A、B" 等多歌手写法拆分为规范化的歌手集合"""
+    text = unicodedata.normalize('NFKC', str(singer or '')).lower()
+    names = (normalize(name) for name in _SINGER_SPLIT_PATTERN.split(text))
+    return frozenset(name for name in names if name)
+
+
+def song_key(title, singer):
+    """判断两首歌是否相同的键：(规范化歌名, 版本标签, 歌手集合)"""
+    base, tags = normalize_title(title)
+    return base, tags, singer_set(singer)
+
+
+def _duration_seconds(song):
+    value = song.get('duration') or song.get('interval')
+    if value in (None, ''):
+        return None
+    try:
+        if isinstance(value, str) and ':' in value:
+            minutes, seconds = value.split(':', 1)
+            return int(minutes) * 60 + float(seconds)
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    # 毫秒
+    return value / 1000 if value > 10000 else value
+
+
+def _match_key_of(song):
+    if isinstance(song, MatchKey):
+        return song
+    # SongRecord 缓存了自己的 MatchKey
+    return getattr(song, 'match_key', None) or MatchKey(song)
+
+
+class MatchKey:
+    """一首歌预先计算好的规范化比较键"""
+    __slots__ = ('title', 'tags', 'singers', 'album', 'duration')
+
+    def __init__(self, song):
+        self.title, self.tags = normalize_title(song.get('title', ''))
+        self.singers = singer_set(song.get('singer', ''))
+        self.album = normalize(song.get('album', ''))
+        self.duration = _duration_seconds(song)
+
+
+def _similarity(a, b, floor=0.0):
+    """字符串相似度；上界低于 floor 时跳过昂贵的完整计算"""
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    if 2 * min(len(a), len(b)) / (len(a) + len(b)) < floor:
+        return 0.0
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    if matcher.real_quick_ratio() < floor or matcher.quick_ratio() < floor:
+        return 0.0
+    return matcher.ratio()
+
+
+def _singer_similarity(a, b):
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    overlap = len(a & b) / len(a | b)
+    if overlap:
+        return overlap
+    # 没有完全相同的名字时，比较拼接后的字符串（处理译名、空格等细微差别）
+    return 0.8 * _similarity(''.join(sorted(a)), ''.join(sorted(b)), floor=0.5)
+
+
+class SongMatcher:
+    """对候选歌曲打分，找出与目标最接近的一首
+
+    用法:
+        matcher = SongMatcher({'title': ..., 'singer': ..., 'album': ...})
+        best, confidence = matcher.best_match(candidates)
+    """
+
+    def __init__(self, target):
+        self.target = _match_key_of(target)
+        self.target_id = target.get('id')
+
+    def score(self, candidate, floor=0.0):
+        """返回候选与目标的置信度（0~1）
+
+        Args:
+            candidate: 候选歌曲字典（title、singer，可选 album、duration）
+            floor: 歌名相似度低于此值时不再精确计算，用于快速淘汰明显不符的候选
+        """
+        key = _match_key_of(candidate)
+        target = self.target
+
+        title_score = _similarity(target.title, key.title, floor=floor)
+        if title_score == 0.0:
+            return 0.0
+        total = TITLE_WEIGHT * title_score + SINGER_WEIGHT * _singer_similarity(target.singers, key.singers)
+        weight = TITLE_WEIGHT + SINGER_WEIGHT
+
+        if target.album and key.album:
+            total += ALBUM_WEIGHT * _similarity(target.album, key.album)
+            weight += ALBUM_WEIGHT
+        if target.duration is not None and key.duration is not None:
+            difference = abs(target.duration - key.duration)
+            total += DURATION_WEIGHT * max(0.0, 1 - difference / DURATION_TOLERANCE)
+            weight += DURATION_WEIGHT
+
+        score = total / weight - VERSION_PENALTY * len(target.tags ^ key.tags)
+        return max(0.0, min(1.0, score))
+
+    def best_match(self, candidates, min_confidence=0.0):
+        """在候选中找出得分最高的一首
+
+        得分相同时，优先选择与目标ID相同的候选，其次是排在前面的候选（搜索结果的相关度顺序）。
+
+        Returns:
+            tuple: (最佳候选, 置信度)，没有候选达到 min_confidence 时返回 (None, 0.0)
+        """
+        best, best_score = None, 0.0
+        for candidate in candidates:
+            # 其余各项都满分也无法胜出的候选，歌名相似度只需粗略估算
+            floor = max(0.0, best_score - (1 - TITLE_WEIGHT)) / TITLE_WEIGHT
+            score = self.score(candidate, floor=floor)
+            if score > best_score or (score == best_score and score > 0 and best is not None
+                                      and candidate.get('id') == self.target_id
+                                      and best.get('id') != self.target_id):
+                best, best_score = candidate, score
+        if best is None or best_score < min_confidence:
+            return None, 0.0
+        return best, best_score
+
+
+def best_match(target, candidates, min_confidence=0.0):
+    """SongMatcher(target).best_match(candidates) 的简写"""
+    return SongMatcher(target).best_match(candidates, min_confidence)
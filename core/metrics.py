@@ -0,0 +1,356 @@
+"""
+Prometheus 文本格式的运行指标（可选）。
+
+默认不启用：未调用 enable() 时，inc()/observe()/set_gauge()/cache_access() 等函数只检查一次
+全局变量就返回，热路径上的开销可以忽略。启用后收集:
+
+- stage_duration_seconds / stage_total / stage_bytes_total: 由 core.timing 的阶段记录驱动，
+  包括各接口（search、details、lyric……）的延迟直方图、结果和传输的数据量
+- http_retries_total: requests Session 的重试次数（按原因）
+- cache_requests_total: 搜索缓存、封面缓存、音质协商缓存、已下载歌曲索引的命中/未命中
+- active_workers: 正在下载 / 嵌入元数据的线程数
+- songs_total: 下载完成、已存在、失败和取消的歌曲数
+- jobs: 守护进程任务队列中各状态的任务数（仅守护进程）
+- ui_event_loop_lag_seconds: 界面事件循环延迟（仅图形界面，参见 core.profiling）
+
+每分钟歌曲数、字节/秒等吞吐由 Prometheus 对计数器求 rate() 得到，例如
+rate(musicdl_songs_total{result="downloaded"}[5m]) * 60。
+可以通过本机 HTTP 接口（start_http_server，守护进程的控制接口也提供 /metrics）抓取，
+或用 TextfileExporter 定期写入文件（node_exporter 的 textfile collector）。本模块不依赖Qt。
+"""
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from core import timing
+from core.persistence import write_text_atomic
+
+PREFIX = 'musicdl_'
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_EXPORT_INTERVAL = 15
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# 延迟直方图的桶（秒），覆盖从本地缓存到大文件传输的范围
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# 界面事件循环延迟的桶（秒）
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def _format_value(value):
+    value = float(value)
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class _Metric:
+    type_name = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"指标 {self.name} 需要标签 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        """返回 [(后缀, [(标签名, 标签值)...], 值)]"""
+        with self._lock:
+            items = sorted(self._values.items())
+        return [('', list(zip(self.labelnames, key)), value) for key, value in items]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for suffix, pairs, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(pairs)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """可增可减的当前值"""
+    type_name = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """按桶统计的分布（输出累计的 _bucket、_sum 和 _count）"""
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # [各桶（不累计，最后一个为 +Inf）的计数, 总和]
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        result = []
+        for key, (counts, total) in items:
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _format_value(bound)
+                result.append(('_bucket', pairs + [('le', le)], cumulative))
+            result.append(('_sum', pairs, total))
+            result.append(('_count', pairs, cumulative))
+        return result
+
+
+class MetricsRegistry:
+    """按名称管理指标并输出 Prometheus 文本格式（线程安全）"""
+
+    def __init__(self, prefix=PREFIX):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._collectors = []
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self.prefix + name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"指标 {name} 已注册为 {metric.type_name}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name):
+        """按名称（不含前缀）获取已注册的指标，没有则返回None"""
+        return self._metrics.get(name)
+
+    def add_collector(self, collector):
+        """注册在每次输出前调用的函数 collector(registry)，用于更新只在抓取时才需要计算的指标"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def remove_collector(self, collector):
+        with self._lock:
+            if collector in self._collectors:
+                self._collectors.remove(collector)
+
+    def render(self):
+        """以 Prometheus 文本格式输出所有指标"""
+        with self._lock:
+            collectors = list(self._collectors)
+        for collector in collectors:
+            try:
+                collector(self)
+            except Exception as e:
+                print(f"更新指标失败: {e}")
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def _define_standard_metrics(registry):
+    registry.histogram('stage_duration_seconds', "各阶段（接口请求、传输、嵌入等）的耗时", ('stage',))
+    registry.counter('stage_total', "各阶段的次数（按结果）", ('stage', 'outcome'))
+    registry.counter('stage_bytes_total', "各阶段传输的字节数", ('stage',))
+    registry.counter('http_retries_total', "HTTP请求的重试次数（按原因）", ('reason',))
+    registry.counter('cache_requests_total', "缓存查询次数（按缓存和命中结果）", ('cache', 'result'))
+    registry.gauge('active_workers', "正在工作的线程数", ('pool',))
+    registry.counter('songs_total', "处理的歌曲数（downloaded/existing/failed/cancelled）", ('result',))
+    registry.histogram('ui_event_loop_lag_seconds', "界面心跳相对计划时间的延迟", buckets=LAG_BUCKETS)
+
+
+def _record_stage(stage, seconds, nbytes, outcome):
+    registry = _registry
+    if registry is None:
+        return
+    registry.get('stage_duration_seconds').observe(seconds, stage=stage)
+    registry.get('stage_total').inc(stage=stage, outcome=outcome)
+    if nbytes:
+        registry.get('stage_bytes_total').inc(nbytes, stage=stage)
+
+
+def enable():
+    """启用指标收集并返回全局注册表（重复调用返回同一个注册表）"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            registry = MetricsRegistry()
+            _define_standard_metrics(registry)
+            _registry = registry
+            timing.get_recorder().add_listener(_record_stage)
+        return _registry
+
+
+def is_enabled():
+    return _registry is not None
+
+
+def get_registry():
+    """全局注册表，未启用时返回None"""
+    return _registry
+
+
+def inc(name, amount=1, **labels):
+    """计数器加 amount（未启用时什么也不做）"""
+    registry = _registry
+    if registry is None:
+        return
+    registry.get(name).inc(amount, **labels)
+
+
+def set_gauge(name, value, **labels):
+    registry = _registry
+    if registry is None:
+        return
+    registry.get(name).set(value, **labels)
+
+
+def observe(name, value, **labels):
+    registry = _registry
+    if registry is None:
+        return
+    registry.get(name).observe(value, **labels)
+
+
+def cache_access(cache, hit):
+    """记录一次缓存查询的命中/未命中"""
+    registry = _registry
+    if registry is None:
+        return
+    registry.get('cache_requests_total').inc(cache=cache, result='hit' if hit else 'miss')
+
+
+@contextmanager
+def active(pool):
+    """在 with 块期间把 pool 的工作线程数加一"""
+    gauge = _registry.get('active_workers') if _registry is not None else None
+    if gauge is None:
+        yield
+        return
+    gauge.inc(pool=pool)
+    try:
+        yield
+    finally:
+        gauge.dec(pool=pool)
+
+
+def send_metrics(handler, registry):
+    """在 BaseHTTPRequestHandler 中以 Prometheus 文本格式响应"""
+    body = registry.render().encode('utf-8')
+    handler.send_response(200)
+    handler.send_header('Content-Type', CONTENT_TYPE)
+    handler.send_header('Content-Length', str(len(body)))
+    handler.end_headers()
+    handler.wfile.write(body)
+
+
+def start_http_server(port, host=DEFAULT_HOST):
+    """启用指标收集，并在后台线程中提供 http://host:port/metrics
+
+    Returns:
+        core.metrics_server.MetricsServer: 调用其 stop() 停止服务
+    """
+    # http.server 导入较慢，只在需要提供HTTP接口时才导入
+    from core.metrics_server import MetricsServer
+    server = MetricsServer(enable(), host, port)
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
+
+
+class TextfileExporter:
+    """定期把指标原子地写入文件（供 node_exporter 的 textfile collector 读取）
+
+    用法:
+        exporter = TextfileExporter('/var/lib/node_exporter/musicdl.prom').start()
+        ...
+        exporter.stop()         # 停止前再写入一次最终结果
+    """
+
+    def __init__(self, path, interval=DEFAULT_EXPORT_INTERVAL, registry=None):
+        self.path = path
+        self.interval = interval
+        self.registry = registry or enable()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def write(self):
+        try:
+            write_text_atomic(self.path, self.registry.render())
+        except OSError as e:
+            print(f"写入指标文件失败: {e}")
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.write()
+
+    def start(self):
+        self.write()
+        self._thread = threading.Thread(target=self._run, name='metrics-textfile', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.write()
@@ -0,0 +1,35 @@
+"""
+只监听本机地址、提供 GET /metrics 的HTTP服务器（由 core.metrics.start_http_server 按需导入）。
+"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from core.metrics import DEFAULT_HOST, send_metrics
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass  # 不输出访问日志
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        send_metrics(self, self.server.registry)
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """只监听本机地址、提供 GET /metrics 的HTTP服务器"""
+    daemon_threads = True
+
+    def __init__(self, registry, host=DEFAULT_HOST, port=0):
+        super().__init__((host, port), _MetricsHandler)
+        self.registry = registry
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
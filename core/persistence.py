@@ -0,0 +1,131 @@
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+import weakref
+from pathlib import Path
+
+
+def write_text_atomic(path, text, encoding='utf-8'):
+    """原子地写入文本文件
+
+    先写入同目录下的临时文件并 fsync，再用 os.replace 覆盖目标文件。
+    进程在写入过程中退出时，目标文件要么是旧内容，要么是完整的新内容。
+    """
+    path = Path(path)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, 'w', encoding=encoding) as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+    # 同步目录项，确保rename本身落盘（Windows不支持打开目录，忽略即可）
+    if hasattr(os, 'O_DIRECTORY'):
+        try:
+            dir_fd = os.open(path.parent, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        except OSError:
+            pass
+
+
+def write_json_atomic(path, data):
+    """原子地写入JSON文件（格式与原先的 json.dump(indent=4) 保持一致）"""
+    write_text_atomic(path, json.dumps(data, indent=4, ensure_ascii=False))
+
+
+def quarantine_corrupted_file(path):
+    """将无法解析的文件改名保留，避免随后的保存把它静默覆盖
+
+    Returns:
+        Path: 改名后的路径，失败时返回None
+    """
+    path = Path(path)
+    corrupted_path = path.with_name(f"{path.name}.corrupt-{time.strftime('%Y%m%d-%H%M%S')}")
+    try:
+        path.replace(corrupted_path)
+        return corrupted_path
+    except OSError:
+        return None
+
+
+def _flush_at_exit(writer_ref):
+    writer = writer_ref()
+    if writer is not None:
+        writer.flush()
+
+
+class DebouncedJsonWriter:
+    """合并短时间内的多次保存请求，只执行一次原子写入
+
+    schedule() 只标记数据已变更并启动一个延迟定时器（已有定时器时不重新计时，
+    因此持续的修改最多延迟 delay 秒落盘）；flush() 立即写入。
+    snapshot 在 lock 保护下调用，数据的修改方也应持有同一把锁，
+    这样后台定时器线程序列化时数据不会被并发修改。
+    """
+
+    def __init__(self, path, snapshot, delay=0.5, lock=None):
+        """
+        Args:
+            path: 目标文件路径
+            snapshot: 无参函数，返回需要写入的数据
+            delay: 合并写入的延迟（秒）
+            lock: 与数据修改方共享的锁，默认新建一把RLock
+        """
+        self.path = Path(path)
+        self.delay = delay
+        self.lock = lock or threading.RLock()
+        self._snapshot = snapshot
+        self._state_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._timer = None
+        self._dirty = False
+        # 退出前写入尚未落盘的变更；弱引用避免写入器因注册而无法释放
+        atexit.register(_flush_at_exit, weakref.ref(self))
+
+    def schedule(self):
+        """标记数据已变更，在 delay 秒后写入"""
+        with self._state_lock:
+            self._dirty = True
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """立即写入尚未落盘的变更
+
+        Returns:
+            bool: 写入是否成功（没有待写入的变更时返回True）
+        """
+        with self._write_lock:
+            with self._state_lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return True
+                self._dirty = False
+
+            try:
+                with self.lock:
+                    text = json.dumps(self._snapshot(), indent=4, ensure_ascii=False)
+                write_text_atomic(self.path, text)
+                return True
+            except (OSError, TypeError, ValueError) as e:
+                print(f"保存文件失败 {self.path}: {e}")
+                with self._state_lock:
+                    self._dirty = True  # 保留变更，等待下一次保存
+                return False
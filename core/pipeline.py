@@ -0,0 +1,78 @@
+"""
+批量下载的分阶段流水线。
+
+嵌入元数据（mutagen 解析并改写文件，标签区空间不足时会重写整个文件）是本地CPU和磁盘工作，
+放在下载线程中执行会让网络传输停下来等待。EmbedStage 把已下载完成的临时文件交给独立的线程池处理，
+下载线程立即开始下一首；队列有上限，嵌入跟不上时下载线程会等待，临时文件不会无限堆积。
+各阶段的耗时和吞吐由 core.timing 记录（引擎的 recorder）。
+本模块不依赖Qt。
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from core.engine import PendingSong
+
+# 默认的嵌入线程数和等待嵌入的歌曲数上限
+DEFAULT_EMBED_WORKERS = 2
+DEFAULT_MAX_PENDING = 4
+
+
+class EmbedStage:
+    """在独立线程池中完成嵌入元数据和重命名（DownloadEngine.finalize_song）
+
+    用法:
+        stage = EmbedStage()
+        finish_song(engine, engine.fetch_song(details, download_dir), stage, callback)
+        ...                     # 提交后立即返回（队列已满时等待），下载线程继续下一首
+        stage.close()           # 等待所有嵌入完成
+    """
+
+    def __init__(self, workers=DEFAULT_EMBED_WORKERS, max_pending=DEFAULT_MAX_PENDING):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='embed')
+        # 已提交但尚未完成的歌曲数上限（包括正在嵌入的）
+        self._slots = threading.BoundedSemaphore(max(max_pending, workers))
+
+    def submit(self, engine, pending, callback=None):
+        """提交一首已下载的歌曲
+
+        Args:
+            engine: 下载该歌曲的 DownloadEngine（使用其状态回调、取消事件和索引）
+            pending: engine.fetch_song 返回的 PendingSong
+            callback: 在嵌入线程中以最终路径（失败为None）调用的函数，其返回值作为 Future 的结果
+
+        Returns:
+            concurrent.futures.Future
+        """
+        self._slots.acquire()
+        try:
+            return self._executor.submit(self._finalize, engine, pending, callback)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _finalize(self, engine, pending, callback):
+        try:
+            if engine.is_cancelled():
+                engine.discard(pending)
+                path = None
+            else:
+                path = engine.finalize_song(pending)
+        finally:
+            self._slots.release()
+        return callback(path) if callback else path
+
+    def close(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+def finish_song(engine, result, embed_stage=None, callback=None):
+    """处理 fetch_song 的结果：待嵌入的歌曲交给 embed_stage（没有时在当前线程完成）
+
+    Returns:
+        Future: 已交给 embed_stage 时返回；否则返回 callback(最终路径) 的结果
+    """
+    if isinstance(result, PendingSong):
+        if embed_stage is not None:
+            return embed_stage.submit(engine, result, callback)
+        result = engine.finalize_song(result)
+    return callback(result) if callback else result
@@ -0,0 +1,196 @@
+import unicodedata
+
+# pypinyin 为可选依赖：安装后可以用全拼或首字母搜索中文歌名/歌手
+try:
+    from pypinyin import lazy_pinyin, Style
+except ImportError:
+    lazy_pinyin = None
+
+
+def normalize_text(text):
+    """全角转半角、统一小写并去除所有空白"""
+    text = unicodedata.normalize('NFKC', str(text or ''))
+    return ''.join(text.split()).lower()
+
+
+def _bigrams(text):
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def _text_variants(song):
+    """返回一首歌参与检索的所有文本形式（原文，以及可用时的全拼和拼音首字母）"""
+    raw = f"{song.get('title', '')}{song.get('singer', '')}"
+    variants = [normalize_text(raw)]
+    if lazy_pinyin is not None:
+        compact = ''.join(str(raw).split())
+        variants.append(''.join(lazy_pinyin(compact)).lower())
+        variants.append(''.join(lazy_pinyin(compact, style=Style.FIRST_LETTER)).lower())
+    return tuple(v for v in variants if v)
+
+
+class PlaylistIndex:
+    """所有播放列表歌曲的进程内倒排索引
+
+    以歌名+歌手规范化文本的二元组（bigram）为词项，查询时对各词项的倒排表求交集，
+    再用子串匹配校验，中英文均适用。单字查询使用单独的单字索引。
+    索引随歌曲增删增量更新；命中歌曲在列表中的位置按需计算并缓存，
+    列表变化后才失效，因此十万级歌曲的查询也只需几毫秒。
+    """
+
+    def __init__(self, playlists):
+        """
+        Args:
+            playlists: PlaylistManager.playlists（歌单名 -> 歌曲列表），索引直接引用该字典
+        """
+        self._playlists = playlists
+        self._built = False
+        self._reset()
+
+    def _reset(self):
+        self._next_doc_id = 0
+        self._docs = {}            # doc_id -> (playlist_name, song, text_variants)
+        self._doc_ids = {}         # playlist_name -> {id(song): doc_id}
+        self._postings = {}        # bigram -> set(doc_id)
+        self._unigrams = {}        # char -> set(doc_id)
+        self._positions = {}       # playlist_name -> {id(song): index}，按需构建
+
+    def rebuild(self):
+        """根据当前播放列表重建整个索引"""
+        self._reset()
+        for name, songs in self._playlists.items():
+            for song in songs:
+                self._index_song(name, song)
+        self._built = True
+
+    def _ensure_built(self):
+        # 首次查询时才构建，避免拖慢启动
+        if not self._built:
+            self.rebuild()
+
+    def _index_song(self, playlist_name, song):
+        doc_id = self._next_doc_id
+        self._next_doc_id += 1
+        variants = _text_variants(song)
+        self._docs[doc_id] = (playlist_name, song, variants)
+        self._doc_ids.setdefault(playlist_name, {})[id(song)] = doc_id
+        for variant in variants:
+            for gram in _bigrams(variant):
+                self._postings.setdefault(gram, set()).add(doc_id)
+            for char in set(variant):
+                self._unigrams.setdefault(char, set()).add(doc_id)
+
+    def _unindex_doc(self, doc_id):
+        _, _, variants = self._docs.pop(doc_id)
+        for variant in variants:
+            for gram in _bigrams(variant):
+                postings = self._postings.get(gram)
+                if postings is not None:
+                    postings.discard(doc_id)
+                    if not postings:
+                        del self._postings[gram]
+            for char in set(variant):
+                postings = self._unigrams.get(char)
+                if postings is not None:
+                    postings.discard(doc_id)
+                    if not postings:
+                        del self._unigrams[char]
+
+    def add_song(self, playlist_name, song):
+        """歌曲已加入播放列表后调用"""
+        self._positions.pop(playlist_name, None)
+        if self._built:
+            self._index_song(playlist_name, song)
+
+    def remove_song(self, playlist_name, song):
+        """歌曲已从播放列表移除后调用"""
+        self._positions.pop(playlist_name, None)
+        if not self._built:
+            return
+        doc_id = self._doc_ids.get(playlist_name, {}).pop(id(song), None)
+        if doc_id is not None:
+            self._unindex_doc(doc_id)
+
+    def remove_playlist(self, playlist_name):
+        self._positions.pop(playlist_name, None)
+        for doc_id in self._doc_ids.pop(playlist_name, {}).values():
+            self._unindex_doc(doc_id)
+
+    def rename_playlist(self, old_name, new_name):
+        self._positions.pop(old_name, None)
+        doc_ids = self._doc_ids.pop(old_name, {})
+        for doc_id in doc_ids.values():
+            _, song, variants = self._docs[doc_id]
+            self._docs[doc_id] = (new_name, song, variants)
+        if doc_ids:
+            self._doc_ids[new_name] = doc_ids
+
+    def invalidate_positions(self, playlist_name=None):
+        """歌曲顺序在索引之外被修改后调用"""
+        if playlist_name is None:
+            self._positions.clear()
+        else:
+            self._positions.pop(playlist_name, None)
+
+    def _position_of(self, playlist_name, song):
+        positions = self._positions.get(playlist_name)
+        if positions is None:
+            songs = self._playlists.get(playlist_name, [])
+            positions = {id(s): i for i, s in enumerate(songs)}
+            self._positions[playlist_name] = positions
+        return positions.get(id(song))
+
+    def search(self, query, limit=100):
+        """在所有播放列表中查找歌名/歌手包含查询内容的歌曲
+
+        Args:
+            query: 查询文本（多个关键词用空格分隔，需全部命中）
+            limit: 最多返回的结果数量
+
+        Returns:
+            list: [(playlist_name, index), ...]，按歌单顺序、再按歌曲位置排序
+        """
+        terms = [normalize_text(term) for term in str(query).split()]
+        terms = [term for term in terms if term]
+        if not terms:
+            return []
+        self._ensure_built()
+
+        candidates = None
+        for term in terms:
+            if len(term) == 1:
+                term_sets = [self._unigrams.get(term, set())]
+            else:
+                term_sets = [self._postings.get(gram, set()) for gram in _bigrams(term)]
+            # 从最小的倒排表开始求交集
+            for postings in sorted(term_sets, key=len):
+                candidates = set(postings) if candidates is None else candidates & postings
+                if not candidates:
+                    return []
+
+        by_playlist = {}
+        for doc_id in candidates:
+            by_playlist.setdefault(self._docs[doc_id][0], []).append(doc_id)
+
+        hits = []
+        for playlist_name, songs in self._playlists.items():
+            doc_ids = by_playlist.get(playlist_name)
+            if not doc_ids:
+                continue
+            if len(doc_ids) * 8 < len(songs):
+                # 命中较少：只对候选歌曲排序
+                positioned = ((self._position_of(playlist_name, self._docs[doc_id][1]), doc_id)
+                              for doc_id in doc_ids)
+                ordered = sorted(item for item in positioned if item[0] is not None)
+            else:
+                # 命中较多：按列表顺序扫描，凑够数量即可提前结束
+                id_map = self._doc_ids.get(playlist_name, {})
+                ordered = ((position, id_map.get(id(song))) for position, song in enumerate(songs)
+                           if id_map.get(id(song)) in candidates)
+            for position, doc_id in ordered:
+                variants = self._docs[doc_id][2]
+                # 倒排表只能保证二元组都出现，仍需校验每个关键词确实是某个文本形式的子串
+                if all(any(term in variant for variant in variants) for term in terms):
+                    hits.append((playlist_name, position))
+                    if len(hits) >= limit:
+                        return hits
+        return hits
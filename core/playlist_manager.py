@@ -1,6 +1,10 @@
 import json
 from pathlib import Path
 
+from core.persistence import DebouncedJsonWriter, write_json_atomic, quarantine_corrupted_file
+from core.playlist_index import PlaylistIndex
+from core.song import SongRecord, key_of
+
 class PlaylistManager:
     def __init__(self, playlist_file=None):
         if playlist_file is None:
@@ -14,6 +18,11 @@ class PlaylistManager:
         else:
             self.playlist_file = Path(playlist_file)
         self.playlists = self.load()
+        # 全文索引在首次查询时才构建
+        self.index = PlaylistIndex(self.playlists)
+        # 修改播放列表时需持有 self._lock，后台写入线程会在同一把锁下序列化数据
+        self._writer = DebouncedJsonWriter(self.playlist_file, self._snapshot)
+        self._lock = self._writer.lock
 
     def _migrate_old_data(self):
         """迁移旧位置的playlist.json到新的AppData目录"""
@@ -36,8 +45,7 @@ class PlaylistManager:
                         old_data = json.load(f)
 
                     # 写入新位置
-                    with self.playlist_file.open('w', encoding='utf-8') as f:
-                        json.dump(old_data, f, indent=4, ensure_ascii=False)
+                    write_json_atomic(self.playlist_file, old_data)
 
                     # 迁移成功后，可选择删除旧文件（为安全起见，这里不删除）
                     print(f"[OK] 歌单数据已从 {old_path} 迁移到 {self.playlist_file}")
@@ -65,8 +73,7 @@ class PlaylistManager:
             # 备份旧数据
             backup_path = self.playlist_file.parent / "playlists_backup_v1.json"
             try:
-                with backup_path.open('w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=4, ensure_ascii=False)
+                write_json_atomic(backup_path, data)
                 print(f"[OK] 检测到旧版本数据格式，已备份到: {backup_path}")
             except IOError as e:
                 print(f"[WARNING] 备份旧数据失败: {e}")
@@ -86,20 +93,29 @@ class PlaylistManager:
 
                 # 检测并处理旧格式数据（含有 'n' 字段）
                 self._check_and_migrate_old_format(data)
-                return data
-            except (json.JSONDecodeError, IOError):
-                # If file is corrupted or unreadable, start with an empty structure
+                return {name: [SongRecord.from_dict(song) for song in songs] for name, songs in data.items()}
+            except json.JSONDecodeError as e:
+                # Keep the corrupted file aside so the next save does not silently overwrite it
+                corrupted_path = quarantine_corrupted_file(self.playlist_file)
+                print(f"[WARNING] 歌单文件损坏 ({e})，已保留为: {corrupted_path}")
+                return {"默认列表": []}
+            except IOError:
+                # If file is unreadable, start with an empty structure
                 return {"默认列表": []}
         return {"默认列表": []}
 
+    def _snapshot(self):
+        """Returns the playlists as plain dicts for JSON serialisation."""
+        return {name: [song.to_dict() for song in songs] for name, songs in self.playlists.items()}
+
     def save(self):
-        """Saves the current playlists to the JSON file."""
-        try:
-            with self.playlist_file.open('w', encoding='utf-8') as f:
-                json.dump(self.playlists, f, indent=4, ensure_ascii=False)
-            return True
-        except IOError:
-            return False
+        """Schedules a debounced, atomic write of the playlists to the JSON file."""
+        self._writer.schedule()
+        return True
+
+    def flush(self):
+        """Writes pending changes immediately. Returns False if the write failed."""
+        return self._writer.flush()
 
     def get_playlist_names(self):
         """Returns a list of all playlist names."""
@@ -113,7 +129,8 @@ class PlaylistManager:
         """Creates a new, empty playlist. Returns False if it already exists."""
         if name in self.playlists:
             return False
-        self.playlists[name] = []
+        with self._lock:
+            self.playlists[name] = []
         self.save()
         return True
 
@@ -123,7 +140,9 @@ class PlaylistManager:
             # Prevent deletion of the last playlist
             if len(self.playlists) == 1:
                 return False
-            del self.playlists[name]
+            with self._lock:
+                del self.playlists[name]
+            self.index.remove_playlist(name)
             self.save()
             return True
         return False
@@ -132,7 +151,9 @@ class PlaylistManager:
         """Renames a playlist. Returns False if new name exists or old name doesn't."""
         if old_name not in self.playlists or new_name in self.playlists:
             return False
-        self.playlists[new_name] = self.playlists.pop(old_name)
+        with self._lock:
+            self.playlists[new_name] = self.playlists.pop(old_name)
+        self.index.rename_playlist(old_name, new_name)
         self.save()
         return True
 
@@ -142,19 +163,80 @@ class PlaylistManager:
             return False
 
         playlist = self.playlists[playlist_name]
-        # Prevent duplicates based on title and singer
-        for song in playlist:
-            if song.get('title') == song_info.get('title') and song.get('singer') == song_info.get('singer'):
-                return False
+        # Prevent duplicates based on the normalized title and singer (keys are cached on the records)
+        key = key_of(song_info)
+        if any(song.key == key for song in playlist):
+            return False
 
         # Store song info with new API format
-        info_to_store = {
-            'id': song_info.get('id'),
-            'title': song_info.get('title'),
-            'singer': song_info.get('singer'),
-            'album': song_info.get('album', '')
-        }
-        playlist.insert(0, info_to_store)
+        info_to_store = SongRecord(song_info.get('id'), song_info.get('title'), song_info.get('singer'),
+                                   song_info.get('album', ''))
+        with self._lock:
+            playlist.insert(0, info_to_store)
+        self.index.add_song(playlist_name, info_to_store)
+        self.save()
+        return True
+
+    def add_songs(self, playlist_name, songs):
+        """Appends songs to the end of a playlist in order, skipping duplicates. Returns the number added."""
+        if playlist_name not in self.playlists or not songs:
+            return 0
+
+        playlist = self.playlists[playlist_name]
+        existing = {song.key for song in playlist}
+        added = []
+        for song_info in songs:
+            key = key_of(song_info)
+            if key in existing:
+                continue
+            existing.add(key)
+            added.append(SongRecord(song_info.get('id'), song_info.get('title'), song_info.get('singer'),
+                                    song_info.get('album', '')))
+        if not added:
+            return 0
+        with self._lock:
+            playlist.extend(added)
+        for song in added:
+            self.index.add_song(playlist_name, song)
+        self.save()
+        return len(added)
+
+    def remove_songs_by_id(self, playlist_name, song_ids):
+        """Removes every song whose id is in song_ids. Returns the number removed."""
+        if playlist_name not in self.playlists or not song_ids:
+            return 0
+
+        playlist = self.playlists[playlist_name]
+        removed = [song for song in playlist if song.get('id') in song_ids]
+        if not removed:
+            return 0
+        with self._lock:
+            playlist[:] = [song for song in playlist if song.get('id') not in song_ids]
+        for song in removed:
+            self.index.remove_song(playlist_name, song)
+        self.save()
+        return len(removed)
+
+    def reorder_songs(self, playlist_name, ordered_ids):
+        """Rearranges the songs listed in ordered_ids into that order.
+
+        Only the slots those songs already occupy are reused, so other songs keep their positions.
+        Returns True if the order changed.
+        """
+        if playlist_name not in self.playlists:
+            return False
+
+        playlist = self.playlists[playlist_name]
+        rank = {song_id: i for i, song_id in enumerate(ordered_ids)}
+        slots = [i for i, song in enumerate(playlist) if song.get('id') in rank]
+        current = [playlist[i] for i in slots]
+        desired = sorted(current, key=lambda song: rank[song.get('id')])
+        if all(a is b for a, b in zip(current, desired)):
+            return False
+        with self._lock:
+            for slot, song in zip(slots, desired):
+                playlist[slot] = song
+        self.index.invalidate_positions(playlist_name)
         self.save()
         return True
 
@@ -165,7 +247,13 @@ class PlaylistManager:
         
         playlist = self.playlists[playlist_name]
         if 0 <= song_index < len(playlist):
-            playlist.pop(song_index)
+            with self._lock:
+                song = playlist.pop(song_index)
+            self.index.remove_song(playlist_name, song)
             self.save()
             return True
-        return False 
\ No newline at end of file
+        return False
+
+    def search(self, query, limit=100):
+        """Searches all playlists by title/singer. Returns a list of (playlist_name, index)."""
+        return self.index.search(query, limit) 
\ No newline at end of file
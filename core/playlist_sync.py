@@ -0,0 +1,219 @@
+"""
+QQ 歌单增量同步。
+
+为每个本地播放列表记录来源歌单ID、上次获取到的歌曲 mid 顺序以及 mid 到本地歌曲ID的匹配结果。
+再次同步时只需获取一次歌单，与上次的记录对比得出新增、移除和顺序变化，
+只有新增且本地不存在的歌曲才需要调用搜索接口匹配。
+用户从本地列表中删除的已同步歌曲仍保留在匹配记录中，之后的同步不会把它重新加入。
+"""
+import json
+import time
+from pathlib import Path
+
+from core.song import key_of
+from core.persistence import write_json_atomic, quarantine_corrupted_file
+
+
+def source_song_id(raw_song):
+    """来源歌曲的稳定标识：优先使用 songmid，缺失时退回到歌名+歌手"""
+    if raw_song.get('mid'):
+        return raw_song['mid']
+    title, tags, singers = key_of(raw_song)
+    return '\x00'.join([title, ','.join(sorted(tags)), ','.join(sorted(singers))])
+
+
+class SyncStateStore:
+    """播放列表同步状态，保存在应用数据目录的 playlist_sync.json 中"""
+
+    def __init__(self, state_file=None):
+        if state_file is None:
+            app_data_dir = Path.home() / "AppData" / "Roaming" / "MusicDownloader"
+            app_data_dir.mkdir(parents=True, exist_ok=True)
+            state_file = app_data_dir / "playlist_sync.json"
+        self.state_file = Path(state_file)
+        self.states = self.load()
+
+    def load(self):
+        if not self.state_file.exists():
+            return {}
+        try:
+            with self.state_file.open('r', encoding='utf-8') as f:
+                return json.load(f)
+        except json.JSONDecodeError as e:
+            corrupted_path = quarantine_corrupted_file(self.state_file)
+            print(f"[WARNING] 同步状态文件损坏 ({e})，已保留为: {corrupted_path}")
+            return {}
+        except IOError:
+            return {}
+
+    def save(self):
+        try:
+            write_json_atomic(self.state_file, self.states)
+            return True
+        except OSError as e:
+            print(f"保存同步状态失败: {e}")
+            return False
+
+    def get(self, playlist_name):
+        """返回播放列表的同步状态，未同步过时返回None"""
+        return self.states.get(playlist_name)
+
+    def get_source_id(self, playlist_name):
+        state = self.states.get(playlist_name)
+        return state.get('source_id') if state else None
+
+    def remember_source(self, playlist_name, source_id):
+        """记录播放列表的来源歌单（来源变化时清空旧的同步记录）"""
+        state = self.states.get(playlist_name)
+        if state and state.get('source_id') == source_id:
+            return
+        self.states[playlist_name] = {'source_id': source_id, 'mids': [], 'matches': {}, 'preexisting': [],
+                                      'last_synced': None}
+        self.save()
+
+    def update(self, playlist_name, plan):
+        self.states[playlist_name] = {
+            'source_id': plan.source_id,
+            'mids': plan.mids,
+            'matches': plan.matches,
+            'preexisting': sorted(plan.preexisting),
+            'last_synced': time.time(),
+        }
+        self.save()
+
+    def rename(self, old_name, new_name):
+        if old_name in self.states:
+            self.states[new_name] = self.states.pop(old_name)
+            self.save()
+
+    def remove(self, playlist_name):
+        if self.states.pop(playlist_name, None) is not None:
+            self.save()
+
+
+class SyncPlan:
+    """一次同步的计算结果，由 plan_sync 生成，apply_sync 应用到播放列表"""
+
+    def __init__(self, source_id):
+        self.source_id = source_id
+        self.mids = []             # 本次获取到的来源歌曲标识（按歌单顺序）
+        self.matches = {}          # 来源歌曲标识 -> 本地歌曲ID（未匹配为None）
+        self.preexisting = set()   # 匹配到用户原有歌曲（而非由同步加入）的来源歌曲标识
+        self.added = []            # 需要加入本地列表的歌曲
+        self.removed_ids = set()   # 来源歌单中已删除、需要从本地列表移除的歌曲ID
+        self.unmatched = []        # 本次新增但未能匹配的来源歌曲
+        self.requests = 1          # 本次同步的网络请求数（获取歌单算一次）
+
+    @property
+    def ordered_ids(self):
+        """来源歌单顺序下的本地歌曲ID"""
+        seen = set()
+        ordered = []
+        for mid in self.mids:
+            song_id = self.matches.get(mid)
+            if song_id is not None and song_id not in seen:
+                seen.add(song_id)
+                ordered.append(song_id)
+        return ordered
+
+    def summary(self):
+        parts = [f"新增 {len(self.added)} 首", f"移除 {len(self.removed_ids)} 首"]
+        if self.unmatched:
+            parts.append(f"未匹配 {len(self.unmatched)} 首")
+        return "，".join(parts)
+
+
+def plan_sync(playlist_songs, state, source_id, raw_songs, match=None,
+              cancel_event=None, status_callback=None):
+    """对比来源歌单与上次同步记录，只为新增且本地不存在的歌曲调用 match
+
+    Args:
+        playlist_songs: 本地播放列表当前的歌曲
+        state: SyncStateStore.get() 的结果（可为None）
+        source_id: 来源歌单ID
+        raw_songs: fetch_qq_playlist 的结果
+        match: 匹配函数 (title, singer, album=..., cancel_event=...) -> song 或 None，默认为 core.api.match_song
+        cancel_event: threading.Event，置位后返回None
+        status_callback: 接收状态文本的函数
+
+    Returns:
+        SyncPlan: 同步计划，取消时返回None
+    """
+    if match is None:
+        # 图形界面启动时导入本模块，core.api（requests）在实际同步时才导入
+        from core.api import match_song as match
+    previous_matches = {}
+    previous_preexisting = set()
+    if state and state.get('source_id') == source_id:
+        previous_matches = state.get('matches', {})
+        previous_preexisting = set(state.get('preexisting', ()))
+
+    local_ids = {song.get('id') for song in playlist_songs}
+    local_by_key = {}
+    for song in playlist_songs:
+        local_by_key.setdefault(key_of(song), song.get('id'))
+
+    plan = SyncPlan(source_id)
+    to_match = []
+    for raw_song in raw_songs:
+        mid = source_song_id(raw_song)
+        if mid in plan.matches:
+            continue  # 来源歌单中的重复歌曲
+        plan.mids.append(mid)
+        if mid in previous_matches:
+            # 上次已处理过：包括未能匹配的歌曲（避免每次同步都重复搜索），
+            # 以及用户从本地列表中删除的歌曲（不再重新加入）
+            plan.matches[mid] = previous_matches[mid]
+            if mid in previous_preexisting:
+                plan.preexisting.add(mid)
+            continue
+        song_id = local_by_key.get(key_of(raw_song))
+        if song_id is not None:
+            # 用户列表中原有的歌曲，来源删除它时不从本地移除
+            plan.matches[mid] = song_id
+            plan.preexisting.add(mid)
+        else:
+            plan.matches[mid] = None
+            to_match.append((mid, raw_song))
+
+    total = len(to_match)
+    added_ids = set()
+    for i, (mid, raw_song) in enumerate(to_match, 1):
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        if status_callback:
+            status_callback(f"正在匹配新增歌曲: {raw_song.get('title', '')} ({i}/{total})")
+        plan.requests += 1
+        matched = match(raw_song.get('title', ''), raw_song.get('singer', ''),
+                        album=raw_song.get('album', ''), cancel_event=cancel_event)
+        if not matched:
+            plan.unmatched.append(raw_song)
+            continue
+        song_id = matched.get('id')
+        plan.matches[mid] = song_id
+        if song_id in local_ids:
+            plan.preexisting.add(mid)
+        elif song_id not in added_ids:
+            added_ids.add(song_id)
+            plan.added.append(matched)
+
+    # 只移除由同步带入、且已不再被来源歌单引用的歌曲（用户原有的歌曲始终保留）
+    current_ids = set(plan.matches.values())
+    kept_ids = {previous_matches[mid] for mid in previous_preexisting if mid in previous_matches}
+    for mid, song_id in previous_matches.items():
+        if mid not in plan.matches and song_id is not None and song_id not in current_ids \
+                and song_id not in kept_ids and song_id in local_ids:
+            plan.removed_ids.add(song_id)
+    return plan
+
+
+def apply_sync(manager, playlist_name, plan):
+    """将同步计划应用到播放列表：移除、追加，再按来源顺序重排同步过来的歌曲
+
+    Returns:
+        bool: 播放列表是否发生了变化
+    """
+    removed = manager.remove_songs_by_id(playlist_name, plan.removed_ids)
+    added = manager.add_songs(playlist_name, plan.added)
+    reordered = manager.reorder_songs(playlist_name, plan.ordered_ids)
+    return bool(removed or added or reordered)
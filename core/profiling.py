@@ -0,0 +1,222 @@
+"""
+界面线程卡顿检测与按需性能分析。
+
+StallWatchdog: 被监视的线程（界面线程）通过定时器周期性调用 beat()，后台线程检查心跳间隔，
+心跳超过阈值没有到来时抓取被监视线程当前的 Python 调用栈并输出（附带当前操作），
+恢复后把卡顿时长记录到 core.timing（阶段 'ui_stall'，调用栈写入耗时日志），
+心跳相对计划时间的延迟即事件循环延迟，启用 core.metrics 时记入直方图。
+
+ProfileSession: 在界面中手动开始/停止的性能分析会话，安装了 pyinstrument 时使用它（采样，开销小），
+否则使用标准库的 cProfile。本模块不依赖Qt。
+"""
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from pathlib import Path
+
+from core import metrics
+from core.timing import get_recorder
+
+# pyinstrument 为可选依赖：安装后性能分析使用采样分析器并输出HTML报告
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+except ImportError:
+    SamplingProfiler = None
+
+# 心跳间隔和判定为卡顿的阈值（秒）
+HEARTBEAT_INTERVAL = 0.1
+DEFAULT_STALL_THRESHOLD = 0.25
+# 调用栈最多保留的帧数（从最内层算起）
+STACK_LIMIT = 40
+# 性能分析文本摘要中列出的函数数
+SUMMARY_LINES = 30
+
+
+def default_profile_dir():
+    profile_dir = Path.home() / "AppData" / "Roaming" / "MusicDownloader" / "profiles"
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    return profile_dir
+
+
+def format_thread_stack(thread_id, limit=STACK_LIMIT):
+    """返回指定线程当前的调用栈文本，线程不存在时返回空字符串"""
+    frame = sys._current_frames().get(thread_id)
+    if frame is None:
+        return ''
+    return ''.join(traceback.format_stack(frame)[-limit:])
+
+
+class StallWatchdog:
+    """检测被监视线程的卡顿（线程安全）
+
+    用法（界面线程中）:
+        watchdog = StallWatchdog().start()
+        timer = QTimer(); timer.setInterval(int(HEARTBEAT_INTERVAL * 1000))
+        timer.timeout.connect(watchdog.beat); timer.start()
+        with watchdog.action("加载播放列表"):
+            ...                 # 卡顿报告中会附带当前操作
+    """
+
+    def __init__(self, threshold=DEFAULT_STALL_THRESHOLD, interval=HEARTBEAT_INTERVAL, thread_id=None,
+                 log=print, recorder=None):
+        """
+        Args:
+            threshold: 心跳超过多少秒没有到来判定为卡顿
+            interval: beat() 的调用间隔（秒），用于计算事件循环延迟
+            thread_id: 被监视线程的 ident，默认为创建本对象的线程
+            log: 输出卡顿报告的函数
+            recorder: 记录卡顿时长的 TimingRecorder，默认使用全局记录器
+        """
+        self.threshold = threshold
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.log = log
+        self.recorder = recorder or get_recorder()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._actions = []
+        self._last_beat = time.monotonic()
+        self._stall = None  # 进行中的卡顿: {'action', 'stack'}
+        self.stalls = 0
+        self.max_stall = 0.0
+        self.max_lag = 0.0
+
+    @property
+    def current_action(self):
+        actions = self._actions
+        return actions[-1] if actions else None
+
+    @contextmanager
+    def action(self, name):
+        """在 with 块期间把 name 作为当前操作（在被监视线程中调用）"""
+        self._actions.append(name)
+        try:
+            yield
+        finally:
+            self._actions.pop()
+
+    def beat(self):
+        """心跳（在被监视线程中按 interval 周期调用）"""
+        now = time.monotonic()
+        with self._lock:
+            elapsed = now - self._last_beat
+            self._last_beat = now
+            stall, self._stall = self._stall, None
+            lag = max(0.0, elapsed - self.interval)
+            self.max_lag = max(self.max_lag, lag)
+            if stall is not None:
+                self.stalls += 1
+                self.max_stall = max(self.max_stall, elapsed)
+        metrics.observe('ui_event_loop_lag_seconds', lag)
+        if stall is not None:
+            self.log(f"[卡顿] 界面线程恢复响应，共阻塞 {elapsed * 1000:.0f}ms")
+            fields = {'stack': stall['stack']}
+            if stall['action']:
+                fields['action'] = stall['action']
+            self.recorder.record('ui_stall', elapsed, **fields)
+
+    def _check(self):
+        with self._lock:
+            blocked = time.monotonic() - self._last_beat
+            if self._stall is not None or blocked < self.threshold:
+                return
+            action = self.current_action
+            stack = format_thread_stack(self.thread_id)
+            self._stall = {'action': action, 'stack': stack}
+        context = f"（当前操作: {action}）" if action else ""
+        self.log(f"[卡顿] 界面线程已阻塞 {blocked * 1000:.0f}ms{context}，调用栈:\n{stack}")
+
+    def _run(self):
+        # 检查间隔取阈值的一半，报告的阻塞时长与阈值的偏差不超过半个间隔
+        while not self._stop_event.wait(self.threshold / 2):
+            self._check()
+
+    def start(self):
+        with self._lock:
+            self._last_beat = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name='stall-watchdog', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def stats(self):
+        """返回 {stalls, max_stall_ms, max_lag_ms}"""
+        with self._lock:
+            return {'stalls': self.stalls, 'max_stall_ms': round(self.max_stall * 1000, 1),
+                    'max_lag_ms': round(self.max_lag * 1000, 1)}
+
+
+class ProfileSession:
+    """手动开始/停止的性能分析（只分析调用 start() 的线程）
+
+    用法:
+        session = ProfileSession()
+        session.start()
+        ...
+        path, summary = session.stop()      # 报告文件路径和文本摘要
+    """
+
+    def __init__(self, output_dir=None, use_sampling=None):
+        """
+        Args:
+            output_dir: 报告保存目录，默认使用应用数据目录中的 profiles 文件夹
+            use_sampling: 是否使用 pyinstrument，默认在已安装时使用
+        """
+        self.output_dir = Path(output_dir) if output_dir else None
+        self.use_sampling = SamplingProfiler is not None if use_sampling is None else use_sampling
+        self._profiler = None
+        self._started_at = None
+
+    @property
+    def backend(self):
+        return 'pyinstrument' if self.use_sampling else 'cProfile'
+
+    @property
+    def running(self):
+        return self._profiler is not None
+
+    def start(self):
+        if self._profiler is not None:
+            return
+        if self.use_sampling:
+            profiler = SamplingProfiler()
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        self._profiler = profiler
+        self._started_at = time.localtime()
+
+    def stop(self):
+        """停止分析并保存报告（pyinstrument 为 .html，cProfile 为 .prof，可用 snakeviz 等工具查看）
+
+        Returns:
+            tuple: (报告文件路径, 文本摘要)，没有进行中的分析时返回 (None, '')
+        """
+        profiler, self._profiler = self._profiler, None
+        if profiler is None:
+            return None, ''
+        output_dir = self.output_dir or default_profile_dir()
+        output_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"profile-{time.strftime('%Y%m%d-%H%M%S', self._started_at)}"
+        if self.use_sampling:
+            profiler.stop()
+            path = output_dir / f"{stem}.html"
+            path.write_text(profiler.output_html(), encoding='utf-8')
+            return path, profiler.output_text()
+        profiler.disable()
+        path = output_dir / f"{stem}.prof"
+        profiler.dump_stats(str(path))
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(SUMMARY_LINES)
+        return path, output.getvalue()
@@ -0,0 +1,179 @@
+"""
+音质协商：并发探测多个音质等级，返回可用的最高音质。
+
+请求的音质不可用时，接口要么不返回地址，要么静默返回较低的音质。
+QualityNegotiator 同时请求请求音质及其以下的若干等级（音质阶梯），
+在时间预算内选出可用的最高等级，并按歌曲缓存各等级的可用性，
+同一首歌再次下载时通常只需一次请求。
+本模块不依赖Qt，可在命令行和守护进程中使用。
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from core import metrics
+
+# 默认音质阶梯（从高到低）。杜比/臻品全景声（12、13）是不同的音频格式，默认不作为降级选项
+DEFAULT_LADDER = (14, 11, 10, 9, 8, 4)
+
+# 与 QualityLevel 中的名称对应，用于识别接口实际返回的音质
+QUALITY_NAMES = {
+    0: '试听音质', 4: '标准音质', 8: 'HQ高音质', 9: 'HQ高音质增强', 10: 'SQ无损音质',
+    11: 'Hi-Res音质', 12: '杜比全景声', 13: '臻品全景声', 14: '臻品母带2.0',
+}
+
+
+def parse_ladder(value):
+    """解析配置中的音质阶梯（列表或逗号分隔的字符串），无效时返回默认阶梯"""
+    if isinstance(value, str):
+        value = value.replace('，', ',').split(',')
+    try:
+        ladder = tuple(dict.fromkeys(int(level) for level in value or ()))
+    except (TypeError, ValueError):
+        return DEFAULT_LADDER
+    ladder = tuple(level for level in ladder if level in QUALITY_NAMES)
+    return tuple(sorted(ladder, reverse=True)) or DEFAULT_LADDER
+
+
+def downgrade_message(requested, details):
+    """实际音质低于请求音质时返回提示文本，否则返回None"""
+    level = details.get('quality_level') if details else None
+    if level is None or level >= requested:
+        return None
+    return (f"'{details.get('title') or details.get('song', '')}' 无 {QUALITY_NAMES.get(requested, requested)}，"
+            f"已使用 {QUALITY_NAMES.get(level, level)}")
+
+
+def _reported_level(details, requested):
+    """接口在详情中注明了实际音质时以其为准，否则认为是请求的音质"""
+    reported = details.get('quality')
+    if isinstance(reported, int) and reported in QUALITY_NAMES:
+        return reported
+    if isinstance(reported, str):
+        for level, name in QUALITY_NAMES.items():
+            if reported == name:
+                return level
+    return requested
+
+
+class QualityNegotiator:
+    """并发探测音质阶梯，返回时间预算内可用的最高音质"""
+
+    def __init__(self, fetch, ladder=DEFAULT_LADDER, budget=4.0, max_workers=8, cache_ttl=1800,
+                 cache_size=4096):
+        """
+        Args:
+            fetch: 获取详情的函数 fetch(song_id, quality=..., cancel_event=...)，如 core.api.get_song_details
+            ladder: 音质阶梯（从高到低）
+            budget: 等待更高音质结果的最长时间（秒），超时后使用已知可用的最高音质
+            max_workers: 同时进行的探测请求数（所有歌曲共享）
+            cache_ttl: 可用性缓存的有效期（秒）
+            cache_size: 最多缓存的歌曲数
+        """
+        self.fetch = fetch
+        self.ladder = tuple(ladder)
+        self.budget = budget
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='quality-probe')
+        self._lock = threading.Lock()
+        self._cache = {}  # song_id -> (timestamp, {requested_level: actual_level 或 None})
+
+    def set_ladder(self, ladder):
+        self.ladder = parse_ladder(ladder)
+
+    def levels_for(self, requested):
+        """请求的音质及阶梯中所有更低的等级，从高到低"""
+        return [requested] + [level for level in self.ladder if level < requested]
+
+    def _cached(self, song_id):
+        with self._lock:
+            entry = self._cache.get(song_id)
+            if entry is not None and time.monotonic() - entry[0] > self.cache_ttl:
+                del self._cache[song_id]
+                entry = None
+            known = dict(entry[1]) if entry is not None else {}
+        metrics.cache_access('quality', entry is not None)
+        return known
+
+    def _remember(self, song_id, results):
+        with self._lock:
+            if song_id not in self._cache and len(self._cache) >= self.cache_size:
+                # 淘汰最早写入的一首
+                self._cache.pop(next(iter(self._cache)))
+            known = self._cache.get(song_id, (0, {}))[1]
+            known.update(results)
+            self._cache[song_id] = (time.monotonic(), known)
+
+    def _probe(self, song_id, level, cancel_event):
+        details = self.fetch(song_id, quality=level, cancel_event=cancel_event)
+        if not details or not details.get('url'):
+            return None
+        return details
+
+    def forget(self, song_id):
+        with self._lock:
+            self._cache.pop(song_id, None)
+
+    def negotiate(self, song_id, requested, cancel_event=None):
+        """获取可用的最高音质的歌曲详情
+
+        Args:
+            song_id: 歌曲ID
+            requested: 请求的音质等级
+            cancel_event: 可选的 threading.Event，置位后放弃并返回 (None, None)
+
+        Returns:
+            tuple: (details, 实际音质等级)，所有等级都不可用时返回 (None, None)
+        """
+        known = self._cached(song_id)
+        best = self._negotiate(song_id, requested, known, cancel_event)
+        if best is None and known and not (cancel_event is not None and cancel_event.is_set()):
+            # 缓存的可用性可能已过时（例如地址失效），清空后完整探测一次
+            self.forget(song_id)
+            best = self._negotiate(song_id, requested, {}, cancel_event)
+        return best or (None, None)
+
+    def _negotiate(self, song_id, requested, known, cancel_event):
+        levels = self.levels_for(requested)
+        # 已知不可用的等级不再探测；已知可用的最高等级之下的等级也不必探测
+        levels = [level for level in levels if known.get(level, level) is not None]
+        for index, level in enumerate(levels):
+            if known.get(level) is not None:
+                levels = levels[:index + 1]
+                break
+        if not levels:
+            return None
+
+        probe_cancel = threading.Event()
+        futures = {self._executor.submit(self._probe, song_id, level, probe_cancel): level for level in levels}
+        results = {}
+        best = None
+        deadline = time.monotonic() + self.budget
+        try:
+            pending = set(futures)
+            while pending:
+                if cancel_event is not None and cancel_event.is_set():
+                    return None
+                if best is not None and time.monotonic() >= deadline:
+                    break  # 超出预算，使用已知可用的最高音质
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    level = futures[future]
+                    try:
+                        details = future.result()
+                    except Exception:
+                        details = None
+                    results[level] = _reported_level(details, level) if details else None
+                    if details and (best is None or results[level] > best[1]):
+                        best = (details, results[level])
+                # 比已知最好的结果更高的等级都已有结论时即可返回
+                if best is not None and all(futures[f] <= best[1] for f in pending):
+                    break
+        finally:
+            probe_cancel.set()  # 中止仍在进行的探测请求
+            for future in futures:
+                future.cancel()
+            if results:
+                self._remember(song_id, results)
+        return best
@@ -0,0 +1,99 @@
+import time
+from collections import OrderedDict
+
+from core import metrics
+
+
+def _normalize(text):
+    """统一大小写并去除空白，便于前缀/子串比较"""
+    return ''.join(str(text or '').split()).lower()
+
+
+def _song_matches(song, terms):
+    """歌曲的 歌名+歌手+专辑 是否包含所有查询词"""
+    haystack = _normalize(f"{song.get('title', '')}{song.get('singer', '')}{song.get('album', '')}")
+    return all(term in haystack for term in terms)
+
+
+class SearchCache:
+    """最近搜索结果的LRU缓存，用于实时搜索时的即时联想
+
+    - 完全相同的查询在有效期内直接返回缓存结果，无需联网
+    - 输入过程中，从"当前输入的前缀"对应的缓存结果以及本地歌曲中筛选匹配项，
+      在网络搜索返回之前先展示给用户
+    """
+
+    def __init__(self, max_queries=64, ttl=300):
+        """初始化缓存
+
+        Args:
+            max_queries: 最多缓存的查询数量
+            ttl: 缓存有效期（秒）
+        """
+        self.max_queries = max_queries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # normalized_query -> (timestamp, songs)
+
+    def put(self, query, songs):
+        """缓存一次网络搜索的结果"""
+        key = _normalize(query)
+        if not key:
+            return
+        self._entries[key] = (time.monotonic(), list(songs))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_queries:
+            self._entries.popitem(last=False)
+
+    def get(self, query):
+        """返回完全匹配且未过期的缓存结果，没有则返回None"""
+        key = _normalize(query)
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] > self.ttl:
+            del self._entries[key]
+            entry = None
+        metrics.cache_access('search', entry is not None)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def suggest(self, query, local_songs=(), limit=50):
+        """根据已缓存的结果和本地歌曲给出联想结果
+
+        Args:
+            query: 当前输入内容
+            local_songs: 额外参与匹配的本地歌曲（如播放列表中的歌曲）
+            limit: 最多返回的歌曲数量
+
+        Returns:
+            list: 去重后的匹配歌曲列表
+        """
+        cached = self.get(query)
+        if cached is not None:
+            return cached[:limit]
+
+        terms = [_normalize(term) for term in str(query).split() if term.strip()]
+        if not terms:
+            return []
+        key = ''.join(terms)
+
+        results = []
+        seen = set()
+
+        def collect(songs):
+            for song in songs:
+                if len(results) >= limit:
+                    return
+                song_key = song.get('id') or (song.get('title'), song.get('singer'))
+                if song_key in seen or not _song_matches(song, terms):
+                    continue
+                seen.add(song_key)
+                results.append(song)
+
+        # 最近的查询优先；只有与当前输入互为前缀的查询结果才可能相关
+        for cached_key, (_, songs) in reversed(self._entries.items()):
+            if key.startswith(cached_key) or cached_key.startswith(key):
+                collect(songs)
+
+        collect(local_songs)
+        return results
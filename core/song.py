@@ -0,0 +1,82 @@
+from collections.abc import Mapping
+
+from core.matcher import MatchKey, song_key
+
+
+class SongRecord(Mapping):
+    """紧凑的歌曲记录
+
+    使用 __slots__ 存储 id/title/singer/album，比等价的字典占用更少内存；
+    其他字段（如QQ歌单的 mid）放在 extra 中。实现了只读的 Mapping 接口，
+    原先按字典读取歌曲（song['title']、song.get('album', '')、dict(song)）的代码无需修改。
+    规范化的比较键在首次使用时计算并缓存，去重和匹配时不再重复处理字符串。
+    记录创建后不应修改。
+    """
+    __slots__ = ('id', 'title', 'singer', 'album', 'extra', '_key', '_match_key')
+
+    FIELDS = ('id', 'title', 'singer', 'album')
+
+    def __init__(self, id=None, title='', singer='', album='', **extra):
+        self.id = id
+        self.title = title
+        self.singer = singer
+        self.album = album
+        self.extra = extra or None
+        self._key = None
+        self._match_key = None
+
+    @classmethod
+    def from_dict(cls, data):
+        """由字典（或另一个 SongRecord）创建记录"""
+        if isinstance(data, SongRecord):
+            return data
+        return cls(**data)
+
+    def __getitem__(self, name):
+        if name in self.FIELDS:
+            return getattr(self, name)
+        if self.extra and name in self.extra:
+            return self.extra[name]
+        raise KeyError(name)
+
+    def get(self, name, default=None):
+        if name in self.FIELDS:
+            return getattr(self, name)
+        if self.extra:
+            return self.extra.get(name, default)
+        return default
+
+    def __iter__(self):
+        yield from self.FIELDS
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return len(self.FIELDS) + (len(self.extra) if self.extra else 0)
+
+    @property
+    def key(self):
+        """去重用的规范化键，见 core.matcher.song_key"""
+        if self._key is None:
+            self._key = song_key(self.title, self.singer)
+        return self._key
+
+    @property
+    def match_key(self):
+        """模糊匹配打分用的 MatchKey"""
+        if self._match_key is None:
+            self._match_key = MatchKey(self)
+        return self._match_key
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"SongRecord({self.to_dict()!r})"
+
+
+def key_of(song):
+    """返回歌曲的规范化键，SongRecord 使用缓存的结果"""
+    if isinstance(song, SongRecord):
+        return song.key
+    return song_key(song.get('title'), song.get('singer'))
@@ -0,0 +1,80 @@
+"""
+启动耗时记录。
+
+main.py 最先导入本模块（以导入时刻作为起点），启动过程中在各阶段结束时调用 mark()，
+窗口完成首次绘制和延后的初始化后调用 finish()：总耗时作为 'startup' 阶段记入 core.timing
+（各阶段耗时附在记录中，可在诊断窗口和耗时日志中查看）。
+设置环境变量 MUSICDL_STARTUP_REPORT=1 或以 --startup-report 参数启动时，在控制台输出各阶段耗时。
+本模块不依赖Qt，也不导入其他较重的模块。
+"""
+import os
+import sys
+import threading
+import time
+
+REPORT_ENV = 'MUSICDL_STARTUP_REPORT'
+REPORT_ARG = '--startup-report'
+
+_lock = threading.Lock()
+_started = time.perf_counter()
+_last = _started
+_phases = []  # [(阶段, 秒)]
+_finished = False
+
+
+def mark(phase):
+    """记录从上一个阶段结束到现在的耗时"""
+    global _last
+    now = time.perf_counter()
+    with _lock:
+        if _finished:
+            return
+        _phases.append((phase, now - _last))
+        _last = now
+
+
+def phases():
+    with _lock:
+        return list(_phases)
+
+
+def elapsed():
+    """从启动到现在的秒数"""
+    return time.perf_counter() - _started
+
+
+def report_requested():
+    return bool(os.environ.get(REPORT_ENV)) or REPORT_ARG in sys.argv
+
+
+def format_report(phase_list=None, total=None):
+    """将各阶段耗时格式化为多行文本"""
+    phase_list = phases() if phase_list is None else phase_list
+    total = elapsed() if total is None else total
+    width = max((len(phase) for phase, _ in phase_list), default=0)
+    lines = [f"启动耗时 {total * 1000:.0f}ms:"]
+    for phase, seconds in phase_list:
+        share = seconds / total * 100 if total else 0
+        lines.append(f"  {phase:<{width}}  {seconds * 1000:7.1f}ms  {share:4.1f}%")
+    return '\n'.join(lines)
+
+
+def finish():
+    """结束记录：总耗时写入 core.timing，需要时输出报告（只生效一次）
+
+    Returns:
+        float: 启动总耗时（秒），已结束过时返回None
+    """
+    global _finished
+    with _lock:
+        if _finished:
+            return None
+        _finished = True
+        phase_list = list(_phases)
+        total = _last - _started
+    from core.timing import get_recorder
+    get_recorder().record('startup', total,
+                          phases={phase: round(seconds * 1000, 1) for phase, seconds in phase_list})
+    if report_requested():
+        print(format_report(phase_list, total))
+    return total
@@ -0,0 +1,117 @@
+"""
+下载时在音频文件头部预留标签空间。
+
+mutagen 写入标签时，如果文件头部的标签区（ID3v2 标签或 FLAC 元数据块）放不下新的标签和封面，
+就要把其后的整个音频数据向后移动，对上百MB的 Hi-Res 文件相当于再写一遍文件。
+HeaderReserver 在下载写盘的同时改写文件头：MP3 的 ID3v2 标签增加填充（没有时写入一个只含填充的空标签），
+FLAC 在最后一个元数据块之后插入 PADDING 块。之后嵌入元数据时配合 keep_padding，
+mutagen 只需原地改写文件头部，不再移动音频数据。
+"""
+
+# 预留的空间（足够容纳常见的 500~800px 封面和歌词；放不下时 mutagen 仍会正确写入，只是需要移动音频数据）
+DEFAULT_TAG_RESERVE = 256 * 1024
+
+_FLAC_PADDING_BLOCK = 1
+_FLAC_MAX_BLOCK_SIZE = 2 ** 24 - 1
+
+
+def keep_padding(info):
+    """mutagen 的 padding 回调：剩余空间足够时保留全部填充（原地写入），不够时使用默认策略"""
+    if info.padding >= 0:
+        return info.padding
+    return info.get_default_padding()
+
+
+def _synchsafe(value):
+    return bytes(((value >> 21) & 0x7f, (value >> 14) & 0x7f, (value >> 7) & 0x7f, value & 0x7f))
+
+
+def _unsynchsafe(data):
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+class HeaderReserver:
+    """流式处理下载数据，在文件头部插入预留的标签空间
+
+    用法:
+        reserver = HeaderReserver('.flac', reserve)
+        for chunk in chunks:
+            f.write(reserver.feed(chunk))
+        f.write(reserver.flush())
+
+    数据不是可识别的 MP3/FLAC 格式时原样输出。
+    """
+
+    def __init__(self, extension, reserve=DEFAULT_TAG_RESERVE):
+        self.extension = extension.lower()
+        self.reserve = reserve
+        self._buffer = b''
+        self._done = self.extension not in ('.mp3', '.flac') or reserve <= 0
+        self._flac_offset = 4  # 下一个元数据块头在缓冲区中的位置
+
+    @property
+    def active(self):
+        return not self._done
+
+    def feed(self, chunk):
+        if self._done:
+            return chunk
+        self._buffer += chunk
+        if self.extension == '.mp3':
+            return self._feed_mp3()
+        return self._feed_flac()
+
+    def flush(self):
+        """数据结束时输出仍在缓冲区中的内容（文件头不完整时原样输出）"""
+        data, self._buffer, self._done = self._buffer, b'', True
+        return data
+
+    def _passthrough(self, prefix=b''):
+        data, self._buffer, self._done = prefix + self._buffer, b'', True
+        return data
+
+    def _feed_mp3(self):
+        if len(self._buffer) < 10:
+            return b''
+        header = self._buffer[:10]
+        if header[:3] != b'ID3':
+            # 没有ID3标签：先写入一个只含填充的空 ID3v2.4 标签
+            return self._passthrough(b'ID3\x04\x00\x00' + _synchsafe(self.reserve) + bytes(self.reserve))
+        version, flags = header[3], header[5]
+        size = _unsynchsafe(header[6:10])
+        if version not in (3, 4) or flags & 0x50 or any(b & 0x80 for b in header[6:10]):
+            # ID3v2.2、带扩展头（可能记录了填充大小）或尾部标识（不允许填充）、头部无效的标签不做处理
+            return self._passthrough()
+        if size + self.reserve > 0x0fffffff:
+            return self._passthrough()
+        if len(self._buffer) < 10 + size:
+            return b''
+        # 保留原有标签内容，在其后追加填充
+        tag = header[:6] + _synchsafe(size + self.reserve) + self._buffer[10:10 + size]
+        self._buffer = self._buffer[10 + size:]
+        return self._passthrough(tag + bytes(self.reserve))
+
+    def _feed_flac(self):
+        if len(self._buffer) < 4:
+            return b''
+        if self._buffer[:4] != b'fLaC':
+            return self._passthrough()
+        # 依次跳过元数据块，找到标记为最后一块的块头
+        while len(self._buffer) >= self._flac_offset + 4:
+            block_header = self._buffer[self._flac_offset:self._flac_offset + 4]
+            is_last = block_header[0] & 0x80
+            length = int.from_bytes(block_header[1:4], 'big')
+            if not is_last:
+                self._flac_offset += 4 + length
+                continue
+            end = self._flac_offset + 4 + length
+            if len(self._buffer) < end:
+                return b''
+            reserve = min(self.reserve, _FLAC_MAX_BLOCK_SIZE)
+            head = (self._buffer[:self._flac_offset] + bytes((block_header[0] & 0x7f,)) + block_header[1:]
+                    + self._buffer[self._flac_offset + 4:end]
+                    + bytes((0x80 | _FLAC_PADDING_BLOCK,)) + reserve.to_bytes(3, 'big')
+                    + bytes(reserve))
+            self._buffer = self._buffer[end:]
+            return self._passthrough(head)
+        return b''
@@ -0,0 +1,233 @@
+"""
+下载流程各阶段的耗时记录。
+
+span() 记录一个阶段（搜索、详情、HEAD、音频传输、封面、歌词、嵌入元数据、重命名……）的耗时、数据量和结果，
+TimingRecorder 按阶段汇总次数、耗时分位数和吞吐，可以把每条记录实时追加到 JSONL 文件，
+也可以在诊断窗口中查看汇总。记录只是在锁内追加到有上限的内存队列，开销可以忽略，因此始终开启。
+一次批量下载可以使用以全局记录器为 parent 的独立记录器，单独汇总本批次的各阶段，记录同时转发到全局记录器。
+本模块不依赖Qt。
+"""
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# 各阶段保留的最近耗时样本数（用于计算分位数）
+MAX_SAMPLES = 2048
+# 内存中保留的最近记录数（用于导出）
+MAX_EVENTS = 10000
+
+STAGE_NAMES = {
+    'search': '搜索',
+    'details': '详情',
+    'details_robust': '匹配并获取详情',
+    'lyric': '歌词',
+    'playlist_page': '歌单分页',
+    'head': 'HEAD请求',
+    'audio': '音频传输',
+    'cover': '封面',
+    'embed': '嵌入元数据',
+    'rename': '重命名',
+    'ui_stall': '界面卡顿',
+    'startup': '启动',
+}
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder():
+    """获取全局的耗时记录器"""
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = TimingRecorder()
+        return _recorder
+
+
+def span(stage, **fields):
+    """在全局记录器中记录一个阶段，参见 TimingRecorder.span"""
+    return get_recorder().span(stage, **fields)
+
+
+def percentile(sorted_values, fraction):
+    """最近秩法计算分位数，sorted_values 须已排序"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+class Span:
+    """一次阶段记录，在 with 块中可以累加数据量、设置结果和附加字段"""
+    __slots__ = ('stage', 'fields', 'nbytes', 'outcome')
+
+    def __init__(self, stage, fields):
+        self.stage = stage
+        self.fields = fields
+        self.nbytes = 0
+        self.outcome = 'ok'
+
+    def add_bytes(self, nbytes):
+        self.nbytes += nbytes
+
+    def fail(self, outcome='error'):
+        """标记结果，如 'timeout'、'connection_error'、'http_error'、'cancelled'"""
+        self.outcome = outcome
+
+
+def format_summary(summary):
+    """将 TimingRecorder.summary() 的结果格式化为多行文本（每个阶段一行）"""
+    lines = []
+    for stage, entry in summary.items():
+        line = (f"{STAGE_NAMES.get(stage, stage)}: {entry['count']} 次，p50 {entry['p50_ms']:.0f}ms，"
+                f"p90 {entry['p90_ms']:.0f}ms，最长 {entry['max_ms']:.0f}ms")
+        if entry['bytes']:
+            line += f"，{entry['mb_per_s']:.1f} MB/s"
+        if entry['failures']:
+            line += f"，失败 {entry['failures']}"
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+class TimingRecorder:
+    """按阶段汇总耗时、数据量和结果（线程安全）"""
+
+    def __init__(self, max_samples=MAX_SAMPLES, max_events=MAX_EVENTS, parent=None):
+        """
+        Args:
+            max_samples: 各阶段保留的最近耗时样本数
+            max_events: 内存中保留的最近记录数
+            parent: 每条记录同时转发到的记录器（如批量下载的记录器转发到全局记录器）
+        """
+        self.max_samples = max_samples
+        self.parent = parent
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._events = deque(maxlen=max_events)
+        self._log_file = None
+        self._listeners = ()
+
+    @contextmanager
+    def span(self, stage, **fields):
+        """记录 with 块的耗时
+
+        块内抛出异常时结果记为 'error'（已通过 Span.fail 设置的结果保留）。
+
+        用法:
+            with recorder.span('audio', song=title) as s:
+                ...
+                s.add_bytes(len(chunk))
+        """
+        current = Span(stage, fields)
+        started = time.perf_counter()
+        try:
+            yield current
+        except BaseException:
+            if current.outcome == 'ok':
+                current.outcome = 'error'
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - started, current.nbytes, current.outcome, **current.fields)
+
+    def record(self, stage, seconds, nbytes=0, outcome='ok', **fields):
+        event = {'time': round(time.time(), 3), 'stage': stage, 'ms': round(seconds * 1000, 3),
+                 'bytes': nbytes, 'outcome': outcome}
+        event.update(fields)
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = {'count': 0, 'seconds': 0.0, 'bytes': 0, 'outcomes': {},
+                                               'samples': deque(maxlen=self.max_samples)}
+            entry['count'] += 1
+            entry['seconds'] += seconds
+            entry['bytes'] += nbytes
+            entry['outcomes'][outcome] = entry['outcomes'].get(outcome, 0) + 1
+            entry['samples'].append(seconds)
+            self._events.append(event)
+            if self._log_file is not None:
+                try:
+                    self._log_file.write(json.dumps(event, ensure_ascii=False) + '\n')
+                except (OSError, TypeError, ValueError) as e:
+                    print(f"写入耗时日志失败: {e}")
+        for listener in self._listeners:
+            listener(stage, seconds, nbytes, outcome)
+        if self.parent is not None:
+            self.parent.record(stage, seconds, nbytes, outcome, **fields)
+
+    def add_listener(self, listener):
+        """之后的每条记录都会以 listener(stage, seconds, nbytes, outcome) 通知（在记录所在的线程中调用）"""
+        with self._lock:
+            self._listeners = self._listeners + (listener,)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            self._listeners = tuple(item for item in self._listeners if item is not listener)
+
+    def summary(self):
+        """返回 {阶段: {count, total_s, mean_ms, p50_ms, p90_ms, p99_ms, max_ms, bytes, mb_per_s, failures, outcomes}}
+
+        分位数按各阶段最近 max_samples 次记录计算，mb_per_s 按该阶段的累计耗时计算；
+        failures 不包括被取消的记录（如音质协商在得到更高音质后取消的探测请求）。
+        """
+        with self._lock:
+            stages = {stage: (dict(entry, outcomes=dict(entry['outcomes'])), sorted(entry['samples']))
+                      for stage, entry in self._stages.items()}
+        result = {}
+        for stage, (entry, samples) in stages.items():
+            seconds = entry['seconds']
+            result[stage] = {
+                'count': entry['count'],
+                'total_s': round(seconds, 3),
+                'mean_ms': round(seconds / entry['count'] * 1000, 3),
+                'p50_ms': round(percentile(samples, 0.50) * 1000, 3),
+                'p90_ms': round(percentile(samples, 0.90) * 1000, 3),
+                'p99_ms': round(percentile(samples, 0.99) * 1000, 3),
+                'max_ms': round(samples[-1] * 1000, 3) if samples else 0.0,
+                'bytes': entry['bytes'],
+                'mb_per_s': round(entry['bytes'] / seconds / 1024 / 1024, 3) if seconds and entry['bytes'] else 0.0,
+                'failures': entry['count'] - entry['outcomes'].get('ok', 0) - entry['outcomes'].get('cancelled', 0),
+                'outcomes': entry['outcomes'],
+            }
+        return result
+
+    def format_summary(self):
+        """将汇总格式化为多行文本（每个阶段一行）"""
+        return format_summary(self.summary())
+
+    def events(self):
+        """内存中保留的最近记录"""
+        with self._lock:
+            return list(self._events)
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._events.clear()
+
+    def open_log(self, path):
+        """之后的每条记录都以 JSON Lines 格式追加到 path（行缓冲）"""
+        log_file = open(path, 'a', encoding='utf-8', buffering=1)
+        with self._lock:
+            previous, self._log_file = self._log_file, log_file
+        if previous is not None:
+            previous.close()
+
+    def close_log(self):
+        with self._lock:
+            log_file, self._log_file = self._log_file, None
+        if log_file is not None:
+            log_file.close()
+
+    def dump_jsonl(self, path):
+        """将内存中保留的记录写入 JSONL 文件
+
+        Returns:
+            int: 写入的记录数
+        """
+        events = self.events()
+        with open(path, 'w', encoding='utf-8') as f:
+            for event in events:
+                f.write(json.dumps(event, ensure_ascii=False) + '\n')
+        return len(events)
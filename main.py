@@ -1,9 +1,18 @@
+from core import startup  # 最先导入，以便记录启动各阶段的耗时
+
 import sys
+import multiprocessing
 from PySide6.QtWidgets import QApplication
+startup.mark('import_qt')
 from ui.main_window import MusicDownloader
+startup.mark('import_ui')
 
 if __name__ == "__main__":
+    # 扫描下载目录时使用进程池，打包成可执行文件后需要此调用
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
+    startup.mark('qapplication')
     window = MusicDownloader()
     window.show()
-    sys.exit(app.exec()) 
\ No newline at end of file
+    startup.mark('show')
+    sys.exit(app.exec())
@@ -0,0 +1,46 @@
+"""LibraryIndex.lookup 的音质判断：请求更高音质时不应把低音质文件当作已下载"""
+import pytest
+
+from core.library_index import LibraryIndex
+
+SONG = {'id': '42', 'title': 'Song', 'singer': 'Singer'}
+
+
+@pytest.fixture
+def library(tmp_path):
+    index = LibraryIndex(tmp_path / "library.db")
+    yield index
+    index.close()
+
+
+def write_song(tmp_path, name="Song - Singer.mp3"):
+    path = tmp_path / name
+    path.write_bytes(b'audio')
+    return path
+
+
+def test_lower_quality_file_is_upgraded(library, tmp_path):
+    path = write_song(tmp_path)
+    library.record(path, song_id='42', title='Song', singer='Singer', quality=8, requested_quality=8)
+
+    assert library.lookup(SONG, tmp_path, quality=8) == str(path)
+    assert library.lookup(SONG, tmp_path, quality=4) == str(path)
+    assert library.lookup(SONG, tmp_path, quality=14) is None
+    # 不指定音质时（如播放本地文件）任意音质都可以
+    assert library.lookup(SONG, tmp_path) == str(path)
+
+
+def test_negotiated_downgrade_is_not_downloaded_again(library, tmp_path):
+    # 请求 14 时只有 10 可用：再次请求 14 也不会更好，不应重复下载
+    path = write_song(tmp_path, "Song - Singer.flac")
+    library.record(path, song_id='42', title='Song', singer='Singer', quality=10, requested_quality=14)
+
+    assert library.lookup(SONG, tmp_path, quality=14) == str(path)
+
+
+def test_unknown_quality_policy(library, tmp_path):
+    path = write_song(tmp_path)
+    library.record(path, title='Song', singer='Singer')
+
+    assert library.lookup(SONG, tmp_path, quality=14) == str(path)
+    assert library.lookup(SONG, tmp_path, quality=14, accept_unknown_quality=False) is None
@@ -0,0 +1,44 @@
+"""plan_sync 不应撤销用户对本地列表的修改"""
+from core.playlist_sync import plan_sync
+
+SOURCE_ID = 'S'
+
+
+def make_match(calls):
+    def match(title, singer, album='', cancel_event=None):
+        calls.append(title)
+        return {'id': f"id_{title}", 'title': title, 'singer': singer}
+    return match
+
+
+def state_of(plan):
+    return {'source_id': plan.source_id, 'mids': plan.mids, 'matches': plan.matches,
+            'preexisting': sorted(plan.preexisting)}
+
+
+def test_locally_deleted_song_is_not_added_again():
+    source = [{'mid': 'm1', 'title': 'A', 'singer': 'X'}, {'mid': 'm2', 'title': 'B', 'singer': 'Y'}]
+    calls = []
+    first = plan_sync([], None, SOURCE_ID, source, match=make_match(calls))
+    assert [song['id'] for song in first.added] == ['id_A', 'id_B']
+
+    # 用户删除了 A，再次同步既不重新加入，也不再搜索
+    calls.clear()
+    local = [{'id': 'id_B', 'title': 'B', 'singer': 'Y'}]
+    second = plan_sync(local, state_of(first), SOURCE_ID, source, match=make_match(calls))
+    assert second.added == []
+    assert calls == []
+    assert second.removed_ids == set()
+
+
+def test_songs_the_user_already_had_are_never_removed():
+    mine = {'id': 'mine', 'title': 'A', 'singer': 'X'}
+    source = [{'mid': 'm1', 'title': 'A', 'singer': 'X'}, {'mid': 'm2', 'title': 'B', 'singer': 'Y'}]
+    first = plan_sync([mine], None, SOURCE_ID, source, match=make_match([]))
+    assert [song['id'] for song in first.added] == ['id_B']
+    assert first.matches['m1'] == 'mine'
+
+    # 来源歌单删除了两首歌：只移除由同步加入的 B
+    local = [mine, {'id': 'id_B', 'title': 'B', 'singer': 'Y'}]
+    second = plan_sync(local, state_of(first), SOURCE_ID, [], match=make_match([]))
+    assert second.removed_ids == {'id_B'}
@@ -0,0 +1,136 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+                               QHeaderView, QPushButton, QLabel, QFileDialog, QMessageBox)
+from PySide6.QtCore import Qt, QTimer
+
+from core.profiling import ProfileSession
+from core.timing import STAGE_NAMES, get_recorder
+from ui import icons
+
+# 显示期间的自动刷新间隔（毫秒）
+REFRESH_INTERVAL = 1000
+
+COLUMNS = ("阶段", "次数", "p50 (ms)", "p90 (ms)", "p99 (ms)", "最长 (ms)", "累计 (s)", "MB/s", "失败")
+
+
+class DiagnosticsDialog(QDialog):
+    """显示 core.timing 记录的各阶段耗时汇总（可以导出为 JSONL）和界面卡顿统计，并可开始/停止性能分析"""
+
+    def __init__(self, parent=None, watchdog=None):
+        super().__init__(parent)
+        self.setWindowTitle("下载耗时诊断")
+        self.resize(760, 360)
+        self.recorder = get_recorder()
+        self.watchdog = watchdog
+        self.profile_session = ProfileSession()
+        self.setup_ui()
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(REFRESH_INTERVAL)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setShowGrid(False)
+        layout.addWidget(self.table)
+
+        button_layout = QHBoxLayout()
+        self.summary_label = QLabel()
+        button_layout.addWidget(self.summary_label, 1)
+
+        self.profile_button = QPushButton()
+        self.profile_button.setToolTip(f"分析界面线程的耗时（{self.profile_session.backend}），停止后保存报告")
+        self.profile_button.clicked.connect(self.toggle_profiling)
+        self._update_profile_button()
+        button_layout.addWidget(self.profile_button)
+
+        export_button = QPushButton(icons.icon('fa5s.file-export', icons.ON_ACCENT_COLOR), "导出 JSONL")
+        export_button.clicked.connect(self.export_jsonl)
+        reset_button = QPushButton(icons.icon('fa5s.eraser', icons.ON_ACCENT_COLOR), "清空")
+        reset_button.clicked.connect(self.reset)
+        button_layout.addWidget(export_button)
+        button_layout.addWidget(reset_button)
+        layout.addLayout(button_layout)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.refresh_timer.start()
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        summary = self.recorder.summary()
+        self.table.setRowCount(len(summary))
+        for row, (stage, entry) in enumerate(summary.items()):
+            failures = entry['failures']
+            values = (STAGE_NAMES.get(stage, stage), entry['count'], f"{entry['p50_ms']:.0f}",
+                      f"{entry['p90_ms']:.0f}", f"{entry['p99_ms']:.0f}", f"{entry['max_ms']:.0f}",
+                      f"{entry['total_s']:.1f}", f"{entry['mb_per_s']:.1f}" if entry['bytes'] else "",
+                      failures or "")
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(str(value))
+                if col:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                if col == 0 and len(entry['outcomes']) > 1:
+                    item.setToolTip(', '.join(f"{outcome}: {count}" for outcome, count in entry['outcomes'].items()))
+                self.table.setItem(row, col, item)
+        total = sum(entry['count'] for entry in summary.values())
+        text = f"共 {total} 条记录" if total else "尚无记录，开始搜索或下载后显示各阶段耗时"
+        if self.watchdog is not None:
+            stats = self.watchdog.stats()
+            text += f"；界面卡顿 {stats['stalls']} 次，最长 {stats['max_stall_ms']:.0f}ms"
+        if self.profile_session.running:
+            text += "；正在进行性能分析，重现卡顿的操作后点击停止"
+        self.summary_label.setText(text)
+
+    def _update_profile_button(self):
+        if self.profile_session.running:
+            self.profile_button.setIcon(icons.icon('fa5s.stop', icons.ON_ACCENT_COLOR))
+            self.profile_button.setText("停止性能分析")
+        else:
+            self.profile_button.setIcon(icons.icon('fa5s.microscope', icons.ON_ACCENT_COLOR))
+            self.profile_button.setText("开始性能分析")
+
+    def toggle_profiling(self):
+        if not self.profile_session.running:
+            self.profile_session.start()
+            self._update_profile_button()
+            self.refresh()
+            return
+        try:
+            path, summary = self.profile_session.stop()
+        except OSError as e:
+            QMessageBox.warning(self, "保存失败", f"无法保存性能分析报告: {e}")
+            return
+        finally:
+            self._update_profile_button()
+        self.refresh()
+        box = QMessageBox(QMessageBox.Information, "性能分析", f"报告已保存到 {path}", parent=self)
+        # 最耗时的调用放在“显示详细信息”中，不必打开报告文件就能先看一眼
+        box.setDetailedText(summary)
+        box.exec()
+
+    def export_jsonl(self):
+        path, _ = QFileDialog.getSaveFileName(self, "导出耗时记录", "timings.jsonl", "JSON Lines (*.jsonl)")
+        if not path:
+            return
+        try:
+            count = self.recorder.dump_jsonl(path)
+        except OSError as e:
+            QMessageBox.warning(self, "导出失败", f"无法写入文件: {e}")
+            return
+        self.summary_label.setText(f"已导出 {count} 条记录到 {path}")
+
+    def reset(self):
+        self.recorder.reset()
+        self.refresh()
@@ -1,15 +1,16 @@
 from PySide6.QtWidgets import QTableWidget, QTableWidgetItem, QHeaderView, QMenu
 from PySide6.QtCore import Qt, Signal
-from PySide6.QtGui import QColor, QAction
-import qtawesome
+from PySide6.QtGui import QColor
+
+from ui import icons
 
 HIGHLIGHT_COLOR = QColor("#89b4fa")
 BASE_BG_COLOR = QColor("#313244")
 
 class MusicTable(QTableWidget):
     song_preview_requested = Signal(int)  # row
-    song_download_requested = Signal(dict)  # song_info
-    song_add_to_playlist_requested = Signal(dict, str)  # song_info, playlist_name
+    song_download_requested = Signal(object)  # song_info
+    song_add_to_playlist_requested = Signal(object, str)  # song_info, playlist_name
     song_remove_requested = Signal(int)  # row
 
     def __init__(self, headers, parent=None):
@@ -58,35 +59,33 @@ class MusicTable(QTableWidget):
         menu = QMenu(self)
         
         # 预览/暂停
-        preview_action = QAction(qtawesome.icon('fa5s.play', color='#f0f0f0'), "预览/暂停", self)
+        preview_action = menu.addAction(icons.icon('fa5s.play', icons.MENU_COLOR), "预览/暂停")
         preview_action.triggered.connect(lambda: self.song_preview_requested.emit(row))
-        menu.addAction(preview_action)
         
         # 下载
-        download_action = QAction(qtawesome.icon('fa5s.download', color='#f0f0f0'), "下载", self)
+        download_action = menu.addAction(icons.icon('fa5s.download', icons.MENU_COLOR), "下载")
         download_action.triggered.connect(lambda: self.song_download_requested.emit(song_info))
-        menu.addAction(download_action)
         
         # 添加到播放列表 (只在搜索结果中显示)
         if self.playlist_manager and hasattr(self, '_show_add_to_playlist'):
-            add_to_menu = QMenu("添加到...", self)
-            add_to_menu.setIcon(qtawesome.icon('fa5s.plus', color='#f0f0f0'))
+            add_to_menu = QMenu("添加到...", menu)
+            add_to_menu.setIcon(icons.icon('fa5s.plus', icons.MENU_COLOR))
             
             for name in self.playlist_manager.get_playlist_names():
-                action = QAction(name, self)
+                action = add_to_menu.addAction(name)
                 action.triggered.connect(lambda checked=False, s_info=song_info, p_name=name: 
                                        self.song_add_to_playlist_requested.emit(s_info, p_name))
-                add_to_menu.addAction(action)
             
             menu.addMenu(add_to_menu)
         
         # 从播放列表移除 (只在播放列表中显示)
         if hasattr(self, '_show_remove_from_playlist'):
-            remove_action = QAction(qtawesome.icon('fa5s.trash', color='#f0f0f0'), "从此列表移除", self)
+            remove_action = menu.addAction(icons.icon('fa5s.trash', icons.MENU_COLOR), "从此列表移除")
             remove_action.triggered.connect(lambda: self.song_remove_requested.emit(row))
-            menu.addAction(remove_action)
         
         menu.exec(self.mapToGlobal(pos))
+        # 菜单项属于菜单，随菜单一起释放，反复打开菜单不会累积对象
+        menu.deleteLater()
 
     def add_song(self, row, *items):
         if row >= self.rowCount():
@@ -96,6 +95,23 @@ class MusicTable(QTableWidget):
             if col < self.columnCount():
                 self.setItem(row, col, QTableWidgetItem(str(item)))
 
+    def add_songs(self, start_row, rows):
+        """批量写入多行，只调整一次行数"""
+        if not rows:
+            return
+        end_row = start_row + len(rows)
+        if end_row > self.rowCount():
+            self.setRowCount(end_row)
+
+        column_count = self.columnCount()
+        self.setUpdatesEnabled(False)
+        try:
+            for offset, items in enumerate(rows):
+                for col, item in enumerate(items[:column_count]):
+                    self.setItem(start_row + offset, col, QTableWidgetItem(str(item)))
+        finally:
+            self.setUpdatesEnabled(True)
+
     def clear(self):
         self.setRowCount(0)
 
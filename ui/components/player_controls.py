@@ -1,9 +1,14 @@
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QSlider, QPushButton, QComboBox
 from PySide6.QtCore import Qt, QSize, Signal
-from PySide6.QtGui import QColor
-import qtawesome
+from PySide6.QtGui import QColor, QPixmap
 
 from core.constants import PlaybackMode, QualityLevel
+from ui import icons
+
+# 正在播放封面缩略图的显示大小
+COVER_SIZE = 40
+# 播放/暂停按钮的图标边长
+PLAY_ICON_SIZE = 20
 
 class PlayerControls(QWidget):
     play_pause_clicked = Signal()
@@ -38,6 +43,13 @@ class PlayerControls(QWidget):
 
     def _setup_now_playing(self, layout):
         now_playing_layout = QHBoxLayout()
+        
+        # 封面缩略图（没有封面时隐藏）
+        self.cover_label = QLabel()
+        self.cover_label.setObjectName("now_playing_cover")
+        self.cover_label.setFixedSize(COVER_SIZE, COVER_SIZE)
+        self.cover_label.hide()
+        
         now_playing_label = QLabel("正在播放:")
         now_playing_label.setObjectName("now_playing_label")
         now_playing_label.setMinimumWidth(80)
@@ -45,6 +57,7 @@ class PlayerControls(QWidget):
         self.now_playing_info = QLabel("无播放内容")
         self.now_playing_info.setObjectName("now_playing_info")
         
+        now_playing_layout.addWidget(self.cover_label)
         now_playing_layout.addWidget(now_playing_label)
         now_playing_layout.addWidget(self.now_playing_info, 1)
         layout.addLayout(now_playing_layout)
@@ -84,7 +97,7 @@ class PlayerControls(QWidget):
         self.playback_mode_button.setFixedSize(button_size)
         
         # 上一首
-        self.prev_button = QPushButton(qtawesome.icon('fa5s.step-backward', color='#cdd6f4'), "")
+        self.prev_button = QPushButton(icons.icon('fa5s.step-backward'), "")
         self.prev_button.setObjectName("prev_button")
         self.prev_button.setToolTip("上一首")
         self.prev_button.clicked.connect(self.previous_clicked.emit)
@@ -92,15 +105,15 @@ class PlayerControls(QWidget):
         self.prev_button.setFixedSize(button_size)
         
         # 播放/暂停
-        self.play_pause_button = QPushButton(qtawesome.icon('fa5s.play', color='#cdd6f4'), "")
+        self.play_pause_button = QPushButton(icons.icon('fa5s.play', size=PLAY_ICON_SIZE), "")
         self.play_pause_button.setObjectName("play_pause_button")
         self.play_pause_button.setToolTip("播放/暂停")
         self.play_pause_button.clicked.connect(self.play_pause_clicked.emit)
-        self.play_pause_button.setIconSize(QSize(20, 20))
+        self.play_pause_button.setIconSize(QSize(PLAY_ICON_SIZE, PLAY_ICON_SIZE))
         self.play_pause_button.setFixedSize(QSize(48, 48))
         
         # 下一首
-        self.next_button = QPushButton(qtawesome.icon('fa5s.step-forward', color='#cdd6f4'), "")
+        self.next_button = QPushButton(icons.icon('fa5s.step-forward'), "")
         self.next_button.setObjectName("next_button")
         self.next_button.setToolTip("下一首")
         self.next_button.clicked.connect(self.next_clicked.emit)
@@ -108,7 +121,7 @@ class PlayerControls(QWidget):
         self.next_button.setFixedSize(button_size)
         
         # 歌词按钮
-        self.lyrics_button = QPushButton(qtawesome.icon('fa5s.music', color='#cdd6f4'), "")
+        self.lyrics_button = QPushButton(icons.icon('fa5s.music'), "")
         self.lyrics_button.setObjectName("lyrics_button")
         self.lyrics_button.setToolTip("查看歌词")
         self.lyrics_button.clicked.connect(self.lyrics_view_toggled.emit)
@@ -118,7 +131,7 @@ class PlayerControls(QWidget):
 
         # 音质选择器
         quality_label = QLabel()
-        quality_label.setPixmap(qtawesome.icon('fa5s.sliders-h', color='#cdd6f4').pixmap(16, 16))
+        quality_label.setPixmap(icons.pixmap('fa5s.sliders-h'))
         quality_label.setToolTip("音质设置")
 
         self.quality_selector = QComboBox()
@@ -134,7 +147,7 @@ class PlayerControls(QWidget):
 
         # 音量控制
         volume_label = QLabel()
-        volume_label.setPixmap(qtawesome.icon('fa5s.volume-up', color='#cdd6f4').pixmap(16, 16))
+        volume_label.setPixmap(icons.pixmap('fa5s.volume-up'))
 
         self.volume_slider = QSlider(Qt.Horizontal)
         self.volume_slider.setObjectName("volume_slider")
@@ -166,12 +179,12 @@ class PlayerControls(QWidget):
 
     def update_playback_mode_button(self):
         icon_name, tooltip = PlaybackMode.ICONS[self.playback_mode]
-        self.playback_mode_button.setIcon(qtawesome.icon(icon_name, color='white'))
+        self.playback_mode_button.setIcon(icons.icon(icon_name, 'white'))
         self.playback_mode_button.setToolTip(tooltip)
 
     def update_play_pause_button(self, is_playing):
         icon_name = 'fa5s.pause' if is_playing else 'fa5s.play'
-        self.play_pause_button.setIcon(qtawesome.icon(icon_name, color='#cdd6f4'))
+        self.play_pause_button.setIcon(icons.icon(icon_name, size=PLAY_ICON_SIZE))
 
     def update_position(self, position):
         self.progress_slider.setValue(position)
@@ -184,6 +197,17 @@ class PlayerControls(QWidget):
     def update_now_playing(self, text):
         self.now_playing_info.setText(text)
 
+    def set_cover(self, data):
+        """显示封面缩略图，data 为空或无法解码时隐藏"""
+        pixmap = QPixmap()
+        if data and pixmap.loadFromData(data):
+            self.cover_label.setPixmap(pixmap.scaled(COVER_SIZE, COVER_SIZE, Qt.KeepAspectRatio,
+                                                     Qt.SmoothTransformation))
+            self.cover_label.show()
+        else:
+            self.cover_label.clear()
+            self.cover_label.hide()
+
     def set_navigation_enabled(self, enabled):
         self.next_button.setEnabled(enabled)
         self.prev_button.setEnabled(enabled)
@@ -193,10 +217,10 @@ class PlayerControls(QWidget):
 
     def update_lyrics_button_icon(self, show_lyrics):
         if show_lyrics:
-            self.lyrics_button.setIcon(qtawesome.icon('fa5s.list', color='#cdd6f4'))
+            self.lyrics_button.setIcon(icons.icon('fa5s.list'))
             self.lyrics_button.setToolTip("查看播放列表")
         else:
-            self.lyrics_button.setIcon(qtawesome.icon('fa5s.music', color='#cdd6f4'))
+            self.lyrics_button.setIcon(icons.icon('fa5s.music'))
             self.lyrics_button.setToolTip("查看歌词")
 
     def reset_ui(self):
@@ -204,6 +228,7 @@ class PlayerControls(QWidget):
         self.duration_label.setText("00:00")
         self.progress_slider.setValue(0)
         self.now_playing_info.setText("无播放内容")
+        self.set_cover(None)
 
     def _format_time(self, ms):
         seconds = ms // 1000
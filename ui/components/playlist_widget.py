@@ -2,9 +2,8 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QListW
                              QStackedWidget, QPushButton, QTextBrowser, QMenu,
                              QInputDialog, QMessageBox)
 from PySide6.QtCore import Qt, Signal
-from PySide6.QtGui import QAction
-import qtawesome
 
+from ui import icons
 from ui.components.music_table import PlaylistSongTable
 
 class PlaylistWidget(QWidget):
@@ -14,8 +13,9 @@ class PlaylistWidget(QWidget):
     playlist_renamed = Signal(str, str)
     playlist_played = Signal(str)
     playlist_downloaded = Signal(str)
+    playlist_synced = Signal(str)
     song_preview_requested = Signal(int)
-    song_download_requested = Signal(dict)
+    song_download_requested = Signal(object)
     song_removed_from_playlist = Signal(int)
     lyrics_view_toggled = Signal()
 
@@ -41,8 +41,8 @@ class PlaylistWidget(QWidget):
         # 播放列表页面
         self._setup_playlist_page()
         
-        # 歌词页面
-        self._setup_lyrics_page()
+        # 歌词页面在首次显示歌词时才创建
+        self.lyrics_display = None
         
         layout.addWidget(self.stack)
 
@@ -75,6 +75,10 @@ class PlaylistWidget(QWidget):
         
         self.stack.addWidget(playlist_page)
 
+    def _ensure_lyrics_page(self):
+        if self.lyrics_display is None:
+            self._setup_lyrics_page()
+
     def _setup_lyrics_page(self):
         lyrics_page = QWidget()
         layout = QVBoxLayout(lyrics_page)
@@ -83,7 +87,7 @@ class PlaylistWidget(QWidget):
 
         # 返回按钮
         back_layout = QHBoxLayout()
-        back_button = QPushButton(qtawesome.icon('fa5s.arrow-left', color='#cdd6f4'), " 返回播放列表")
+        back_button = QPushButton(icons.icon('fa5s.arrow-left'), " 返回播放列表")
         back_button.clicked.connect(self.lyrics_view_toggled.emit)
         back_layout.addWidget(back_button)
         back_layout.addStretch()
@@ -108,38 +112,38 @@ class PlaylistWidget(QWidget):
         menu = QMenu(self)
         
         # 新建播放列表
-        create_action = QAction(qtawesome.icon('fa5s.plus-square', color='#f0f0f0'), "新建播放列表", self)
+        create_action = menu.addAction(icons.icon('fa5s.plus-square', icons.MENU_COLOR), "新建播放列表")
         create_action.triggered.connect(self._create_playlist)
-        menu.addAction(create_action)
         
         if item:
             playlist_name = item.text()
             
             # 播放此歌单
-            play_action = QAction(qtawesome.icon('fa5s.play-circle', color='#f0f0f0'), "播放此歌单", self)
+            play_action = menu.addAction(icons.icon('fa5s.play-circle', icons.MENU_COLOR), "播放此歌单")
             play_action.triggered.connect(lambda: self.playlist_played.emit(playlist_name))
-            menu.addAction(play_action)
             
             menu.addSeparator()
             
             # 重命名
-            rename_action = QAction(qtawesome.icon('fa5s.edit', color='#f0f0f0'), "重命名", self)
+            rename_action = menu.addAction(icons.icon('fa5s.edit', icons.MENU_COLOR), "重命名")
             rename_action.triggered.connect(lambda: self._rename_playlist(playlist_name))
-            menu.addAction(rename_action)
             
             # 删除
-            delete_action = QAction(qtawesome.icon('fa5s.trash-alt', color='#f0f0f0'), "删除", self)
+            delete_action = menu.addAction(icons.icon('fa5s.trash-alt', icons.MENU_COLOR), "删除")
             delete_action.triggered.connect(lambda: self._delete_playlist(playlist_name))
-            menu.addAction(delete_action)
             
             menu.addSeparator()
             
             # 下载此列表
-            download_action = QAction(qtawesome.icon('fa5s.cloud-download-alt', color='#f0f0f0'), "下载此列表", self)
+            download_action = menu.addAction(icons.icon('fa5s.cloud-download-alt', icons.MENU_COLOR), "下载此列表")
             download_action.triggered.connect(lambda: self.playlist_downloaded.emit(playlist_name))
-            menu.addAction(download_action)
+
+            # 与QQ歌单同步
+            sync_action = menu.addAction(icons.icon('fa5s.sync-alt', icons.MENU_COLOR), "同步歌单")
+            sync_action.triggered.connect(lambda: self.playlist_synced.emit(playlist_name))
         
         menu.exec(self.playlist_list.mapToGlobal(pos))
+        menu.deleteLater()
 
     def _create_playlist(self):
         name, ok = QInputDialog.getText(self, "新建播放列表", "请输入列表名称:")
@@ -193,10 +197,10 @@ class PlaylistWidget(QWidget):
 
     def update_songs_table(self, songs):
         self.songs_table.clear()
-        for row, song_info in enumerate(songs):
-            self.songs_table.add_song(row, song_info.get('title'), song_info.get('singer'))
+        self.songs_table.add_songs(0, [(song_info.get('title'), song_info.get('singer')) for song_info in songs])
 
     def show_lyrics_view(self):
+        self._ensure_lyrics_page()
         self.stack.setCurrentIndex(1)
 
     def show_playlist_view(self):
@@ -206,10 +210,12 @@ class PlaylistWidget(QWidget):
         return self.stack.currentIndex() == 1
 
     def update_lyrics(self, lyrics_html):
+        self._ensure_lyrics_page()
         self.lyrics_display.setHtml(lyrics_html)
 
     def scroll_to_lyric_line(self, anchor):
-        self.lyrics_display.scrollToAnchor(anchor)
+        if self.lyrics_display is not None:
+            self.lyrics_display.scrollToAnchor(anchor)
 
     def set_playing_indicator(self, row, highlight=True):
         self.songs_table.set_playing_indicator(row, highlight)
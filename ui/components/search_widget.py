@@ -1,18 +1,40 @@
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QLabel, QToolTip
-from PySide6.QtCore import Signal, Qt, QPoint
-import qtawesome
+from PySide6.QtCore import Signal, Qt, QPoint, QTimer
 
+from ui import icons
 from ui.components.music_table import SearchResultTable
 
 class SearchWidget(QWidget):
+    LIVE_SEARCH_DELAY = 350  # ms，停止输入多久后发起网络搜索
+    RENDER_BATCH_SIZE = 50  # 每次事件循环迭代插入的行数
+    LOAD_MORE_THRESHOLD = 5  # 距离底部还剩多少行时加载下一页
+
     search_requested = Signal(str)
-    song_preview_requested = Signal(dict, object, int)  # song_info, table, row
-    song_download_requested = Signal(dict)
-    song_add_to_playlist_requested = Signal(dict, str)
+    live_search_requested = Signal(str)  # 实时搜索模式下，输入停顿后发出
+    query_edited = Signal(str)  # 实时搜索模式下，每次输入变化立即发出（用于本地联想）
+    live_search_toggled = Signal(bool)
+    more_results_requested = Signal()  # 滚动到结果末尾，需要加载下一页
+    song_preview_requested = Signal(object, object, int)  # song_info, table, row
+    song_download_requested = Signal(object)
+    song_add_to_playlist_requested = Signal(object, str)
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self.song_list = []
+        self.live_search_enabled = False
+        self.has_more_results = False
+        self.loading_more = False
+        self._rendered_rows = 0  # 已插入表格的行数，song_list 中其余的行等待分批插入
+
+        self._render_timer = QTimer(self)
+        self._render_timer.setInterval(0)
+        self._render_timer.timeout.connect(self._render_next_batch)
+
+        self._live_search_timer = QTimer(self)
+        self._live_search_timer.setSingleShot(True)
+        self._live_search_timer.setInterval(self.LIVE_SEARCH_DELAY)
+        self._live_search_timer.timeout.connect(self._on_live_search_timeout)
+
         self.setup_ui()
 
     def setup_ui(self):
@@ -27,15 +49,25 @@ class SearchWidget(QWidget):
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("输入歌曲名、歌手名搜索，或输入歌单ID(QQ音乐)导入整个歌单...")
         self.search_input.returnPressed.connect(self._on_search)
+        self.search_input.textEdited.connect(self._on_text_edited)
         self.search_input.setMinimumHeight(40)
+
+        self.live_search_button = QPushButton(icons.icon('fa5s.bolt', icons.ON_ACCENT_COLOR), "")
+        self.live_search_button.setObjectName("live_search_button")
+        self.live_search_button.setToolTip("实时搜索：边输入边搜索")
+        self.live_search_button.setCheckable(True)
+        self.live_search_button.toggled.connect(self._on_live_search_toggled)
+        self.live_search_button.setMinimumHeight(40)
+        self.live_search_button.setMaximumWidth(50)
         
-        self.search_button = QPushButton(qtawesome.icon('fa5s.search', color='#1e1e2e'), "")
+        self.search_button = QPushButton(icons.icon('fa5s.search', icons.ON_ACCENT_COLOR), "")
         self.search_button.setToolTip("立即搜索")
         self.search_button.clicked.connect(self._on_search)
         self.search_button.setMinimumHeight(40)
         self.search_button.setMaximumWidth(50)
         
         search_layout.addWidget(self.search_input)
+        search_layout.addWidget(self.live_search_button)
         search_layout.addWidget(self.search_button)
 
         # 搜索结果区域
@@ -48,12 +80,14 @@ class SearchWidget(QWidget):
         self.result_table.song_preview_requested.connect(self._on_song_preview)
         self.result_table.song_download_requested.connect(self.song_download_requested.emit)
         self.result_table.song_add_to_playlist_requested.connect(self.song_add_to_playlist_requested.emit)
+        self.result_table.verticalScrollBar().valueChanged.connect(self._on_results_scrolled)
         
         layout.addLayout(search_layout)
         layout.addWidget(search_header)
         layout.addWidget(self.result_table)
 
     def _on_search(self):
+        self._live_search_timer.stop()
         query = self.search_input.text().strip()
         if not query:
             QToolTip.showText(
@@ -64,20 +98,98 @@ class SearchWidget(QWidget):
             return
         self.search_requested.emit(query)
 
+    def _on_text_edited(self, text):
+        if not self.live_search_enabled:
+            return
+        query = text.strip()
+        # 纯数字视为歌单ID，只在按下回车时导入
+        if not query or query.isdigit():
+            self._live_search_timer.stop()
+            return
+        self.query_edited.emit(query)
+        self._live_search_timer.start()
+
+    def _on_live_search_timeout(self):
+        query = self.search_input.text().strip()
+        if query and not query.isdigit():
+            self.live_search_requested.emit(query)
+
+    def _on_live_search_toggled(self, checked):
+        self.live_search_enabled = checked
+        if not checked:
+            self._live_search_timer.stop()
+        self.live_search_toggled.emit(checked)
+
+    def set_live_search_enabled(self, enabled):
+        """设置实时搜索开关状态（不触发 live_search_toggled）"""
+        self.live_search_button.blockSignals(True)
+        self.live_search_button.setChecked(enabled)
+        self.live_search_button.blockSignals(False)
+        self.live_search_enabled = enabled
+
     def _on_song_preview(self, row):
         if 0 <= row < len(self.song_list):
             song_info = self.song_list[row]
             self.song_preview_requested.emit(song_info, self.result_table, row)
 
-    def update_search_results(self, songs):
-        self.song_list = songs
+    def update_search_results(self, songs, has_more=False):
+        """替换搜索结果。行会分批插入，第一批立即显示，其余在后续事件循环中插入"""
+        self.song_list = list(songs)
+        self.has_more_results = has_more
+        self.loading_more = False
+        self._rendered_rows = 0
         self.result_table.clear()
-        for row, song in enumerate(songs):
-            self.result_table.add_song(row, row + 1, song.get('title'), song.get('singer'))
+        self._render_next_batch()
+        if self._rendered_rows < len(self.song_list):
+            self._render_timer.start()
+        else:
+            self._render_timer.stop()
+
+    def append_search_results(self, songs, has_more=False):
+        """追加下一页搜索结果（跳过已存在的歌曲）"""
+        known_ids = {song.get('id') for song in self.song_list}
+        new_songs = [song for song in songs if song.get('id') not in known_ids]
+        self.song_list.extend(new_songs)
+        # 接口返回的全是重复歌曲时说明已经没有更多结果
+        self.has_more_results = has_more and bool(new_songs)
+        self.loading_more = False
+        if self._rendered_rows < len(self.song_list):
+            self._render_timer.start()
+        return len(new_songs)
+
+    def _render_next_batch(self):
+        start = self._rendered_rows
+        batch = self.song_list[start:start + self.RENDER_BATCH_SIZE]
+        rows = [(start + offset + 1, song.get('title'), song.get('singer'))
+                for offset, song in enumerate(batch)]
+        self.result_table.add_songs(start, rows)
+        self._rendered_rows = start + len(batch)
+        if self._rendered_rows >= len(self.song_list):
+            self._render_timer.stop()
+            self._check_load_more()
+
+    def _on_results_scrolled(self, value):
+        self._check_load_more()
+
+    def _check_load_more(self):
+        if not self.has_more_results or self.loading_more:
+            return
+        if self._rendered_rows < len(self.song_list):
+            return  # 当前页还没有全部插入
+        # 结果不足一屏时 rowAt 返回 -1，同样继续加载以填满可视区域
+        last_visible_row = self.result_table.rowAt(self.result_table.viewport().height() - 1)
+        if last_visible_row == -1 or last_visible_row >= len(self.song_list) - self.LOAD_MORE_THRESHOLD:
+            self.loading_more = True
+            self.more_results_requested.emit()
+
+    def set_loading_more_failed(self):
+        """加载下一页失败时调用，允许再次滚动触发"""
+        self.loading_more = False
 
     def set_search_controls_enabled(self, enabled):
         self.search_input.setEnabled(enabled)
         self.search_button.setEnabled(enabled)
+        self.live_search_button.setEnabled(enabled)
 
     def get_song_at_row(self, row):
         if 0 <= row < len(self.song_list):
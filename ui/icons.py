@@ -0,0 +1,89 @@
+"""
+图标缓存。
+
+qtawesome.icon() 每次调用都创建新的图标引擎，每次绘制再用字体渲染字形，首次调用还要加载全部图标字体。
+这里按 (名称, 颜色, 边长, 设备像素比) 把图标预先渲染为像素图缓存在内存中，同时保存为 PNG 到应用数据目录的
+icons 文件夹，之后启动时直接读取 PNG，不必加载图标字体。只能在界面线程中（创建 QApplication 之后）使用。
+"""
+from pathlib import Path
+
+from PySide6.QtCore import QSize
+from PySide6.QtGui import QGuiApplication, QIcon, QPixmap
+
+# 按钮和菜单图标的默认边长（像素）
+DEFAULT_SIZE = 16
+# 常用颜色：深色背景上的文字、强调色按钮上的文字、右键菜单
+TEXT_COLOR = '#cdd6f4'
+ON_ACCENT_COLOR = '#1e1e2e'
+MENU_COLOR = '#f0f0f0'
+# 磁盘缓存的格式版本，改变渲染方式（或升级 qtawesome 后图标有变化）时增加
+CACHE_VERSION = 1
+
+_pixmaps = {}  # (名称, 颜色, 边长, 设备像素比) -> QPixmap
+_icons = {}    # 同上 -> QIcon
+_cache_dir = None
+
+
+def default_cache_dir():
+    cache_dir = Path.home() / "AppData" / "Roaming" / "MusicDownloader" / "icons"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+
+def _device_pixel_ratio():
+    app = QGuiApplication.instance()
+    return app.devicePixelRatio() if app is not None else 1.0
+
+
+def _cache_path(name, color, size, ratio):
+    global _cache_dir
+    if _cache_dir is None:
+        try:
+            _cache_dir = default_cache_dir()
+        except OSError as e:
+            print(f"无法创建图标缓存目录: {e}")
+            _cache_dir = False
+    if not _cache_dir:
+        return None
+    file_name = f"v{CACHE_VERSION}_{name.replace('.', '-')}_{color.lstrip('#')}_{size}@{ratio:g}x.png"
+    return _cache_dir / file_name
+
+
+def _render(name, color, size, ratio):
+    # 只在磁盘缓存未命中时才导入 qtawesome（首次调用会加载图标字体）
+    import qtawesome
+    return qtawesome.icon(name, color=color).pixmap(QSize(size, size), ratio)
+
+
+def pixmap(name, color=TEXT_COLOR, size=DEFAULT_SIZE):
+    """返回预先渲染的图标像素图（按当前屏幕的设备像素比渲染，同一参数只渲染一次）
+
+    Args:
+        name: qtawesome 图标名，如 'fa5s.play'
+        color: 图标颜色
+        size: 逻辑边长（像素）
+    """
+    ratio = _device_pixel_ratio()
+    key = (name, color, size, ratio)
+    cached = _pixmaps.get(key)
+    if cached is not None:
+        return cached
+
+    path = _cache_path(name, color, size, ratio)
+    result = QPixmap(str(path)) if path is not None and path.exists() else QPixmap()
+    if result.isNull():
+        result = _render(name, color, size, ratio)
+        if path is not None and not result.save(str(path), 'PNG'):
+            print(f"写入图标缓存失败: {path}")
+    result.setDevicePixelRatio(ratio)
+    _pixmaps[key] = result
+    return result
+
+
+def icon(name, color=TEXT_COLOR, size=DEFAULT_SIZE):
+    """返回由预先渲染的像素图构成的 QIcon（同一参数返回同一个对象）"""
+    key = (name, color, size, _device_pixel_ratio())
+    cached = _icons.get(key)
+    if cached is None:
+        cached = _icons[key] = QIcon(pixmap(name, color, size))
+    return cached
@@ -1,25 +1,66 @@
+import html
 import os
 import random
-import qtawesome
+import threading
+from contextlib import nullcontext
 from pathlib import Path
-from utils.lrc_parser import parse_lrc_line
+from utils.lrc_parser import parse_lrc, find_lyric_line, build_lyrics_html, build_highlighted_lyrics_html
 
 from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                              QFileDialog, QProgressBar, QMessageBox, QStatusBar, QSplitter,
                              QInputDialog, QFrame, QLineEdit, QPushButton)
-from PySide6.QtCore import Qt, QTimer, QPropertyAnimation, QEasingCurve, Property, QUrl
+from PySide6.QtCore import Qt, QTimer, QPropertyAnimation, QEasingCurve, Property, QUrl, QFile, QIODevice
 from PySide6.QtGui import QColor
-from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput, QMediaDevices
 
-from core.downloader import (SingleDownloadThread, BatchDownloadThread, PlaylistImportThread,
-                             SearchThread, SongDetailsThread)
+# 网络/下载相关模块（requests、mutagen 等）和多媒体后端较重，在首次使用时才导入，
+# 窗口显示后在后台线程中预先导入 core.downloader，参见 _preload_backend
+from core import startup
 from core.playlist_manager import PlaylistManager
-from core.api import get_lyric
+from core.playlist_sync import SyncStateStore, apply_sync
+from core.search_cache import SearchCache
+from core.library_index import get_library
+from core.timing import get_recorder
+from core.profiling import StallWatchdog, HEARTBEAT_INTERVAL, DEFAULT_STALL_THRESHOLD
 from core.constants import PlaybackMode, HIGHLIGHT_COLOR, BASE_BG_COLOR, ANIMATION_DURATION
+from ui import icons
 from ui.components.search_widget import SearchWidget
 from ui.components.playlist_widget import PlaylistWidget
 from ui.components.player_controls import PlayerControls
 
+# 窗口图标的边长（任务栏等处由此缩小）
+WINDOW_ICON_SIZE = 64
+# 样式表编译在 ui/resources_rc.py 的Qt资源中，修改 style.qss 后需要重新生成:
+#   pyside6-rcc --compress-algo zlib ui/resources/resources.qrc -o ui/resources_rc.py
+STYLESHEET_RESOURCE = ":/style.qss"
+STYLESHEET_PATH = Path(__file__).parent / "resources" / "style.qss"
+
+
+def load_stylesheet():
+    """读取样式表：优先使用编译的Qt资源，资源模块缺失时读取源文件（与当前工作目录无关）"""
+    try:
+        from ui import resources_rc  # noqa: F401  导入时注册资源
+    except ImportError:
+        pass
+    stylesheet_file = QFile(STYLESHEET_RESOURCE)
+    if stylesheet_file.open(QIODevice.ReadOnly | QIODevice.Text):
+        try:
+            return bytes(stylesheet_file.readAll()).decode('utf-8')
+        finally:
+            stylesheet_file.close()
+    try:
+        return STYLESHEET_PATH.read_text(encoding='utf-8')
+    except OSError:
+        print(f"Warning: Stylesheet '{STYLESHEET_PATH}' not found.")
+        return ""
+
+
+def _preload_backend():
+    """在后台线程中导入下载相关模块，首次搜索或播放时不必在界面线程中等待导入"""
+    try:
+        import core.downloader  # noqa: F401
+    except Exception as e:
+        print(f"预加载下载模块失败: {e}")
+
 class MusicDownloader(QMainWindow):
     VERSION = "2.1.0"
 
@@ -27,27 +68,29 @@ class MusicDownloader(QMainWindow):
         super().__init__()
         self.setWindowTitle(f"音乐下载器 v{self.VERSION}")
         self.setMinimumSize(900, 750)
-        self.setWindowIcon(qtawesome.icon('fa5s.music', color='#cdd6f4'))
+        self.setWindowIcon(icons.icon('fa5s.music', size=WINDOW_ICON_SIZE))
 
         # Load Stylesheet
-        try:
-            with open("ui/resources/style.qss", "r") as f:
-                self.setStyleSheet(f.read())
-        except FileNotFoundError:
-            print("Warning: Stylesheet 'ui/resources/style.qss' not found.")
+        self.setStyleSheet(load_stylesheet())
+        startup.mark('stylesheet')
 
         self.init_components()
+        startup.mark('init_components')
         self.init_player()
         self.init_state()
         self.setup_ui()
+        startup.mark('setup_ui')
         self.connect_signals()
         self.initialize_data()
+        startup.mark('initialize_data')
 
     def init_components(self):
         from core.config_manager import ConfigManager
 
         self.config_manager = ConfigManager()
         self.playlist_manager = PlaylistManager()
+        self.sync_state = SyncStateStore()
+        self.library = get_library()
 
         # 从配置读取下载目录
         saved_dir = self.config_manager.get_last_download_dir()
@@ -55,6 +98,26 @@ class MusicDownloader(QMainWindow):
 
         self.active_threads = set()
 
+        # 最近搜索结果缓存，用于实时搜索的即时联想
+        self.search_cache = SearchCache()
+
+        # 请求代数：只有最新一次搜索/详情请求的结果会被应用
+        self._search_generation = 0
+        self._search_thread = None
+        self._search_query = None
+        self._search_page = 1
+        self._details_generation = 0
+        self._details_thread = None
+        self._cover_generation = 0
+        self._cover_thread = None
+        self._lyrics_generation = 0
+        self._lyrics_thread = None
+        self.diagnostics_dialog = None
+        self.metrics_server = None
+        self.metrics_exporter = None
+        self._backend_configured = False
+        self._first_show_done = False
+
     def _register_thread(self, thread):
         """统一的线程注册和清理管理"""
         def cleanup_thread():
@@ -65,7 +128,27 @@ class MusicDownloader(QMainWindow):
         self.active_threads.add(thread)
         return thread
 
+    def _cancel_thread(self, thread):
+        """取消已被新请求取代的后台线程"""
+        if thread is None:
+            return
+        try:
+            if thread.isRunning():
+                thread.cancel()
+        except RuntimeError:
+            pass  # 线程已结束，底层C++对象已通过deleteLater释放
+
     def init_player(self):
+        # 播放器和音频输出在首次播放时才创建（初始化多媒体后端较慢），参见 _ensure_player
+        self.player = None
+        self.audio_output = None
+        self.volume_animation = None
+
+    def _ensure_player(self):
+        if self.player is not None:
+            return
+        from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput, QMediaDevices
+
         self.player = QMediaPlayer()
         self.audio_output = QAudioOutput()
         self.player.setAudioOutput(self.audio_output)
@@ -82,8 +165,15 @@ class MusicDownloader(QMainWindow):
         self._device_check_timer.timeout.connect(self._check_audio_device_change)
         self._device_check_timer.start(2000)  # 每2秒检查一次
 
+        self.player.playbackStateChanged.connect(self.update_on_playback_state_change)
+        self.player.positionChanged.connect(self.player_controls.update_position)
+        self.player.durationChanged.connect(self.player_controls.update_duration)
+        self.player.mediaStatusChanged.connect(self.handle_media_status_changed)
+        self.player.errorOccurred.connect(self.handle_player_error)
+
     def _check_audio_device_change(self):
         """定期检查默认音频输出设备是否变化"""
+        from PySide6.QtMultimedia import QMediaDevices
         try:
             current_device = QMediaDevices.defaultAudioOutput()
             if current_device and self._current_audio_device:
@@ -97,6 +187,7 @@ class MusicDownloader(QMainWindow):
 
     def _on_audio_device_changed(self, new_device):
         """处理音频输出设备变化，确保音频输出到正确的设备"""
+        from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput
         try:
             # 保存当前状态
             current_volume = self.audio_output.volume()
@@ -158,6 +249,14 @@ class MusicDownloader(QMainWindow):
         self.lyric_timer.setInterval(250)  # 降低刷新频率从100ms到250ms
         self.lyric_timer.timeout.connect(self.update_lyrics_display)
 
+        # 界面卡顿检测：心跳定时器超过阈值没有触发时记录界面线程的调用栈（stall_threshold_ms 为 0 时关闭）
+        threshold_ms = self.config_manager.get('stall_threshold_ms', DEFAULT_STALL_THRESHOLD * 1000)
+        self.watchdog = StallWatchdog(threshold=threshold_ms / 1000) if threshold_ms else None
+        self.heartbeat_timer = QTimer(self)
+        self.heartbeat_timer.setInterval(int(HEARTBEAT_INTERVAL * 1000))
+        if self.watchdog is not None:
+            self.heartbeat_timer.timeout.connect(self.watchdog.beat)
+
     def setup_ui(self):
         main_widget = QWidget()
         main_layout = QVBoxLayout(main_widget)
@@ -217,14 +316,26 @@ class MusicDownloader(QMainWindow):
         self.path_display = QLineEdit(str(self.download_dir))
         self.path_display.setReadOnly(True)
         
-        browse_button = QPushButton(qtawesome.icon('fa5s.folder-open', color='#1e1e2e'), "")
+        browse_button = QPushButton(icons.icon('fa5s.folder-open', icons.ON_ACCENT_COLOR), "")
         browse_button.setToolTip("选择下载目录")
         browse_button.clicked.connect(self.browse_download_path)
         browse_button.setMaximumWidth(50)
         
+        self.scan_button = QPushButton(icons.icon('fa5s.search-location', icons.ON_ACCENT_COLOR), "")
+        self.scan_button.setToolTip("扫描下载目录中已有的歌曲")
+        self.scan_button.clicked.connect(self.scan_download_dir)
+        self.scan_button.setMaximumWidth(50)
+        
+        diagnostics_button = QPushButton(icons.icon('fa5s.stopwatch', icons.ON_ACCENT_COLOR), "")
+        diagnostics_button.setToolTip("查看搜索和下载各阶段的耗时")
+        diagnostics_button.clicked.connect(self.show_diagnostics)
+        diagnostics_button.setMaximumWidth(50)
+        
         path_layout.addWidget(path_label)
         path_layout.addWidget(self.path_display)
         path_layout.addWidget(browse_button)
+        path_layout.addWidget(self.scan_button)
+        path_layout.addWidget(diagnostics_button)
         download_layout.addLayout(path_layout)
         
         # 下载进度条
@@ -244,13 +355,7 @@ class MusicDownloader(QMainWindow):
         main_layout.addWidget(download_area)
 
     def connect_signals(self):
-        # Player connections
-        self.player.playbackStateChanged.connect(self.update_on_playback_state_change)
-        self.player.positionChanged.connect(self.player_controls.update_position)
-        self.player.durationChanged.connect(self.player_controls.update_duration)
-        self.player.mediaStatusChanged.connect(self.handle_media_status_changed)
-        self.player.errorOccurred.connect(self.handle_player_error)
-
+        # 播放器本身的信号在 _ensure_player 中连接
         # Player controls connections
         self.player_controls.play_pause_clicked.connect(self.toggle_play_pause)
         self.player_controls.previous_clicked.connect(self.play_previous)
@@ -264,6 +369,10 @@ class MusicDownloader(QMainWindow):
 
         # Search widget connections
         self.search_widget.search_requested.connect(self.run_search)
+        self.search_widget.live_search_requested.connect(self.run_live_search)
+        self.search_widget.query_edited.connect(self.show_search_suggestions)
+        self.search_widget.live_search_toggled.connect(self._on_live_search_toggled)
+        self.search_widget.more_results_requested.connect(self.load_more_search_results)
         self.search_widget.song_preview_requested.connect(self.preview_song)
         self.search_widget.song_download_requested.connect(self.download_song)
         self.search_widget.song_add_to_playlist_requested.connect(self.add_song_to_playlist)
@@ -275,6 +384,7 @@ class MusicDownloader(QMainWindow):
         self.playlist_widget.playlist_renamed.connect(self._on_playlist_renamed)
         self.playlist_widget.playlist_played.connect(self.play_playlist)
         self.playlist_widget.playlist_downloaded.connect(self.download_playlist)
+        self.playlist_widget.playlist_synced.connect(self.sync_playlist)
         self.playlist_widget.song_preview_requested.connect(self.preview_playlist_song)
         self.playlist_widget.song_download_requested.connect(self.download_song)
         self.playlist_widget.song_removed_from_playlist.connect(self.remove_song_from_playlist)
@@ -284,12 +394,69 @@ class MusicDownloader(QMainWindow):
         self.search_widget.set_playlist_manager(self.playlist_manager)
         self.playlist_widget.set_playlist_manager(self.playlist_manager)
         self.update_playlist_list()
-        self.update_playlist_songs_table()
+        # 当前播放列表的歌曲在窗口首次显示后再填充，参见 showEvent
         self.player_controls.update_playback_mode_button()
 
         # 设置初始音质
         self.player_controls.set_quality(self.current_quality)
 
+        self.search_widget.set_live_search_enabled(self.config_manager.get('live_search', False))
+
+        # 配置了耗时日志时，每条阶段耗时记录都追加到该 JSONL 文件
+        timing_log = self.config_manager.get('timing_log')
+        if timing_log:
+            try:
+                get_recorder().open_log(timing_log)
+            except OSError as e:
+                print(f"无法打开耗时日志 {timing_log}: {e}")
+
+        # 可选的 Prometheus 格式运行指标（未配置时不收集）
+        metrics_port = self.config_manager.get('metrics_port')
+        metrics_textfile = self.config_manager.get('metrics_textfile')
+        if metrics_port or metrics_textfile:
+            from core import metrics
+        if metrics_port:
+            try:
+                self.metrics_server = metrics.start_http_server(int(metrics_port))
+            except (OSError, ValueError) as e:
+                print(f"无法在端口 {metrics_port} 提供运行指标: {e}")
+        if metrics_textfile:
+            self.metrics_exporter = metrics.TextfileExporter(metrics_textfile).start()
+
+        if self.watchdog is not None:
+            self.watchdog.start()
+            self.heartbeat_timer.start()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self._first_show_done:
+            self._first_show_done = True
+            # 等首次绘制完成后再进行延后的初始化
+            QTimer.singleShot(0, self._finish_startup)
+
+    def _finish_startup(self):
+        startup.mark('first_paint')
+        self.update_playlist_songs_table()
+        startup.mark('load_playlist')
+        threading.Thread(target=_preload_backend, name='preload-backend', daemon=True).start()
+        startup.finish()
+
+    def _downloader(self):
+        """按需导入 core.downloader，首次调用时应用下载相关的配置"""
+        import core.downloader as downloader
+        if not self._backend_configured:
+            self._backend_configured = True
+            from core.api import get_negotiator
+            from core.cover_cache import get_cover_cache
+
+            # 下载时请求音质不可用则按配置的音质阶梯降级
+            ladder = self.config_manager.get('quality_ladder')
+            if ladder:
+                get_negotiator().set_ladder(ladder)
+            get_cover_cache().configure(max_dimension=self.config_manager.get('cover_max_dimension'),
+                                        quality=self.config_manager.get('cover_quality'))
+        return downloader
+
     def _on_playback_mode_changed(self):
         self.playback_mode = self.player_controls.playback_mode
         self.status_bar.showMessage(f"播放模式: {PlaybackMode.ICONS[self.playback_mode][1]}", 2000)
@@ -316,6 +483,7 @@ class MusicDownloader(QMainWindow):
         if not self.playlist_manager.delete(name):
             QMessageBox.warning(self, "错误", "无法删除最后一个播放列表。")
         else:
+            self.sync_state.remove(name)
             if self.current_playlist_name == name:
                 self.current_playlist_name = self.playlist_manager.get_playlist_names()[0]
             self.update_playlist_list()
@@ -325,30 +493,94 @@ class MusicDownloader(QMainWindow):
         if not self.playlist_manager.rename(old_name, new_name):
             QMessageBox.warning(self, "错误", "新名称已存在或无效。")
         else:
+            self.sync_state.rename(old_name, new_name)
             self.current_playlist_name = new_name
             self.update_playlist_list()
 
     def set_search_controls_enabled(self, enabled):
         self.search_widget.set_search_controls_enabled(enabled)
 
-    def run_search(self, query):
-        if query.isdigit():
-            self.import_playlist(query)
+    def run_search(self, query, live=False, page=1):
+        from core.fetch_playlist import parse_playlist_ids
+        if parse_playlist_ids(query):
+            # 歌单ID只在按下搜索时导入，实时搜索不应在输入过程中弹出导入对话框
+            if not live:
+                self.import_playlist(query)
             return
         
-        self.set_search_controls_enabled(False)
-        self.status_bar.showMessage("正在搜索...")
-        search_thread = SearchThread(query)
+        self._cancel_thread(self._search_thread)
+        self._search_generation += 1
+        generation = self._search_generation
+        self._search_query = query
+        self._search_page = page
+
+        # 实时搜索和加载下一页时保持输入框可用，否则会打断用户输入
+        if not live:
+            self.set_search_controls_enabled(False)
+        self.status_bar.showMessage("正在搜索..." if page == 1 else f"正在加载第 {page} 页...")
+        search_thread = self._downloader().SearchThread(query, page=page, generation=generation)
         search_thread.finished_signal.connect(self.handle_search_finished)
         search_thread.status_signal.connect(self.status_bar.showMessage)
-        search_thread.finished.connect(lambda: self.set_search_controls_enabled(True))
+        search_thread.finished.connect(lambda: self._on_search_thread_finished(generation))
         
         self._register_thread(search_thread)
+        self._search_thread = search_thread
         search_thread.start()
 
-    def handle_search_finished(self, songs):
-        self.search_widget.update_search_results(songs)
-        self.status_bar.showMessage(f"找到 {len(songs)} 首歌曲")
+    def run_live_search(self, query):
+        """输入停顿后的实时搜索：命中缓存时直接展示，否则发起一次网络搜索"""
+        cached = self.search_cache.get(query)
+        if cached is not None:
+            # 使之前仍在进行的搜索失效
+            self._cancel_thread(self._search_thread)
+            self._search_generation += 1
+            self._search_query = query
+            # 与网络搜索一样从第 1 页开始翻页，否则会沿用上一次搜索的页码
+            self._search_page = 1
+            self.search_widget.update_search_results(cached, has_more=bool(cached))
+            self.status_bar.showMessage(f"找到 {len(cached)} 首歌曲（缓存）")
+            return
+        self.run_search(query, live=True)
+
+    def show_search_suggestions(self, query):
+        """输入过程中立即展示本地联想结果（缓存的搜索结果 + 播放列表中的歌曲）"""
+        local_songs = [self.playlist_manager.get_playlist_songs(name)[index]
+                       for name, index in self.playlist_manager.search(query, limit=50)]
+        suggestions = self.search_cache.suggest(query, local_songs)
+        if suggestions:
+            self.search_widget.update_search_results(suggestions)
+            self.status_bar.showMessage(f"本地匹配 {len(suggestions)} 首歌曲，正在搜索...")
+
+    def _on_live_search_toggled(self, enabled):
+        self.config_manager.set('live_search', enabled)
+        self.status_bar.showMessage("实时搜索已开启" if enabled else "实时搜索已关闭", 2000)
+
+    def _on_search_thread_finished(self, generation):
+        if generation == self._search_generation:
+            self._search_thread = None
+            self.set_search_controls_enabled(True)
+
+    def load_more_search_results(self):
+        """结果列表滚动到底部时加载下一页"""
+        if not self._search_query:
+            self.search_widget.set_loading_more_failed()
+            return
+        self.run_search(self._search_query, live=True, page=self._search_page + 1)
+
+    def handle_search_finished(self, songs, generation):
+        if generation != self._search_generation:
+            return  # 已被更新的搜索取代
+        if self._search_page == 1:
+            with self.stall_context("显示搜索结果"):
+                self.search_widget.update_search_results(songs, has_more=bool(songs))
+            self.status_bar.showMessage(f"找到 {len(songs)} 首歌曲")
+        else:
+            with self.stall_context("加载更多搜索结果"):
+                added = self.search_widget.append_search_results(songs, has_more=bool(songs))
+            total = len(self.search_widget.song_list)
+            self.status_bar.showMessage(f"找到 {total} 首歌曲" + ("" if added else "（没有更多结果）"))
+        if songs:
+            self.search_cache.put(self._search_query, self.search_widget.song_list)
 
     def update_playlist_list(self):
         names = self.playlist_manager.get_playlist_names()
@@ -364,8 +596,9 @@ class MusicDownloader(QMainWindow):
     def update_playlist_songs_table(self):
         if not self.current_playlist_name:
             return
-        songs = self.playlist_manager.get_playlist_songs(self.current_playlist_name)
-        self.playlist_widget.update_songs_table(songs)
+        with self.stall_context(f"加载播放列表 '{self.current_playlist_name}'"):
+            songs = self.playlist_manager.get_playlist_songs(self.current_playlist_name)
+            self.playlist_widget.update_songs_table(songs)
 
     def select_playlist(self, playlist_name):
         self.current_playlist_name = playlist_name
@@ -402,61 +635,110 @@ class MusicDownloader(QMainWindow):
             self.play_song(song_info, table, row)
 
     def play_song(self, song_info, table, row):
+        # 取消仍在进行的上一次详情请求，避免连续双击时播放源反复切换
+        self._cancel_thread(self._details_thread)
+        self._details_thread = None
+        self._details_generation += 1
+
+        # 已下载的歌曲直接播放本地文件，不需要请求播放地址，离线时也能播放
+        local_path = self.library.lookup(song_info)
+        if local_path:
+            self._start_playback(QUrl.fromLocalFile(local_path), song_info, table, row,
+                                 {'id': song_info.get('id')}, local_path=local_path)
+            return
+
         self.status_bar.showMessage(f"正在获取 {song_info['title']} 的播放地址...", 2000)
 
         # 传递当前音质设置
-        details_thread = SongDetailsThread(song_info, table, row, quality=self.current_quality)
+        details_thread = self._downloader().SongDetailsThread(song_info, table, row, quality=self.current_quality,
+                                                              generation=self._details_generation)
         details_thread.finished_signal.connect(self.handle_song_details_finished)
         details_thread.status_signal.connect(self.status_bar.showMessage)
 
         self._register_thread(details_thread)
+        self._details_thread = details_thread
         details_thread.start()
 
-    def handle_song_details_finished(self, details, song_info, table, row):
-        if details and 'url' in details and details['url']:
-            self.player.setSource(QUrl(details['url']))
-            self.fade_in_and_play()
-            
-            self.currently_playing_song_info = song_info
-            self.status_bar.showMessage(f"正在播放: {song_info['title']}")
-            self.set_playing_indicator(table, row, animated=True)
-            
-            # 更新正在播放信息
-            artist_info = song_info.get('singer', '未知歌手')
-            self.player_controls.update_now_playing(f"{song_info['title']} - {artist_info}")
+    def handle_song_details_finished(self, details, song_info, table, row, generation):
+        if generation != self._details_generation:
+            return  # 已被更新的播放请求取代
+        self._details_thread = None
 
-            # 歌词处理
-            self._handle_lyrics(details)
+        if details and 'url' in details and details['url']:
+            self._start_playback(QUrl(details['url']), song_info, table, row, details)
         else:
             self.status_bar.showMessage("无法获取播放地址", 3000)
             self.clear_playing_indicator()
             self.player_controls.update_now_playing("无播放内容")
             self.lyric_timer.stop()
+            self._cancel_thread(self._lyrics_thread)
+            self._lyrics_generation += 1
             self.player_controls.set_lyrics_button_enabled(False)
 
-    def _handle_lyrics(self, details):
+    def _start_playback(self, source, song_info, table, row, details, local_path=None):
+        self._ensure_player()
+        self.player.setSource(source)
+        self.fade_in_and_play()
+
+        self.currently_playing_song_info = song_info
+        if local_path:
+            self.status_bar.showMessage(f"正在播放: {song_info['title']}（本地文件）")
+        else:
+            self.status_bar.showMessage(f"正在播放: {song_info['title']}")
+        self.set_playing_indicator(table, row, animated=True)
+
+        # 更新正在播放信息
+        artist_info = song_info.get('singer', '未知歌手')
+        self.player_controls.update_now_playing(f"{song_info['title']} - {artist_info}")
+
+        # 歌词处理
+        self._handle_lyrics(details, local_path)
+        self._load_cover(local_path or details.get('cover'), local=bool(local_path))
+
+    def _load_cover(self, source, local=False):
+        """在后台获取正在播放歌曲的封面缩略图"""
+        self._cancel_thread(self._cover_thread)
+        self._cover_generation += 1
+        self.player_controls.set_cover(None)
+        if not source:
+            self._cover_thread = None
+            return
+        cover_thread = self._downloader().CoverThread(source, local=local, generation=self._cover_generation)
+        cover_thread.finished_signal.connect(self.handle_cover_loaded)
+        self._register_thread(cover_thread)
+        self._cover_thread = cover_thread
+        cover_thread.start()
+
+    def handle_cover_loaded(self, data, generation):
+        if generation != self._cover_generation:
+            return  # 已切换到其他歌曲
+        self._cover_thread = None
+        self.player_controls.set_cover(data)
+
+    def _handle_lyrics(self, details, local_path=None):
         self.lyric_timer.stop()
         self.current_lyrics.clear()
         self.current_lyric_line = -1
         self.lyrics_html_cache = ""  # 清空歌词HTML缓存
 
-        # 新API需要单独请求歌词
+        # 本地文件优先使用嵌入的歌词，没有时与在线播放一样单独请求歌词（都在后台线程中进行）
+        self._cancel_thread(self._lyrics_thread)
+        self._lyrics_generation += 1
+        self.playlist_widget.update_lyrics("<center>正在加载歌词...</center>")
         song_id = details.get('songID') or details.get('id')
-        lyric_text = None
+        lyrics_thread = self._downloader().LyricsThread(song_id, local_path, generation=self._lyrics_generation)
+        lyrics_thread.finished_signal.connect(self.handle_lyrics_loaded)
+        self._register_thread(lyrics_thread)
+        self._lyrics_thread = lyrics_thread
+        lyrics_thread.start()
 
-        if song_id:
-            try:
-                lyric_data = get_lyric(song_id)
-                if lyric_data and lyric_data.get('lrc'):
-                    lyric_text = lyric_data['lrc']
-            except Exception as e:
-                print(f"获取歌词失败: {e}")
+    def handle_lyrics_loaded(self, lyric_text, from_local, generation):
+        if generation != self._lyrics_generation:
+            return  # 已切换到其他歌曲
+        self._lyrics_thread = None
 
         if lyric_text:
-            for line in lyric_text.strip().split('\n'):
-                parsed = parse_lrc_line(line)
-                if parsed and parsed[1]:
-                    self.current_lyrics.append({'time': parsed[0], 'text': parsed[1]})
+            self.current_lyrics = parse_lrc(lyric_text)
 
             if self.current_lyrics:
                 # 使用新的缓存构建方法
@@ -464,6 +746,11 @@ class MusicDownloader(QMainWindow):
                 self.playlist_widget.update_lyrics(self.lyrics_html_cache)
                 self.lyric_timer.start()
                 self.player_controls.set_lyrics_button_enabled(True)
+            elif from_local:
+                # 嵌入的歌词不带时间轴时按原文显示（标签中的文本需要转义）
+                lines = (html.escape(line) for line in lyric_text.strip().splitlines())
+                self.playlist_widget.update_lyrics(f"<center>{'<br>'.join(lines)}</center>")
+                self.player_controls.set_lyrics_button_enabled(True)
             else:
                 self.playlist_widget.update_lyrics("<center>无歌词或歌词格式不正确</center>")
                 self.player_controls.set_lyrics_button_enabled(True)
@@ -472,6 +759,7 @@ class MusicDownloader(QMainWindow):
             self.player_controls.set_lyrics_button_enabled(True)
 
     def update_on_playback_state_change(self, state):
+        from PySide6.QtMultimedia import QMediaPlayer
         is_playing = state == QMediaPlayer.PlayingState
         self.player_controls.update_play_pause_button(is_playing)
 
@@ -529,10 +817,51 @@ class MusicDownloader(QMainWindow):
             self.download_dir = Path(dir_path)  # 保持Path类型
             self.path_display.setText(dir_path)
 
+    def stall_context(self, action):
+        """卡顿报告中附带的当前操作（未启用卡顿检测时不做任何事）"""
+        if self.watchdog is None:
+            return nullcontext()
+        return self.watchdog.action(action)
+
+    def show_diagnostics(self):
+        from ui.components.diagnostics_dialog import DiagnosticsDialog
+        if self.diagnostics_dialog is None:
+            self.diagnostics_dialog = DiagnosticsDialog(self, watchdog=self.watchdog)
+        self.diagnostics_dialog.show()
+        self.diagnostics_dialog.raise_()
+
+    def scan_download_dir(self):
+        if not self.download_dir.is_dir():
+            self.status_bar.showMessage("下载目录不存在", 3000)
+            return
+        self.scan_button.setEnabled(False)
+        self.progress_bar.setValue(0)
+        scan_thread = self._downloader().LibraryScanThread(str(self.download_dir))
+        scan_thread.status_signal.connect(self.status_bar.showMessage)
+        scan_thread.progress_signal.connect(self.update_import_progress)
+        scan_thread.finished_signal.connect(self.handle_scan_finished)
+        scan_thread.finished.connect(lambda: (
+            self.scan_button.setEnabled(True),
+            self.progress_bar.setValue(0)
+        ))
+        self._register_thread(scan_thread)
+        scan_thread.start()
+
+    def handle_scan_finished(self, success, stats):
+        if not success:
+            self.status_bar.showMessage("扫描下载目录失败", 3000)
+            return
+        message = (f"扫描完成：读取 {stats['scanned']} 个文件，未变化 {stats['unchanged']}，"
+                   f"移除 {stats['removed']}")
+        if stats['failed']:
+            message += f"，{stats['failed']} 个文件无法读取标签"
+        self.status_bar.showMessage(message, 5000)
+
     def download_song(self, song_info):
         self.progress_bar.setValue(0)
         # 传递当前音质设置
-        download_thread = SingleDownloadThread(song_info, self.download_dir, quality=self.current_quality)
+        download_thread = self._downloader().SingleDownloadThread(song_info, self.download_dir,
+                                                                  quality=self.current_quality)
         download_thread.progress_signal.connect(self.progress_bar.setValue)
         download_thread.status_signal.connect(self.status_bar.showMessage)
         download_thread.finished_signal.connect(
@@ -556,8 +885,15 @@ class MusicDownloader(QMainWindow):
         if reply == QMessageBox.No:
             return
 
+        self._start_batch_download(songs)
+
+    def _start_batch_download(self, songs):
+        if self.config_manager.get('use_download_daemon', False) and self._submit_to_daemon(songs):
+            return
+
         # 传递当前音质设置
-        batch_download_thread = BatchDownloadThread(songs, self.download_dir, quality=self.current_quality)
+        batch_download_thread = self._downloader().BatchDownloadThread(songs, self.download_dir,
+                                                                       quality=self.current_quality)
         batch_download_thread.batch_progress_signal.connect(self.update_batch_progress)
         batch_download_thread.status_signal.connect(self.status_bar.showMessage)
         batch_download_thread.batch_finished_signal.connect(self.handle_batch_finish)
@@ -565,6 +901,17 @@ class MusicDownloader(QMainWindow):
         self._register_thread(batch_download_thread)
         batch_download_thread.start()
 
+    def _submit_to_daemon(self, songs):
+        """将批量下载交给常驻下载守护进程，守护进程不可用时返回False"""
+        from core.daemon import DaemonClient
+        try:
+            ids = DaemonClient(timeout=1).submit(songs, self.download_dir, self.current_quality)
+        except Exception as e:
+            print(f"提交到下载守护进程失败，改为在本进程下载: {e}")
+            return False
+        self.status_bar.showMessage(f"已将 {len(ids)} 首歌曲提交到下载守护进程。", 5000)
+        return True
+
     def handle_batch_finish(self, success, message):
         self.progress_bar.setRange(0, 100)
         self.progress_bar.setValue(0)
@@ -586,23 +933,27 @@ class MusicDownloader(QMainWindow):
 
     def closeEvent(self, event):
         """优雅关闭程序，确保所有线程安全结束"""
-        # 保存播放列表数据
-        self.playlist_manager.save()
+        # 立即写入尚未落盘的播放列表和配置
+        self.playlist_manager.flush()
+        self.config_manager.flush()
         
         # 停止播放器和相关定时器
-        self.player.stop()
+        if self.player is not None:
+            self.player.stop()
         if hasattr(self, 'lyric_timer'):
             self.lyric_timer.stop()
-        if hasattr(self, 'volume_animation'):
+        if self.volume_animation is not None:
             self.volume_animation.stop()
         
         # 等待所有活跃线程完成
         if self.active_threads:
             self.status_bar.showMessage("正在等待后台任务完成...")
             
-            # 请求所有线程中断（如果支持的话）
+            # 请求所有线程中断（可取消的线程同时中止进行中的HTTP请求）
             for thread in list(self.active_threads):
-                if hasattr(thread, 'requestInterruption'):
+                if hasattr(thread, 'cancel'):
+                    thread.cancel()
+                elif hasattr(thread, 'requestInterruption'):
                     thread.requestInterruption()
             
             # 等待线程完成，最多等待5秒
@@ -616,11 +967,20 @@ class MusicDownloader(QMainWindow):
         # 停止音频设备检查定时器
         if hasattr(self, '_device_check_timer'):
             self._device_check_timer.stop()
+
+        self.heartbeat_timer.stop()
+        if self.watchdog is not None:
+            self.watchdog.stop()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.stop()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
         
         super().closeEvent(event)
 
     # Player control methods
     def fade_in_and_play(self):
+        from PySide6.QtMultimedia import QMediaPlayer
         self.volume_animation.stop()
         target_volume = self.player_controls.volume_slider.value() / 100.0
 
@@ -652,9 +1012,11 @@ class MusicDownloader(QMainWindow):
         self.volume_animation.start()
 
     def toggle_play_pause(self):
-        if self.player.playbackState() == QMediaPlayer.PlayingState:
+        from PySide6.QtMultimedia import QMediaPlayer
+        state = self.player.playbackState() if self.player is not None else QMediaPlayer.StoppedState
+        if state == QMediaPlayer.PlayingState:
             self.fade_out_and_pause()
-        elif self.player.playbackState() == QMediaPlayer.PausedState:
+        elif state == QMediaPlayer.PausedState:
             self.fade_in_and_play()
         elif self.currently_playing_song_info:
             if self.is_playing_from_playlist and self.current_playing_row != -1:
@@ -704,6 +1066,7 @@ class MusicDownloader(QMainWindow):
         self.preview_playlist_song(prev_row)
 
     def handle_media_status_changed(self, status):
+        from PySide6.QtMultimedia import QMediaPlayer
         if status == QMediaPlayer.MediaStatus.EndOfMedia:
             if self.playback_mode == PlaybackMode.SINGLE_LOOP:
                 self.player.setPosition(0)
@@ -719,6 +1082,7 @@ class MusicDownloader(QMainWindow):
 
     def handle_player_error(self, error, error_string):
         """处理播放器错误，提供用户友好的错误信息"""
+        from PySide6.QtMultimedia import QMediaPlayer
         error_messages = {
             QMediaPlayer.NoError: "无错误",
             QMediaPlayer.ResourceError: "媒体资源错误：可能是网络问题或文件损坏",
@@ -743,9 +1107,12 @@ class MusicDownloader(QMainWindow):
         print(f"播放器错误: {error} - {error_string}")
 
     def seek_playback(self, position):
-        self.player.setPosition(position)
+        if self.player is not None:
+            self.player.setPosition(position)
 
     def change_volume(self, value):
+        if self.player is None:
+            return  # 播放器创建后以滑块的值作为淡入的目标音量
         target_volume = value / 100.0
 
         if (self.volume_animation.duration() == 400 and 
@@ -761,7 +1128,8 @@ class MusicDownloader(QMainWindow):
             self.audio_output.setVolume(target_volume)
     
     def restore_volume_animation_duration(self):
-        self.volume_animation.setDuration(400)
+        if self.volume_animation is not None:
+            self.volume_animation.setDuration(400)
 
     def import_playlist(self, playlist_id):
         playlist_names = self.playlist_manager.get_playlist_names()
@@ -798,10 +1166,15 @@ class MusicDownloader(QMainWindow):
         
         existing_songs = self.playlist_manager.get_playlist_songs(target_playlist_name)
         
-        import_thread = PlaylistImportThread(playlist_id, target_playlist_name, existing_songs)
+        import_thread = self._downloader().PlaylistImportThread(playlist_id, target_playlist_name, existing_songs)
         import_thread.status_signal.connect(self.status_bar.showMessage)
         import_thread.progress_signal.connect(self.update_import_progress)
-        import_thread.finished_signal.connect(self.handle_import_finished)
+        # 只有单个歌单的导入才记为该播放列表的同步来源
+        from core.fetch_playlist import parse_playlist_ids
+        playlist_ids = parse_playlist_ids(playlist_id) or []
+        source_id = playlist_ids[0] if len(playlist_ids) == 1 else None
+        import_thread.finished_signal.connect(
+            lambda success, name, songs: self.handle_import_finished(success, name, songs, source_id))
         import_thread.finished.connect(lambda: (
             self.set_search_controls_enabled(True),
             self.progress_bar.setValue(0)
@@ -814,19 +1187,24 @@ class MusicDownloader(QMainWindow):
         percentage = int((current / total) * 100) if total > 0 else 0
         self.progress_bar.setValue(percentage)
 
-    def handle_import_finished(self, success, playlist_name, matched_songs):
+    def handle_import_finished(self, success, playlist_name, matched_songs, source_id=None):
         if not success:
             QMessageBox.warning(self, "导入失败", "无法导入歌单，请检查歌单ID是否正确或网络连接。")
             return
+
+        # 记住来源歌单，之后可以通过"同步歌单"增量更新
+        if source_id and not self.sync_state.get_source_id(playlist_name):
+            self.sync_state.remember_source(playlist_name, source_id)
         
         if not matched_songs:
             QMessageBox.information(self, "导入提示", "没有新的歌曲被添加到歌单。")
             return
         
         added_count = 0
-        for song in matched_songs:
-            if self.playlist_manager.add_song(playlist_name, song):
-                added_count += 1
+        with self.stall_context(f"添加导入的 {len(matched_songs)} 首歌曲"):
+            for song in matched_songs:
+                if self.playlist_manager.add_song(playlist_name, song):
+                    added_count += 1
         
         self.current_playlist_name = playlist_name
         self.update_playlist_list()
@@ -836,6 +1214,43 @@ class MusicDownloader(QMainWindow):
                               f"成功添加 {added_count} 首新歌曲到歌单 '{playlist_name}'。")
         self.progress_bar.setValue(0)
 
+    def sync_playlist(self, playlist_name):
+        source_id = self.sync_state.get_source_id(playlist_name)
+        source_id, ok = QInputDialog.getText(self, "同步歌单", f"'{playlist_name}' 的QQ音乐歌单ID:",
+                                             text=source_id or "")
+        source_id = source_id.strip()
+        if not ok or not source_id:
+            return
+        if not source_id.isdigit():
+            QMessageBox.warning(self, "无效ID", "歌单ID应为数字。")
+            return
+
+        self.status_bar.showMessage(f"正在同步 '{playlist_name}'...")
+        sync_thread = self._downloader().PlaylistSyncThread(playlist_name, source_id,
+                                         self.playlist_manager.get_playlist_songs(playlist_name),
+                                         self.sync_state.get(playlist_name))
+        sync_thread.status_signal.connect(self.status_bar.showMessage)
+        sync_thread.finished_signal.connect(self.handle_sync_finished)
+        self._register_thread(sync_thread)
+        sync_thread.start()
+
+    def handle_sync_finished(self, success, playlist_name, plan):
+        if not success:
+            QMessageBox.warning(self, "同步失败", "无法获取歌单，请检查歌单ID是否正确或网络连接。")
+            return
+        if playlist_name not in self.playlist_manager.get_playlist_names():
+            return  # 同步期间播放列表已被删除
+
+        with self.stall_context(f"应用 '{playlist_name}' 的同步结果"):
+            changed = apply_sync(self.playlist_manager, playlist_name, plan)
+        self.sync_state.update(playlist_name, plan)
+        if changed and self.current_playlist_name == playlist_name:
+            self.update_playlist_songs_table()
+        self.status_bar.showMessage(f"'{playlist_name}' 同步完成：{plan.summary()}", 5000)
+
+        if plan.added and self.config_manager.get('sync_auto_download', False):
+            self._start_batch_download(plan.added)
+
     def play_playlist(self, playlist_name):
         if self.current_playlist_name != playlist_name:
             self.select_playlist(playlist_name)
@@ -869,75 +1284,23 @@ class MusicDownloader(QMainWindow):
 
     def _find_current_lyric_line(self, position):
         """使用二分查找快速定位当前歌词行"""
-        if not self.current_lyrics:
-            return -1
-            
-        left, right = 0, len(self.current_lyrics) - 1
-        result = -1
-        
-        while left <= right:
-            mid = (left + right) // 2
-            if self.current_lyrics[mid]['time'] <= position:
-                result = mid
-                left = mid + 1
-            else:
-                right = mid - 1
-        
-        return result
+        return find_lyric_line(self.current_lyrics, position)
 
     def _build_lyrics_html(self):
         """构建完整的歌词HTML，只在歌曲切换时调用"""
-        if not self.current_lyrics:
-            return ""
-            
-        html = []
-        for i, line in enumerate(self.current_lyrics):
-            text = line['text']
-            html.append(f'<p id="lyric-{i}">{text}</p>')
-        
-        self.lyrics_html_cache = f"<center>{''.join(html)}</center>"
+        self.lyrics_html_cache = build_lyrics_html(self.current_lyrics)
         return self.lyrics_html_cache
 
     def _update_lyrics_highlight(self):
-        """仅更新高亮显示，避免重建整个HTML"""
+        """重建带当前行高亮的歌词HTML并滚动到当前行"""
         if not self.lyrics_html_cache:
             # 如果缓存为空，重建HTML
             self._build_lyrics_html()
             self.playlist_widget.update_lyrics(self.lyrics_html_cache)
-        
-        # 使用CSS样式更新而不是重建HTML
+
         highlight_style = f"color: {HIGHLIGHT_COLOR.name()}; font-weight: bold; font-size: 16px;"
-        
-        # 构建样式更新的JavaScript
-        script = f"""
-        <style>
-        .current-lyric {{ {highlight_style} }}
-        .normal-lyric {{ color: #cdd6f4; font-weight: normal; font-size: 14px; }}
-        </style>
-        <script>
-        // 移除之前的高亮
-        var prev = document.querySelector('.current-lyric');
-        if (prev) prev.className = 'normal-lyric';
-        
-        // 添加新的高亮
-        var current = document.getElementById('lyric-{self.current_lyric_line}');
-        if (current) {{
-            current.className = 'current-lyric';
-            current.scrollIntoView({{behavior: 'smooth', block: 'center'}});
-        }}
-        </script>
-        """
-        
-        # 简化版：直接重建HTML但优化性能
-        html = []
-        for i, line in enumerate(self.current_lyrics):
-            text = line['text']
-            if i == self.current_lyric_line:
-                html.append(f'<a name="current"></a><p style="{highlight_style}">{text}</p>')
-            else:
-                html.append(f'<p style="color: #cdd6f4; font-weight: normal; font-size: 14px;">{text}</p>')
-        
-        self.playlist_widget.update_lyrics(f"<center>{''.join(html)}</center>")
+        self.playlist_widget.update_lyrics(
+            build_highlighted_lyrics_html(self.current_lyrics, self.current_lyric_line, highlight_style))
         self.playlist_widget.scroll_to_lyric_line("current")
 
     def toggle_lyrics_view(self):
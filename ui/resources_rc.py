@@ -0,0 +1,156 @@
+# Resource object code (Python 3)
+# Created by: object code
+# Created by: The Resource Compiler for Qt version 6.12.0
+# WARNING! All changes made in this file will be lost!
+
+from PySide6 import QtCore
+
+qt_resource_data = b"\
+\x00\x00\x07\xa2\
+\x00\
+\x00#Ox\x9c\xbd\x1a\xdbn\xdb6\xf4=_A\xd4\
+/[\x10\xa1\xbe\xc8N\xaaa\x0f\xbdn\xc5\x9a\xa1\x9e\
+\xd3\x16{2(\x89\xb6\x89\xc8\xa4FRq\xd2!\xff\
+\xbeC])\x89\x92\x1c\xb7\xab\x81\x04\xf1\x11y\xeew\
+\xe5\xf99:C\xe7\xe8\x9a\x87D0\xf4.\xc2\x0a}\
+z\x8fnvdO\xd0\x86\x0bt\x9dH\x1a\xa07\xfc\
+\xc0\x22\x8e\xe1\x0c\x1c~~vv\xb6\xfcB\xc3-Q\
+\xe8\xdf3\x04\x1f\x1f\x07\xb7[\xc1\x13\x16:\x01\x8f\xb8\
+\xf0\xd0hB&dJ~I\x1f\x17\xb0 \x0c\x17\x1b\
+7\x83m8S\xce\x06\xefi\xf4\xe0\xa1g+\xb2\xe5\
+\x04\x08?\xbb@\xcf\xaei \xb8\xe4\x1b\x85\xfe\xc6\xbf\
+\x13\xaaA/\x05\xc5\x11\xfc!1\x93\x8e$\x82n\x0c\
+$\x92~%\x1e\x9a\x8cc\x95\x01}.\x80O\x0f1\
+\xce\x80\xfe#\xf0z\x8d)\xfbBY\xc8\x0f\xc3\xfc>\
+j\xe1>`\x9fD\xf9\xd9N\xe6\x0f\x84nw\xcaC\
+\xf3\xf18\x83\xc68\x0c)\xdbzh\x1a\xdfg\x88F\
+\x92\x04\x8ar\xb6\xde\x11\xad\xbb\x1c\xa3\xc9\xb5[p]\
+C\xe9\xf3(l\xe0\x9c\xc7\xf7h\x9cb\x1d\xc9\xc4\xb7\
+\xe2-8\xbdz\x11\x06\xc4okhz,\xadYI\
+\xebl\x14G\xf8\x81\x88\xf5\xa1f\xeeT\xc3\x8e\xc0!\
+Md\xaa\xfa\xfb\x06\x86\x0a\xb4\xc7bKY\x8d\x7f\xc6\
+\x0fk\x8d\x16N\xae#\x8b\xa6\xf1\x02\x87\xc1\x95\x85U\
+\xc6\xc5\x1eGm$\x94mxK\x07\xbe\xbb\xc1\xbd\xe2\
+\x9a\xaa\x99h\xd5<j{\xc5X`\xc5E\xb7\xa3\xb8\
+s\xf7r\x8e\x0b\xe1\xee\x9d]\x8ex\xd2\x94X\xeb \
+\x17y\xf9\x812\xf26\xa4=\xf12\x9b\xcc\xa6\xae\xdb\
+\x1d/\x85W\x03\x19$yD\xc3:'\x0d\x93\x5c\xb5\
+,RB$\x892\xe7q,\x5c\x5c\xba\xc1%\x09\x9a\
+\x07-1RJ\xe4mx\x90\xc8\x5c.\x9e\xa8\x08\xe0\
+E\xecu\xf0]\xd8\xa6\x86f\xc7\xefJG\xb6\xdc\x99\
+_\xcd\xfd\xcb\xdc'\x97\x1f\x13\xb9{\x95(\xc5Y\xb7\
+>M\x07\xb0\xe5\xa4c\x14\x86&\x8b\x02l\x8f\xf8=\
+e\x0eD\x86\xdaA\xccLK\xfb\x03\xb0p\x8aY\x91\
+\x0a\x0c\x9e\xeb\xa2v\xdb\xa0q+\x16DJ\x12\xf6I\
+\x9c\x85}\xe3^H%\xf6\xa3\xbe\x8b\xa6\x1f\x15\xb0E\
+p9\xbeZd\xa1\x16\xd1;\xb2\x96\x04\x8b`\xb7\xf6\
+\x07\xd4n\xd8\xc9r\xcf\x0bv$\xb8\xed\xe3\x05/\xc8\
+\x0cO\x8c\xdc\xb3\x8eq\x22I~\xff\x02\x8d@\x0dw\
+\xd57F\xee\x95\xf1\x0c\xcek\x9c\xeb=T\xb3!V\
+\x95\x80b\x02\xd1N\x98\xb2zDe\xfb\xd2%\x16\xa6\
+\x89\x8f\xb3{[\x86\xcc\xfcuIJ\x98!Ou\xce\
+\x22\xd5\x90\x0f\x15\xd9\xc4\xceA\xeeJ\x0d\x1e*\xa8\xc9\
+\x85q\xd6\xc6\xc7\xa0W\x16\xce\xa5\xbd\xf2F;b\xd6\
+8\x5c \x08}\xa9\x86\xba\x083+\xe2HA\x8b\x82\
+\x15\xb1%\xae)\x9e\xfa\xb3\xe0\xfb\xa4J\xb7\x80l\x05\
+\x0du>\xb3\xbaLC \xcf\xa3\x8a\xeckbe \
+{\xcdt\xbb\x13tQ?\xca\xd4\xd1\xa2\xe2e\xa9Y\
+[\xa5E\xae|vZj\xb4\xd3\xcb]\xb1Ml\xc0\
+\x0d\x0d\xe3\x9f-\x7fO{\x95\xcf\x94\x1c</\xef_\
+\xbao\x9a\xf6\xb4\x95\xc3\xb6\xda\xeam\x9f\xa1r\x9f\x83\
+\xa7\xee;\xdd\xc1\xd2\x1d<\xda\xb9\xf56T\xc8F\x0f\
+\xa4x\xecDd\xa3\xea\xee\xd4\x85 \xc2\xb6\xfbB\xd3\
+n!x~\x8e\x1c\xc7A\xbfE\xdc\xc7\x11ZAO\
+\x1cE\xaf\xb0@+\xa2\x14H.\xd3\xa7\xd0\x8b/\xcb\
+G\x1e\xd8B\xd1\x00G\x8d2jh\xa4Tt#\xb6\
+\xf2d6\x996\x9d0\xeda\xaa\x9fL\xb4\x8a\xa2\xb7\
+\xc3,\x8cH\x8brwahf\xca\xe9\xb8n\xc0R\
+\x0f\x8bajC\xeeg\x141\x13\x0b\xb8\x8e\x93\xb6)\
+\x05\x1e\xf0l\xe31\xb4\xd7\xf5\xc7G\xa9\xb3\x82\x16\x92\
+\xd9\xd4\xa5I\xc7x\xdbG\xba\xf6\xb8%\x9b9\xd6T\
+\x17w\x5c\xd0\xaf\xe0\xc7\xa7\x98\xbe\xec_O\xb5}\x9b\
+\xf8\xb0\xf5s\x7f;\xc5\xf8\x15\xb9o5\x7f\x85\xa9\xc3\
+\x01\x9e\xa8\xd6\x0a\x9a\x8b\xd7\xeb\x01}\xd4\x1b\x07\xfa\xbc\
+\x00z=\xc1\xb7\xba\x0a\xeb\xe4\xd0\xc9fG\xcd\x1b(\
+\xb9\x0a\x1a\x01\x07Gt\x0b\xde\x10@\xd5#\xa2\xee3\
+e\xb23x\xf0\xa0\xc9K\xd8\xedq\xe5\xc7\xc6W*\
+\xd4\x0a\xf2ti\xdb2W\xb8\xa5B\xd3\xc7\x9e\x07\xa8\
+\xc1\x07\xda\xaa*n\xb8mA\xbd\xden\xc0\x16\x04u\
+\x92\xc3^o\x95\xd1\xe2\x1eU\xc4u\xc7\xa0\xe3fC\
+do\x8ctq\xd6\x11 \x8d\x19\xa3\xb8~\x9c\xe3\xf5\
+\x99oZ/]\x9fy\x94\xec\x09\xcaM\x99\x97\xab\xd1\
+]\x0a]K\x9b\x81'\x85\x03\xd4O\xfd_v\xb6\x10\
+:\xca\xba\xb6\xb9\xbcm]\xb7e]\xb7e\xddy\xa7\
+u/\x8fe\xb0\xdb\xc8\xf0e\x1a\x12+\x96\xefg\xeb\
+&fK~\xb3a>\xc24\xcbk\xc2\x92\xe3F\x83\
+o\xed\xf8\xe7&\xc9Z\xdb^[\x07\xcct%\xd4\x7f\
+t\xd6\xad\x96\x85\xa7m\xcc\xdf\xa1C\xcf\x91\x05e\x07\
+\x9d\xb3\x99\xb6\xa2\xc5\xf6\xad:\xd8\xdcj\xb5VV\x9d\
+\xa6)\xc4X\x18-\x00d\x0c\x85Ub\xd6\x9b\xa7\xf7\
+\xefU\xfb\xdbi\xb5\xf6<fl\xec^\xc4\xf9\x08V\
+\xf2b\x99\xb6je\xf2\x86\xf3\xe8\x86\xc6?j\x03\xd7\
+\xb3=\xb0\x88\x01r\xc4\x11U\xaa\x8a\xf0\xe3\xd65E\
+\xae)KA\x03\xcbP\x8bd\xac\xe2F\x8aB\x18\xa7\
+\xfbX\x18\xf6\xc3\x04\x1cFo\x98m\x0b\xda\xee=\xfe\
+k\xce@5X\xea\xa5\xfdk\x9e\x08\x0a\xc4\xff$\x07\
+\xf8\xba\xe7\x8c\xc3\xec\x1c\x90\x86VtH\x19\xdb\xe2\xaa\
+7\x9c\x8f\xabjR\xb4\x17(\xaf\x1a!\x09\xa1;\xd6\
+!$\xd5\x03\xe8J\xd7\x958?c\xaf,\xd3\x02[\
+\xf3\xdcpmY\xf4F\x89\x15\xe5\x93{\x84\x81\x9a\x91\
+i\xe1\x1d\x17\x01Aj\xa7_\xcc\xe8\x9d\xab\x04\xd7\x87\
+\xef\x1cE\x9c\xdf\x22\xa0\xcc\xb2\x99\x01 \xfaP\x99f\
+\xb2szTL'\xfbl$M3Q\x8a\xe7\xe2\xac\
+=\xd7\x9bK\xddn\xb7A\xc0\xd4\x0aC\x89\xc7\xb2\xda\
+\x16g^\xa2\xc9Y\xb2\x172>\xd6\xcb\xba\xe3\xacc\
+\xa8\xef\x94Q\x03\xc3\x1f\x84\xc4 -\x95\xe9\xcb\xaa-\
+\xe7!\xda\x13,\x13\x91\x0a\x5cn3\x0c\x99\x0b\xb5t\
+\x0b_?qr\x96\x06\xee\xfe\x22{p\xad\xdc\x5cY\
+\x82@\x1b\xc1\xf7\x88\xb28\xd1r2\x05}\xbfLm\
+S_\xa8_ \xe0\x1ctQ\x87|\x8c0em\xf0\
+*\xa6\xec\x15\xbf\xaf\x00ox\x02B\xb7\xc0\xaf\xf9\xde\
+\xe7%\xe4\x94\x9d\xbdV\xf9'\x096\xcb\xe1\xb9L\x07\
+\xaav\xa9\xcf\xa9\xf4\xbdaf?\xca\xa4\x228\xcc\xed\
+\x00\x17\xdf\xb2\xd4.\x8c\xe7\x0a\x11\xa0e\xcc\xb6\x10\xbf\
+8\x8e\x09\x16\x12a\xf6p\xd8\x91\xccv\xe7}\x5cf\
+\x08\x7f\x1d\xfe\xe8\xcb\xcb\x04F\x18\xf5\x80V\xa9]\x81\
+\xb3\x95N\x1aR?:\x02C\xfa\xbe\x13\x88\x15Xd\
+\x81\xc5\xc7\xa0\x882\xff\x94\xca\x1d\xfd\x93\x1d\x5c\x97\x07\
+\x7fP\xc5i\xb75\x8bVn-\xd3\xa1\xb1ej\x09\
+\x96\xd5\x0c\xb2\xd9\xc0\xd7~\xd1\x86\xde\xda\xd4\xfaG\x8b\
+\xfcW\xb3\xab\xf9\xb8\x93\x0f3\xcb\xf5\xb3Q\x0b\xd46\
+\x1b\xc6\xb4\x03t\xde\x08\x1e\x87\xfc\xc0\x10\x16\x82\x1f\xe0\
+7\xc1\x03\xe8\xbd\x10\xae8\xe9\x9d\xae\x01\xbb\xb6\xd0\xb0\
+\xd2I\xbb\xb5!:p\xdc\xc9\x8eg\x84\xe8^\xb7\xd2\
+\xedA>\xeb\xf3\xe6\xa5\x88\x9d/3\xf2\x17V\x83\x07\
+\xd3FlQ\xa9\xcct\xc3b\x9b\xd1Xo\xb5\xe4\x8c\
+ \x91\xa2;\xc8\xb4\x03\xf1\xb0|\xe9K\xe0#P\xef\
+!\xdb\xea\xcc\xfc\xc3#\xa4\xf7\x1d\xa8\xe9\xb4\xdd\xef@\
+k\x81\xe6Z\xac\x9ejC\xd7\x13\xf9Tu\xd4:\xd9\
+v\xd46)\x1b!n\x9bF2\xb6VE3P\xb2\
+u\x1aW\xdf>\xbch\x1d\x15\xaf$+f~*g\
+\x94\x9fOd\xac\xf1\x9e\xd3\xbam\x1a~\x098\xfc\xbf\
+\x02/\x8a\xff\xa2\xa8\xcf\x5c\xd9\x08\x89\xfe\x03\xcfR\x13\
+\xe2\
+"
+
+qt_resource_name = b"\
+\x00\x09\
+\x00(\xad#\
+\x00s\
+\x00t\x00y\x00l\x00e\x00.\x00q\x00s\x00s\
+"
+
+qt_resource_struct = b"\
+\x00\x00\x00\x00\x00\x02\x00\x00\x00\x01\x00\x00\x00\x01\
+\x00\x00\x00\x00\x00\x00\x00\x00\
+\x00\x00\x00\x00\x00\x01\x00\x00\x00\x01\x00\x00\x00\x00\
+\x00\x00\x01\xa1Q\xa0z\xd7\
+"
+
+def qInitResources():
+    QtCore.qRegisterResourceData(0x03, qt_resource_struct, qt_resource_name, qt_resource_data)
+
+def qCleanupResources():
+    QtCore.qUnregisterResourceData(0x03, qt_resource_struct, qt_resource_name, qt_resource_data)
+
+qInitResources()
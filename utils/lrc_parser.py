@@ -23,4 +23,59 @@ def parse_lrc_line(line):
         text = line[text_start_index:].strip()
 
         return (timestamp_ms, text)
-    return None 
\ No newline at end of file
+    return None 
+
+# Inline style of the lines that are not highlighted in the lyrics view
+NORMAL_LYRIC_STYLE = "color: #cdd6f4; font-weight: normal; font-size: 14px;"
+
+
+def parse_lrc(text):
+    """
+    Parses LRC text into a list of {'time': timestamp_in_ms, 'text': text} dicts.
+    Lines without a timestamp or without text are skipped.
+    """
+    lyrics = []
+    for line in text.strip().split('\n'):
+        parsed = parse_lrc_line(line)
+        if parsed and parsed[1]:
+            lyrics.append({'time': parsed[0], 'text': parsed[1]})
+    return lyrics
+
+
+def find_lyric_line(lyrics, position):
+    """
+    Returns the index of the line being sung at position (ms), i.e. the last line
+    whose timestamp is <= position, using a binary search. Returns -1 before the first line.
+    """
+    left, right = 0, len(lyrics) - 1
+    result = -1
+
+    while left <= right:
+        mid = (left + right) // 2
+        if lyrics[mid]['time'] <= position:
+            result = mid
+            left = mid + 1
+        else:
+            right = mid - 1
+
+    return result
+
+
+def build_lyrics_html(lyrics):
+    """Builds the plain lyrics HTML (one <p> per line, no highlight)."""
+    if not lyrics:
+        return ""
+    html = [f'<p id="lyric-{i}">{line["text"]}</p>' for i, line in enumerate(lyrics)]
+    return f"<center>{''.join(html)}</center>"
+
+
+def build_highlighted_lyrics_html(lyrics, current_line, highlight_style, normal_style=NORMAL_LYRIC_STYLE):
+    """
+    Builds the lyrics HTML with current_line highlighted and preceded by a
+    'current' anchor that the view scrolls to.
+    """
+    normal = f'<p style="{normal_style}">'
+    html = [normal + line['text'] + '</p>' for line in lyrics]
+    if 0 <= current_line < len(html):
+        html[current_line] = f'<a name="current"></a><p style="{highlight_style}">{lyrics[current_line]["text"]}</p>'
+    return f"<center>{''.join(html)}</center>"